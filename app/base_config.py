@@ -0,0 +1,32 @@
+"""
+Settings that need no secrets: .env loading, the audit log and the build-time index artifacts.
+app.config re-exports all of them; offline tools (audit queries and reports, benchmarks, snapshot
+tooling) import from here so they run without the service's credentials.
+"""
+import os
+
+# Only pay for python-dotenv when there is a .env to read (deployments inject real env vars)
+_ENV_FILES = [".env", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env")]
+if any(os.path.exists(path) for path in _ENV_FILES):
+    from dotenv import load_dotenv
+    load_dotenv(next(path for path in _ENV_FILES if os.path.exists(path)))
+
+# Clinical audit log: per-worker segments, rotated by size/age, compressed with "gzip" or "zstd"
+AUDIT_LOG_DIR = os.getenv("AUDIT_LOG_DIR", "logs/audit")
+AUDIT_SEGMENT_MAX_BYTES = int(os.getenv("AUDIT_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+AUDIT_SEGMENT_MAX_AGE = float(os.getenv("AUDIT_SEGMENT_MAX_AGE", "3600"))
+AUDIT_FSYNC_INTERVAL = float(os.getenv("AUDIT_FSYNC_INTERVAL", "5"))
+AUDIT_COMPRESSION = os.getenv("AUDIT_COMPRESSION", "gzip")
+
+# Build-time index artifacts shipped with the app (condition -> STW lookup, ...)
+INDEX_DIR = os.getenv("INDEX_DIR", "index_data")
+STW_LOOKUP_PATH = os.path.join(INDEX_DIR, "stw_lookup.json")
+# Per-volume chunk hashes and per-page counts of the last build, for integrity checks
+INDEX_MANIFEST_PATH = os.path.join(INDEX_DIR, "manifest.json")
+# Portable copy of the built index (ids, payloads, vectors) for restores without re-embedding
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(INDEX_DIR, "snapshot"))
+# Chunk texts and citation metadata keyed by point id, read locally instead of shipped in search responses
+DOCSTORE_DIR = os.getenv("DOCSTORE_DIR", os.path.join(INDEX_DIR, "docstore"))
+# Cleaned page texts keyed by (source, page): retrieved child chunks are expanded to their page
+PAGE_STORE_DIR = os.getenv("PAGE_STORE_DIR", os.path.join(INDEX_DIR, "pages"))
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", os.path.join(INDEX_DIR, "quantized"))
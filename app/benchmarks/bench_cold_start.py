@@ -0,0 +1,141 @@
+"""
+Cold-start benchmark: how long a fresh process takes to ack a webhook and to produce an answer.
+
+1. Import-time breakdown: `python -X importtime -c "import app.main"`, parsed into the slowest
+   top-level packages (self time summed per package) and the slowest app modules (cumulative).
+2. Time-to-first-ack: spawns uvicorn and POSTs a signed webhook payload until it is acked;
+   measured from process spawn.
+3. Time-to-first-answer: a fresh interpreter imports the app and answers one search query
+   end to end (embedding model load, Qdrant, Groq). Needs network access and the model cache.
+
+Usage:
+    python -m app.benchmarks.bench_cold_start [--runs 3] [--skip-answer] [--top 15]
+"""
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+import httpx
+from app.benchmarks.bench_ingress_ack import make_payload, sign
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+ANSWER_SCRIPT = """
+import asyncio, json, time
+t0 = time.perf_counter()
+import app.main
+t_import = time.perf_counter()
+from app.rag.explainer import explain_with_hybrid_rag
+answer = asyncio.run(explain_with_hybrid_rag({query!r}))
+t_answer = time.perf_counter()
+print(json.dumps({{"import_s": t_import - t0, "answer_s": t_answer - t_import, "answered": bool(answer)}}))
+"""
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """Returns (module, self_us, cumulative_us, depth) for every `-X importtime` line."""
+    rows = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def import_report(top: int):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                            capture_output=True, text=True)
+    rows = parse_importtime(result.stderr)
+    if not rows:
+        print(f"❌ import app.main failed:\n{result.stderr[-2000:]}")
+        return
+
+    total = sum(self_us for _, self_us, _, _ in rows)
+    by_package = defaultdict(int)
+    for module, self_us, _, _ in rows:
+        by_package[module.split(".")[0]] += self_us
+    print(f"--- import app.main: {total / 1e6:.2f}s, {len(rows)} modules ---")
+    print(f"{'package (self time)':<40}{'ms':>10}{'share':>8}")
+    for package, us in sorted(by_package.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"{package:<40}{us / 1000:>10.1f}{us / total * 100:>7.1f}%")
+
+    print(f"\n{'app module (cumulative)':<40}{'ms':>10}")
+    app_rows = sorted((r for r in rows if r[0].startswith("app.")), key=lambda r: -r[2])[:top]
+    for module, _, cumulative_us, _ in app_rows:
+        print(f"{module:<40}{cumulative_us / 1000:>10.1f}")
+
+    heavy = ["torch", "sentence_transformers", "qdrant_client", "groq", "fitz", "upstash_redis", "dotenv"]
+    loaded = [name for name in heavy if name in by_package]
+    print(f"\nHeavy modules on the serving import path: {', '.join(loaded) or 'none'}")
+
+
+def first_ack(port: int, timeout: float) -> float:
+    """Seconds from spawning uvicorn to the first 200 on a signed webhook POST."""
+    body = json.dumps(make_payload(1)).encode("utf-8")
+    headers = {"Content-Type": "application/json", "X-Hub-Signature-256": sign(body)}
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - t0 < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup")
+            try:
+                response = httpx.post(f"http://127.0.0.1:{port}/webhook-whatsapp", content=body, headers=headers, timeout=5)
+                if response.status_code == 200:
+                    return time.perf_counter() - t0
+            except httpx.TransportError:
+                pass
+            time.sleep(0.02)
+        raise TimeoutError(f"no ack after {timeout}s")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def first_answer(query: str) -> dict:
+    t0 = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", ANSWER_SCRIPT.format(query=query)], capture_output=True, text=True)
+    total = time.perf_counter() - t0
+    lines = [l for l in result.stdout.splitlines() if l.startswith("{")]
+    if result.returncode != 0 or not lines:
+        raise RuntimeError(result.stderr[-2000:])
+    return {**json.loads(lines[-1]), "total_s": total}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--query", default="What is the first-line antibiotic for acute bacterial sinusitis?")
+    parser.add_argument("--skip-answer", action="store_true", help="Skip the end-to-end answer (needs network)")
+    args = parser.parse_args()
+
+    import_report(args.top)
+
+    acks = [first_ack(args.port, args.timeout) for _ in range(args.runs)]
+    print(f"\n--- Time to first ack (spawn -> 200), {args.runs} runs ---")
+    print(f"median {statistics.median(acks) * 1000:.0f} ms | min {min(acks) * 1000:.0f} ms | max {max(acks) * 1000:.0f} ms")
+
+    if args.skip_answer:
+        return
+    runs = [first_answer(args.query) for _ in range(args.runs)]
+    print(f"\n--- Time to first answer (spawn -> answer), {args.runs} runs ---")
+    for key, label in (("import_s", "import app.main"), ("answer_s", "first answer"), ("total_s", "total")):
+        print(f"{label:<18} median {statistics.median(r[key] for r in runs) * 1000:.0f} ms")
+    if not all(r["answered"] for r in runs):
+        print("⚠️ Some runs returned no answer (check Groq/Qdrant connectivity)")
+
+
+if __name__ == "__main__":
+    main()
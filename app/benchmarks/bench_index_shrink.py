@@ -0,0 +1,56 @@
+"""
+How much boilerplate removal and near-duplicate dropping shrink the index, without building it.
+
+Chunks each volume twice (raw pages, then cleaned pages + near-duplicate filter) and reports
+chunks, embedding tokens and text size for both. Chunk budgets use a whitespace word count
+unless --tokenizer is given (which loads the embedding model's tokenizer).
+
+Usage:
+    python -m app.benchmarks.bench_index_shrink data/stw/Vol1.pdf [data/stw/Vol2.pdf ...] [--tokenizer]
+"""
+import argparse
+from app.rag.boilerplate import BoilerplateStats, SectionDuplicateFilter, strip_boilerplate
+from app.rag.chunker import iter_chunks, token_counter
+from app.rag.loader import iter_pages
+
+
+def measure(chunks) -> tuple[int, int, int]:
+    count = tokens = chars = 0
+    for chunk in chunks:
+        count += 1
+        tokens += len(chunk["text"].split())
+        chars += len(chunk["text"])
+    return count, tokens, chars
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="+")
+    parser.add_argument("--tokenizer", action="store_true")
+    args = parser.parse_args()
+    count_tokens = token_counter() if args.tokenizer else (lambda word: 1)
+
+    dropped = 0
+    totals = {"raw": [0, 0, 0], "clean": [0, 0, 0]}
+    print(f"{'volume':<24}{'mode':<8}{'chunks':>8}{'words':>10}{'KiB':>10}")
+    for pdf in args.pdfs:
+        # Deduplicated per STW, like the index builder
+        stats, duplicates = BoilerplateStats(), SectionDuplicateFilter()
+        raw = measure(iter_chunks(iter_pages(pdf), count_tokens=count_tokens))
+        cleaned = (c for c in iter_chunks(strip_boilerplate(iter_pages(pdf), stats), count_tokens=count_tokens)
+                   if not duplicates.is_duplicate(c["text"], c["stw_title"]))
+        clean = measure(cleaned)
+        dropped += duplicates.stats()["duplicates_dropped"]
+        for mode, row in (("raw", raw), ("clean", clean)):
+            totals[mode] = [t + v for t, v in zip(totals[mode], row)]
+            print(f"{pdf.rsplit('/', 1)[-1]:<24}{mode:<8}{row[0]:>8}{row[1]:>10}{row[2] / 1024:>10.1f}")
+        print(f"{'':<24}boilerplate: {stats.as_dict()['blocks_removed']} blocks, e.g. {stats.as_dict()['top_blocks'][:2]}")
+
+    raw, clean = totals["raw"], totals["clean"]
+    if raw[0]:
+        print(f"\nIndex shrink: {1 - clean[0] / raw[0]:.1%} fewer chunks, {1 - clean[1] / max(raw[1], 1):.1%} fewer words "
+              f"({dropped} near-duplicates dropped)")
+
+
+if __name__ == "__main__":
+    main()
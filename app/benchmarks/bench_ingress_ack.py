@@ -0,0 +1,153 @@
+"""
+Ingress ack-latency microbenchmarks for the WhatsApp webhook.
+
+1. Middleware only: WhatsAppShieldMiddleware in front of a no-op ASGI app
+   (signature check + single JSON parse + sender extraction).
+2. Full app: signed POSTs through the FastAPI app (limiter + route) with the
+   orchestrator stubbed out, at several concurrency levels.
+
+Usage:
+    python -m app.benchmarks.bench_ingress_ack [--requests 2000] [--concurrency 1,16,64]
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import statistics
+import time
+from unittest.mock import patch
+import httpx
+from app.config import WHATSAPP_APP_SECRET
+from app.middleware.whatsapp_shield_middleware import WhatsAppShieldMiddleware
+
+
+def make_payload(n_messages: int = 1, n_statuses: int = 0) -> dict:
+    """Builds a webhook payload with the shape Meta delivers."""
+    messages = [{
+        "from": f"9199000{i:05d}",
+        "id": f"wamid.bench_{i}",
+        "timestamp": "1614854400",
+        "text": {"body": "Child with fever for 3 days, two seizures and is drowsy. GCS 11."},
+        "type": "text"
+    } for i in range(n_messages)]
+    statuses = [{
+        "id": f"wamid.status_{i}",
+        "status": "read",
+        "timestamp": "1614854400",
+        "recipient_id": f"9199000{i:05d}"
+    } for i in range(n_statuses)]
+    value = {"messaging_product": "whatsapp", "contacts": [{"profile": {"name": "Bench Doctor"}}]}
+    if messages:
+        value["messages"] = messages
+    if statuses:
+        value["statuses"] = statuses
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{"id": "0", "changes": [{"value": value, "field": "messages"}]}]
+    }
+
+
+def sign(body: bytes) -> str:
+    return "sha256=" + hmac.new(WHATSAPP_APP_SECRET.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+def summarize(label: str, samples: list[float], elapsed: float):
+    samples = sorted(samples)
+
+    def pct(p):
+        return samples[min(len(samples) - 1, int(p * len(samples)))] * 1e6
+
+    print(f"{label:<42} n={len(samples):<6} p50={pct(0.50):8.1f}µs  p95={pct(0.95):8.1f}µs  "
+          f"p99={pct(0.99):8.1f}µs  mean={statistics.mean(samples) * 1e6:8.1f}µs  {len(samples) / elapsed:8.0f} req/s")
+
+
+async def bench_middleware(payload: dict, n: int, label: str):
+    """Times the middleware alone in front of an ASGI app that just returns 200."""
+    async def noop_app(scope, receive, send):
+        await receive()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    middleware = WhatsAppShieldMiddleware(noop_app)
+    body = json.dumps(payload).encode("utf-8")
+    headers = [(b"content-type", b"application/json"), (b"x-hub-signature-256", sign(body).encode())]
+
+    async def send(message):
+        pass
+
+    samples = []
+    started = time.perf_counter()
+    for _ in range(n):
+        sent = False
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return {"type": "http.disconnect"}
+
+        scope = {"type": "http", "method": "POST", "path": "/webhook-whatsapp",
+                 "headers": headers, "client": ("127.0.0.1", 1234)}
+        t0 = time.perf_counter()
+        await middleware(scope, receive, send)
+        samples.append(time.perf_counter() - t0)
+    summarize(label, samples, time.perf_counter() - started)
+
+
+async def bench_app(payload: dict, n: int, concurrency: int, label: str):
+    """Times signed webhook POSTs through the full FastAPI app (orchestrator stubbed)."""
+    from app.main import app
+
+    body = json.dumps(payload).encode("utf-8")
+    headers = {"Content-Type": "application/json", "X-Hub-Signature-256": sign(body)}
+    samples = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def noop_orchestrator(*args, **kwargs):
+        return None
+
+    async def one(client):
+        async with semaphore:
+            t0 = time.perf_counter()
+            response = await client.post("/webhook-whatsapp", content=body, headers=headers)
+            samples.append(time.perf_counter() - t0)
+            assert response.status_code == 200, response.text
+
+    with patch("app.whatsapp.webhook.medical_orchestrator", noop_orchestrator):
+        transport = httpx.ASGITransport(app=app, client=("127.0.0.1", 1234))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(one(client) for _ in range(n)))
+            elapsed = time.perf_counter() - started
+    summarize(f"{label} (c={concurrency})", samples, elapsed)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", default="1,16,64")
+    parser.add_argument("--skip-app", action="store_true", help="Only benchmark the middleware")
+    args = parser.parse_args()
+
+    shapes = {
+        "1 message": make_payload(1),
+        "10 messages (batched)": make_payload(10),
+        "50 status receipts": make_payload(0, 50),
+    }
+
+    print("--- Middleware only ---")
+    for name, payload in shapes.items():
+        await bench_middleware(payload, args.requests, name)
+
+    if args.skip_app:
+        return
+    print("\n--- Full app ack ---")
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        for name, payload in shapes.items():
+            await bench_app(payload, args.requests, concurrency, name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
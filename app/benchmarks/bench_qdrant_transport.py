@@ -0,0 +1,100 @@
+"""
+Qdrant REST vs gRPC: search latency, batched search throughput and upsert throughput.
+
+Run against a local container (nothing touches the production collection):
+    docker run -p 6333:6333 -p 6334:6334 qdrant/qdrant
+    python -m app.benchmarks.bench_qdrant_transport [--url http://localhost:6333] [--points 20000] [--queries 300]
+
+A scratch collection of random 384-dim vectors is created, measured and deleted. Each
+transport uses the app's client settings (app.rag.qdrant_pool), so REST runs over the same
+keep-alive pool the app uses. Reported per transport:
+    single    p50/p95 of one query_points call, sequential, top_k=15, full payload
+    batch     queries/s with query_batch_points (SEARCH_BATCH_MAX per call)
+    upsert    points/s uploading the collection in batches of 256
+    fresh     p50 of creating a client and running one query (the old per-query construction)
+"""
+import argparse
+import asyncio
+import time
+import numpy as np
+from app.rag import qdrant_pool
+
+DIM = 384
+COLLECTION = "bench_transport"
+TOP_K = 15
+
+
+async def run_transport(label: str, prefer_grpc: bool, url: str, vectors: np.ndarray, queries: np.ndarray) -> dict:
+    from qdrant_client.http import models
+    client = qdrant_pool.make_async_client(prefer_grpc=prefer_grpc, url=url)
+    try:
+        if await client.collection_exists(COLLECTION):
+            await client.delete_collection(COLLECTION)
+        await client.create_collection(COLLECTION, vectors_config=models.VectorParams(size=DIM, distance=models.Distance.COSINE))
+
+        t0 = time.perf_counter()
+        for start in range(0, len(vectors), 256):
+            block = vectors[start:start + 256]
+            await qdrant_pool.upsert_batch_async(
+                client, COLLECTION, list(range(start, start + len(block))), block,
+                [{"text": "x" * 600, "source": "Vol1.pdf", "page_number": i} for i in range(len(block))]
+            )
+        upsert_s = time.perf_counter() - t0
+
+        # Warm the connection before timing
+        await client.query_points(COLLECTION, query=queries[0].tolist(), limit=TOP_K)
+        latencies = []
+        for query in queries:
+            t0 = time.perf_counter()
+            await client.query_points(COLLECTION, query=query.tolist(), limit=TOP_K, with_payload=True)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        await qdrant_pool.search_batch(client, COLLECTION, queries, TOP_K)
+        batch_s = time.perf_counter() - t0
+
+        fresh = []
+        for query in queries[:20]:
+            t0 = time.perf_counter()
+            one_off = qdrant_pool.make_async_client(prefer_grpc=prefer_grpc, url=url)
+            await one_off.query_points(COLLECTION, query=query.tolist(), limit=TOP_K, with_payload=True)
+            fresh.append((time.perf_counter() - t0) * 1000)
+            await one_off.close()
+
+        await client.delete_collection(COLLECTION)
+        return {
+            "transport": label,
+            "single_p50": np.percentile(latencies, 50), "single_p95": np.percentile(latencies, 95),
+            "batch_qps": len(queries) / batch_s, "upsert_pps": len(vectors) / upsert_s,
+            "fresh_p50": np.percentile(fresh, 50),
+        }
+    finally:
+        await client.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:6333")
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=300)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(args.points, DIM)).astype(np.float32)
+    queries = rng.normal(size=(args.queries, DIM)).astype(np.float32)
+
+    rows = []
+    for label, prefer_grpc in (("rest", False), ("grpc", True)):
+        try:
+            rows.append(await run_transport(label, prefer_grpc, args.url, vectors, queries))
+        except Exception as e:
+            print(f"❌ {label}: {e}")
+
+    print(f"{'transport':<11}{'single p50':>11}{'p95 ms':>9}{'batch q/s':>11}{'upsert pts/s':>14}{'fresh p50':>11}")
+    for r in rows:
+        print(f"{r['transport']:<11}{r['single_p50']:>11.2f}{r['single_p95']:>9.2f}{r['batch_qps']:>11.0f}"
+              f"{r['upsert_pps']:>14.0f}{r['fresh_p50']:>11.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
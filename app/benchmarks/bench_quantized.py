@@ -0,0 +1,90 @@
+"""
+Recall, latency and memory of the int8-quantized local index against exact float32 search.
+
+Runs against a built snapshot (--snapshot, default SNAPSHOT_DIR) or a synthetic corpus of
+random unit vectors (--synthetic N). Queries are corpus vectors plus noise, so each has a
+well-defined neighbourhood; recall@k is measured against brute-force float32 search.
+
+Usage:
+    python -m app.benchmarks.bench_quantized [--snapshot index_data/snapshot] [--queries 200] [--k 15]
+    python -m app.benchmarks.bench_quantized --synthetic 20000
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from app.rag.local_index import LocalIndex, build_local_index
+from app.rag.snapshot import SnapshotWriter, read_manifest
+
+DIM = 384
+
+
+def synthetic_snapshot(directory: str, count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    writer = SnapshotWriter(directory, "synthetic", DIM)
+    for start in range(0, count, 4096):
+        n = min(4096, count - start)
+        # Clustered vectors, like chunks of the same guideline
+        centres = rng.normal(size=(64, DIM)).astype(np.float32)
+        vectors = centres[rng.integers(0, 64, n)] + rng.normal(scale=0.6, size=(n, DIM)).astype(np.float32)
+        writer.add(list(range(start, start + n)), [{"stw_name": f"stw_{i % 50}"} for i in range(start, start + n)], vectors)
+    writer.close()
+
+
+def timed(search, queries: np.ndarray) -> tuple[list, list[float]]:
+    results, latencies = [], []
+    for query in queries:
+        t0 = time.perf_counter()
+        results.append(search(query[None, :])[0])
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return results, latencies
+
+
+def recall(results: list, reference: list, k: int) -> float:
+    return float(np.mean([len({r for r, _ in got[:k]} & {r for r, _ in ref[:k]}) / max(len(ref[:k]), 1)
+                          for got, ref in zip(results, reference)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--snapshot")
+    parser.add_argument("--synthetic", type=int)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=15)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.synthetic:
+            snapshot_dir = os.path.join(tmp, "snapshot")
+            synthetic_snapshot(snapshot_dir, args.synthetic)
+        else:
+            from app.base_config import SNAPSHOT_DIR
+            snapshot_dir = args.snapshot or SNAPSHOT_DIR
+        t0 = time.perf_counter()
+        build_local_index(snapshot_dir, os.path.join(tmp, "quantized"))
+        build_s = time.perf_counter() - t0
+        index = LocalIndex(os.path.join(tmp, "quantized"), snapshot_dir)
+
+        rng = np.random.default_rng(1)
+        rows = rng.integers(0, index.count, args.queries)
+        queries = np.asarray(index.vectors[np.sort(rows)]) + rng.normal(scale=0.02, size=(args.queries, index.dim)).astype(np.float32)
+
+        exact, exact_ms = timed(lambda q: index.search_exact(q, args.k), queries)
+        configs = [("exact float32", exact, exact_ms)]
+        for factor in (0, 2, 4, 8):
+            results, ms = timed(lambda q: index.search(q, args.k, rescore=factor), queries)
+            configs.append((f"int8 rescore x{factor}" if factor else "int8 (no rescore)", results, ms))
+
+        memory = index.memory_bytes()
+        print(f"corpus: {index.count} x {index.dim} ({read_manifest(snapshot_dir)['model_id']}), "
+              f"quantized in {build_s:.2f}s")
+        print(f"memory: float32 {memory['float32'] / 2**20:.1f} MiB, int8 codes {memory['codes'] / 2**20:.1f} MiB "
+              f"(rescoring touches ~{args.k * 8 * index.dim * 4 / 1024:.0f} KiB per query at x8)\n")
+        print(f"{'config':<22}{f'recall@{args.k}':>11}{'p50 ms':>9}{'p95 ms':>9}")
+        for label, results, ms in configs:
+            print(f"{label:<22}{recall(results, exact, args.k):>11.3f}{np.percentile(ms, 50):>9.2f}{np.percentile(ms, 95):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Retrieval quality and latency across backends, against a golden set of clinical queries.
+
+Golden set (retrieval_golden.json): each query names the STW it should be answered from and
+anchor phrases that the relevant page must contain. Explicit "refs": [["Vol1.pdf", 12], ...]
+are the reviewed ground truth, and only those queries count towards the headline metrics.
+Queries without refs are resolved from the locally built index (page store + docstore): pages
+of the query's STW that contain an anchor. That fallback depends on the sectioning and
+boilerplate stripping being measured, so it is scored in a separate, unreviewed table. After a
+build, check the resolved pages (--resolve) and write them as refs (--pin), starting with the
+queries marked "pin": true. Queries whose STW or anchors are not found in the index are listed
+and skipped.
+
+Retrieved chunks are collapsed to pages in rank order (what parent expansion passes to the
+LLM) before scoring:
+    recall@k  relevant pages among the first k pages / min(relevant pages, k)
+    MRR       1 / rank of the first relevant page
+    p50/p95   search latency per query (query embedding excluded, reported separately)
+
+Configurations: qdrant (needs a reachable Qdrant with the collection), local exact float32,
+local int8 quantized (with and without rescoring), hybrid BM25 + dense with RRF, and
+quantized + CrossEncoder rerank (when the model is available).
+
+Usage:
+    python -m app.benchmarks.bench_retrieval [--configs exact,quantized,hybrid] [--k 15] [--json out.json]
+    python -m app.benchmarks.bench_retrieval --resolve     # print the resolved references only
+    python -m app.benchmarks.bench_retrieval --pin ars-first-line,aes-seizures   # pin them as "refs"
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import time
+from collections import Counter, defaultdict
+import numpy as np
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "retrieval_golden.json")
+CONFIGS = ["qdrant", "exact", "quantized", "quantized-norescore", "hybrid", "rerank"]
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+# Candidates pulled before reranking / fusing
+CANDIDATES = 50
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+# --- Golden set ---
+def load_golden(path: str = GOLDEN_PATH) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _anchor_pattern(anchor: str) -> re.Pattern:
+    # Whole words only: 'ORS' must not match 'doctors'
+    return re.compile(r"(?<![A-Za-z0-9])" + re.escape(anchor) + r"(?![A-Za-z0-9])", re.IGNORECASE)
+
+
+def page_stw_map(docstore) -> dict:
+    """(source, page) -> set of stw_name values of the chunks indexed from it."""
+    stws = defaultdict(set)
+    for row in range(len(docstore)):
+        meta = docstore.get(row)
+        stws[(meta["source"], meta["page_number"])].add(meta.get("stw_name"))
+    return stws
+
+
+def resolve_references(golden: list[dict], pages, page_stws: dict, lookup) -> dict:
+    """
+    Golden id -> set of relevant (source, page). Pinned refs are used as given; otherwise pages of
+    the query's STW containing an anchor. Queries whose STW is not in the index, or that resolve
+    to no page, are left out: anchors alone ('refer', 'ORS') match pages all over the corpus.
+    """
+    resolved = {}
+    for item in golden:
+        if item.get("refs"):
+            resolved[item["id"]] = {tuple(ref) for ref in item["refs"]}
+            continue
+        stw_name = lookup.resolve(item["stw"]) if item.get("stw") else None
+        if stw_name is None:
+            continue
+        patterns = [_anchor_pattern(a) for a in item.get("anchors", [])]
+        relevant = set()
+        for key in pages.keys():
+            if stw_name not in page_stws.get(key, ()):
+                continue
+            text = pages.get(*key)
+            if any(p.search(text) for p in patterns):
+                relevant.add(key)
+        if relevant:
+            resolved[item["id"]] = relevant
+    return resolved
+
+
+def pin_references(path: str, ids: list[str], relevant: dict) -> list[str]:
+    """Writes the resolved references of `ids` into the golden file as "refs"; returns the ids pinned."""
+    golden = load_golden(path)
+    pinned = []
+    for item in golden:
+        if item["id"] in ids and item["id"] in relevant:
+            item["refs"] = [list(ref) for ref in sorted(relevant[item["id"]])]
+            pinned.append(item["id"])
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[\n" + ",\n".join("  " + json.dumps(item, ensure_ascii=False) for item in golden) + "\n]\n")
+    return pinned
+
+
+# --- Metrics ---
+def ranked_pages(chunks: list[dict]) -> list[tuple]:
+    seen, pages = set(), []
+    for chunk in chunks:
+        key = (chunk.get("source"), chunk.get("page_number"))
+        if key not in seen:
+            seen.add(key)
+            pages.append(key)
+    return pages
+
+
+def recall_at(pages: list[tuple], relevant: set, k: int) -> float:
+    return len(set(pages[:k]) & relevant) / min(len(relevant), k)
+
+
+def reciprocal_rank(pages: list[tuple], relevant: set) -> float:
+    return next((1.0 / rank for rank, page in enumerate(pages, start=1) if page in relevant), 0.0)
+
+
+# --- Lexical baseline for hybrid search ---
+class BM25:
+    def __init__(self, texts: list[str], k1: float = 1.5, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self.postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        self.lengths = np.zeros(len(texts), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = _TOKEN.findall(text.lower())
+            self.lengths[row] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                self.postings[term].append((row, tf))
+        self.avg_length = float(self.lengths.mean()) if len(texts) else 0.0
+
+    def search(self, query: str, top_k: int) -> list[tuple[int, float]]:
+        scores: dict[int, float] = defaultdict(float)
+        n = len(self.lengths)
+        for term in set(_TOKEN.findall(query.lower())):
+            postings = self.postings.get(term, [])
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for row, tf in postings:
+                norm = tf + self.k1 * (1 - self.b + self.b * self.lengths[row] / self.avg_length)
+                scores[row] += idf * tf * (self.k1 + 1) / norm
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+
+# --- Configurations: (query text, query vector) -> ranked chunk dicts ---
+def build_configs(names: list[str], k: int) -> dict:
+    from app.base_config import LOCAL_INDEX_DIR, SNAPSHOT_DIR, DOCSTORE_DIR
+    from app.rag.docstore import load_docstore
+    from app.rag.local_index import LocalIndex
+    from app.rag.retriever import reciprocal_rank_fusion
+
+    docstore = load_docstore(DOCSTORE_DIR)
+    index = LocalIndex(LOCAL_INDEX_DIR, SNAPSHOT_DIR) if {"exact", "quantized", "quantized-norescore", "hybrid", "rerank"} & set(names) else None
+
+    def rows_to_chunks(hits):
+        return [{**docstore.get(row), "id": row, "score": score} for row, score in hits]
+
+    configs = {}
+    if "qdrant" in names:
+        from app.rag.vector_store import VectorStore
+        from app.rag.retriever import COLLECTION_NAME
+        store = VectorStore(COLLECTION_NAME, docstore=docstore)
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(store.client.get_collection(COLLECTION_NAME))
+            configs["qdrant"] = lambda text, vec: loop.run_until_complete(store.search(vec[None, :], k))
+        except Exception as e:
+            print(f"⚠️  Skipping qdrant: {e}")
+    if "exact" in names:
+        configs["exact"] = lambda text, vec: rows_to_chunks(index.search_exact(vec, k)[0])
+    if "quantized" in names:
+        configs["quantized"] = lambda text, vec: rows_to_chunks(index.search(vec, k)[0])
+    if "quantized-norescore" in names:
+        configs["quantized-norescore"] = lambda text, vec: rows_to_chunks(index.search(vec, k, rescore=0)[0])
+    if "hybrid" in names:
+        bm25 = BM25([docstore.text(row) for row in range(len(docstore))])
+
+        def hybrid(text, vec):
+            dense = rows_to_chunks(index.search(vec, CANDIDATES)[0])
+            lexical = rows_to_chunks(bm25.search(text, CANDIDATES))
+            return reciprocal_rank_fusion([dense, lexical], [1.0, 1.0], k)
+        configs["hybrid"] = hybrid
+    if "rerank" in names:
+        try:
+            from sentence_transformers import CrossEncoder
+            reranker = CrossEncoder(RERANK_MODEL)
+
+            def rerank(text, vec):
+                candidates = rows_to_chunks(index.search(vec, CANDIDATES)[0])
+                scores = reranker.predict([(text, c["text"]) for c in candidates])
+                return [candidates[i] for i in np.argsort(-scores)[:k]]
+            configs["rerank"] = rerank
+        except Exception as e:
+            print(f"⚠️  Skipping rerank ({RERANK_MODEL} unavailable): {e}")
+    return configs
+
+
+def evaluate(configs: dict, golden: list[dict], relevant: dict, vectors: dict, k: int) -> dict:
+    """Config name -> mean recall@5, recall@k, MRR and latency percentiles over the resolved queries."""
+    if not any(item["id"] in relevant for item in golden):
+        return {}
+    report = {}
+    for name, search in configs.items():
+        recalls5, recalls, rrs, latencies = [], [], [], []
+        for item in golden:
+            if item["id"] not in relevant:
+                continue
+            t0 = time.perf_counter()
+            chunks = search(item["query"], vectors[item["id"]])
+            latencies.append((time.perf_counter() - t0) * 1000)
+            pages = ranked_pages(chunks)
+            recalls5.append(recall_at(pages, relevant[item["id"]], 5))
+            recalls.append(recall_at(pages, relevant[item["id"]], k))
+            rrs.append(reciprocal_rank(pages, relevant[item["id"]]))
+        report[name] = {
+            "recall@5": float(np.mean(recalls5)), f"recall@{k}": float(np.mean(recalls)), "mrr": float(np.mean(rrs)),
+            "p50_ms": float(np.percentile(latencies, 50)), "p95_ms": float(np.percentile(latencies, 95)),
+        }
+    return report
+
+
+def print_table(title: str, report: dict, k: int):
+    print(f"\n{title}")
+    if not report:
+        print("  (no queries)")
+        return
+    print(f"{'config':<22}{'recall@5':>10}{f'recall@{k}':>11}{'MRR':>8}{'p50 ms':>9}{'p95 ms':>9}")
+    for name, row in report.items():
+        print(f"{name:<22}{row['recall@5']:>10.3f}{row[f'recall@{k}']:>11.3f}{row['mrr']:>8.3f}"
+              f"{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}")
+
+
+def main():
+    from app.base_config import DOCSTORE_DIR, PAGE_STORE_DIR, STW_LOOKUP_PATH
+    from app.rag.docstore import load_docstore, load_page_store
+    from app.rag.sections import ConditionLookup
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--golden", default=GOLDEN_PATH)
+    parser.add_argument("--configs", default=",".join(CONFIGS))
+    parser.add_argument("--k", type=int, default=15)
+    parser.add_argument("--resolve", action="store_true", help="Print the resolved references and exit")
+    parser.add_argument("--pin", help="Comma-separated golden ids whose resolved references are written as refs")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    docstore, pages = load_docstore(DOCSTORE_DIR), load_page_store(PAGE_STORE_DIR)
+    if docstore is None or pages is None:
+        print(f"❌ Needs a locally built index ({DOCSTORE_DIR}, {PAGE_STORE_DIR}): run app.rag.build_all_indeces")
+        return
+    golden = load_golden(args.golden)
+    relevant = resolve_references(golden, pages, page_stw_map(docstore), ConditionLookup.load(STW_LOOKUP_PATH))
+    unresolved = [item["id"] for item in golden if item["id"] not in relevant]
+    print(f"🎯 {len(relevant)}/{len(golden)} golden queries resolved to pages"
+          + (f" (skipped: {', '.join(unresolved)})" if unresolved else ""))
+    if args.pin:
+        pinned = pin_references(args.golden, [i for i in args.pin.split(",") if i], relevant)
+        print(f"📌 Pinned refs for {', '.join(pinned) or 'nothing'} in {args.golden}")
+        return
+    if args.resolve:
+        for item_id, refs in relevant.items():
+            print(f"  {item_id}: {sorted(refs)}")
+        return
+
+    queries = [item for item in golden if item["id"] in relevant]
+    if not queries:
+        print("❌ No golden query resolved to a page: nothing to score")
+        return
+
+    from app.rag.embeddings import embed_texts
+    t0 = time.perf_counter()
+    embedded = embed_texts([item["query"] for item in queries])
+    embed_ms = (time.perf_counter() - t0) * 1000 / max(len(queries), 1)
+    vectors = {item["id"]: np.asarray(vec, dtype=np.float32) for item, vec in zip(queries, embedded)}
+
+    configs = build_configs([c for c in args.configs.split(",") if c], args.k)
+    # Headline metrics from reviewed refs only; anchor-resolved queries are scored apart
+    reviewed = [item for item in queries if item.get("refs")]
+    anchored = [item for item in queries if not item.get("refs")]
+    report = evaluate(configs, reviewed, relevant, vectors, args.k)
+    unreviewed = evaluate(configs, anchored, relevant, vectors, args.k)
+
+    print(f"\nquery embedding: {embed_ms:.1f} ms/query (batched)")
+    print_table(f"reviewed refs ({len(reviewed)} queries)", report, args.k)
+    print_table(f"anchor-resolved, unreviewed ({len(anchored)} queries)", unreviewed, args.k)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"k": args.k, "queries": len(reviewed), "results": report,
+                       "unreviewed": {"queries": len(anchored), "results": unreviewed}}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Encode/decode cost of the serialization layer on the payload shapes we handle every turn:
+webhook bodies, conversation state blobs, audit records and API responses.
+
+Compares stdlib json, orjson, and msgpack (raw and base64-wrapped, as stored in Upstash).
+
+Usage:
+    python -m app.benchmarks.bench_serialization [--iterations 20000]
+"""
+import argparse
+import base64
+import json
+import time
+from app.benchmarks.bench_ingress_ack import make_payload
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+STATE_BLOB = {
+    "step": "AWAITING_DEMOGRAPHICS",
+    "pathway": "case",
+    "pending_query": "Child with fever for 3 days, two seizures and is drowsy. GCS 11.",
+    "demographic_idx": 3,
+    "demographics": {"age": "6 years", "gender": "Male", "weight": "18 kg"},
+    "last_throttle_notification": 1767723392.512
+}
+
+AUDIT_RECORD = {
+    "timestamp": "2026-10-19T10:15:22.123456",
+    "doctor_id": "919900000000",
+    "input": {
+        "raw_query": STATE_BLOB["pending_query"],
+        "detected_intent": "case",
+        "patient_context": STATE_BLOB["demographics"]
+    },
+    "retrieval_metadata": {
+        "sources": [f"ICMR-STW-Vol_2-Acute_Encephalitis_Syndrome:Pg_no:{p}" for p in range(110, 125)],
+        "source_count": 15
+    },
+    "output": "*A. Chief Clinical Summary*: 6-year-old with fever and seizures... " * 20
+}
+
+SHAPES = {
+    "webhook (1 message)": make_payload(1),
+    "webhook (10 messages)": make_payload(10),
+    "webhook (50 statuses)": make_payload(0, 50),
+    "state blob": STATE_BLOB,
+    "audit record": AUDIT_RECORD,
+    "response": {"status": "accepted"},
+}
+
+
+def codecs():
+    yield "json", lambda o: json.dumps(o).encode("utf-8"), json.loads
+    if orjson:
+        yield "orjson", orjson.dumps, orjson.loads
+    if msgpack:
+        yield "msgpack", lambda o: msgpack.packb(o, use_bin_type=True), lambda b: msgpack.unpackb(b, raw=False)
+        yield "msgpack+b64", (lambda o: base64.b64encode(msgpack.packb(o, use_bin_type=True))), \
+            (lambda b: msgpack.unpackb(base64.b64decode(b), raw=False))
+
+
+def timeit(fn, arg, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(arg)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'shape':<24}{'codec':<14}{'encode µs':>11}{'decode µs':>11}{'bytes':>9}")
+    for shape, obj in SHAPES.items():
+        for name, encode, decode in codecs():
+            encoded = encode(obj)
+            enc = timeit(encode, obj, args.iterations)
+            dec = timeit(decode, encoded, args.iterations)
+            print(f"{shape:<24}{name:<14}{enc:>11.2f}{dec:>11.2f}{len(encoded):>9}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Memory cost of preforked serving: N gunicorn workers vs 1.
+
+Starts gunicorn (gunicorn.conf.py) for each configuration, waits until every worker
+answers, then reads /proc/<pid>/smaps_rollup for the master and each worker:
+- RSS counts shared pages in every process (overstates the total)
+- PSS splits shared pages between the processes sharing them (sums to the real total)
+- USS (private pages) is what each extra worker really costs
+
+Linux only. Needs the usual app environment (.env) and the local model cache.
+
+Usage:
+    python -m app.benchmarks.bench_worker_memory [--workers 4] [--port 8099]
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+import httpx
+
+
+def read_rollup(pid: int) -> dict:
+    """Rss/Pss/Private_* of one process in KiB."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    }
+
+
+def children(pid: int) -> list[int]:
+    pids = []
+    for tid in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{tid}/children") as f:
+            pids.extend(int(p) for p in f.read().split())
+    return pids
+
+
+def measure(workers: int, preload: bool, port: int, startup_timeout: float) -> dict:
+    env = {**os.environ, "WEB_CONCURRENCY": str(workers), "GUNICORN_PRELOAD": "1" if preload else "0", "PORT": str(port)}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "app.main:app", "--config", "gunicorn.conf.py"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        t0 = time.perf_counter()
+        deadline = t0 + startup_timeout
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError("gunicorn exited during startup")
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"{workers} workers not ready after {startup_timeout}s")
+            try:
+                # Every worker must be up, not just the first one accepting
+                if len(children(proc.pid)) == workers and httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        ready_s = time.perf_counter() - t0
+        time.sleep(2)  # let late imports and lifespan startup settle
+
+        master = read_rollup(proc.pid)
+        per_worker = [read_rollup(pid) for pid in children(proc.pid)]
+        return {
+            "ready_s": ready_s,
+            "rss": master["rss"] + sum(w["rss"] for w in per_worker),
+            "pss": master["pss"] + sum(w["pss"] for w in per_worker),
+            "worker_uss": sum(w["uss"] for w in per_worker) / max(len(per_worker), 1)
+        }
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--startup-timeout", type=float, default=180)
+    args = parser.parse_args()
+
+    configs = [(1, True), (args.workers, True), (args.workers, False)]
+    print(f"{'config':<26}{'ready s':>9}{'RSS MiB':>10}{'PSS MiB':>10}{'USS/worker MiB':>16}")
+    for workers, preload in configs:
+        r = measure(workers, preload, args.port, args.startup_timeout)
+        name = f"{workers} worker{'s' if workers > 1 else ''}, {'preload' if preload else 'no preload'}"
+        print(f"{name:<26}{r['ready_s']:>9.1f}{r['rss'] / 1024:>10.0f}{r['pss'] / 1024:>10.0f}{r['worker_uss'] / 1024:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
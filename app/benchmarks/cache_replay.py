@@ -0,0 +1,332 @@
+"""
+Replays the clinical audit log through candidate cache policies, offline.
+
+For each cache we might add (answer, intent, query-embedding) and each policy
+(LRU, LFU, TTL, semantic-similarity threshold sweeps) it reports hit ratio, peak
+memory footprint, and the LLM calls and seconds that would have been saved,
+using the stage timings recorded in each audit entry.
+
+Usage:
+    python -m app.benchmarks.cache_replay [--since 2026-09-01] [--embedder hash|model]
+"""
+import abc
+import argparse
+import hashlib
+import heapq
+import re
+import statistics
+import sys
+from collections import OrderedDict
+from dataclasses import dataclass
+import numpy as np
+from app.core.audit_store import query_records, normalize_time
+
+# Rough CPython overhead per cached entry (dict slot, key/value objects)
+ENTRY_OVERHEAD_BYTES = 200
+EMBEDDING_DIM = 384
+INTENT_VALUE_BYTES = 400
+# LLM calls of a clinical turn (intent classification + answer) in records logged before
+# turns were traced; traced records carry the actual calls in "llm"
+UNTRACED_LLM_CALLS = 2
+
+
+# --- Query stream ---
+@dataclass
+class Turn:
+    timestamp: float
+    pathway: str
+    query: str
+    demographics: str
+    answer_bytes: int
+    llm_calls: int
+    intent_ms: float | None
+    embed_ms: float | None
+    answer_ms: float | None
+
+
+def normalize_query(text: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s/.%-]", " ", text.lower())).strip()
+
+
+def load_turns(directory: str, since: str = None, until: str = None) -> list[Turn]:
+    from datetime import datetime
+    turns = []
+    for record in query_records(directory, since=since, until=until):
+        query = record.get("input", {}).get("raw_query")
+        if not query:
+            continue
+        timings = record.get("timings_ms", {})
+        answer_ms = None
+        if "llm_answer" in timings:
+            answer_ms = sum(timings.get(k, 0) for k in ("intent", "retrieval", "llm_answer"))
+        turns.append(Turn(
+            timestamp=datetime.fromisoformat(record["timestamp"]).timestamp(),
+            pathway=record.get("input", {}).get("detected_intent", "unknown"),
+            query=normalize_query(query),
+            demographics=normalize_query(" ".join(str(v) for v in (record["input"].get("patient_context") or {}).values())),
+            answer_bytes=len((record.get("output") or "").encode("utf-8")),
+            llm_calls=len(record.get("llm", [])) if timings else UNTRACED_LLM_CALLS,
+            intent_ms=timings.get("intent"),
+            embed_ms=timings.get("embed"),
+            answer_ms=answer_ms
+        ))
+    return turns
+
+
+# --- Embedders for the semantic policies ---
+def hash_embed(texts: list[str], dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """Dependency-free stand-in: hashed character trigrams, L2-normalised."""
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        padded = f"  {text} "
+        for i in range(len(padded) - 2):
+            bucket = int.from_bytes(hashlib.blake2b(padded[i:i + 3].encode(), digest_size=4).digest(), "little")
+            vectors[row, bucket % dim] += 1.0
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-9)
+
+
+def model_embed(texts: list[str]) -> np.ndarray:
+    """The production embedding model (loaded from the local model cache, no network)."""
+    from app.rag.embeddings import embed_texts
+    vectors = np.asarray(embed_texts(texts), dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+
+
+# --- Policies ---
+class CachePolicy(abc.ABC):
+    name = "base"
+
+    def __init__(self):
+        self.bytes = 0
+        self.peak_bytes = 0
+        self.peak_entries = 0
+
+    def _track(self):
+        self.peak_bytes = max(self.peak_bytes, self.bytes)
+        self.peak_entries = max(self.peak_entries, len(self))
+
+    @abc.abstractmethod
+    def __len__(self):
+        ...
+
+
+class LRUPolicy(CachePolicy):
+    def __init__(self, capacity: int):
+        super().__init__()
+        self.name = f"LRU(cap={capacity})"
+        self.capacity = capacity
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, now, vector=None, scope=None) -> bool:
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return True
+        return False
+
+    def put(self, key, size, now, vector=None, scope=None):
+        self.entries[key] = size
+        self.bytes += size
+        while len(self.entries) > self.capacity:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= evicted
+        self._track()
+
+
+class LFUPolicy(CachePolicy):
+    def __init__(self, capacity: int):
+        super().__init__()
+        self.name = f"LFU(cap={capacity})"
+        self.capacity = capacity
+        self.entries = {}  # key -> [freq, tick, size]
+        self.heap = []
+        self.tick = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, now, vector=None, scope=None) -> bool:
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+        self.tick += 1
+        entry[0] += 1
+        entry[1] = self.tick
+        heapq.heappush(self.heap, (entry[0], entry[1], key))
+        return True
+
+    def put(self, key, size, now, vector=None, scope=None):
+        self.tick += 1
+        self.entries[key] = [1, self.tick, size]
+        heapq.heappush(self.heap, (1, self.tick, key))
+        self.bytes += size
+        while len(self.entries) > self.capacity:
+            freq, tick, victim = heapq.heappop(self.heap)
+            entry = self.entries.get(victim)
+            if entry is not None and entry[0] == freq and entry[1] == tick:
+                self.bytes -= entry[2]
+                del self.entries[victim]
+        self._track()
+
+
+class TTLPolicy(CachePolicy):
+    def __init__(self, ttl: float):
+        super().__init__()
+        self.name = f"TTL({int(ttl)}s)"
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (expires_at, size), insertion order == expiry order
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _expire(self, now):
+        while self.entries:
+            key, (expires_at, size) = next(iter(self.entries.items()))
+            if expires_at > now:
+                break
+            self.entries.popitem(last=False)
+            self.bytes -= size
+
+    def get(self, key, now, vector=None, scope=None) -> bool:
+        self._expire(now)
+        return key in self.entries
+
+    def put(self, key, size, now, vector=None, scope=None):
+        self._expire(now)
+        self.entries[key] = (now + self.ttl, size)
+        self.bytes += size
+        self._track()
+
+
+class SemanticPolicy(CachePolicy):
+    """
+    Hit when a cached query's embedding is within `threshold` cosine similarity (LRU-bounded).
+    Only entries with the same `scope` can match: an answer computed for one pathway and
+    patient is never served for another, however similar the query text.
+    """
+    def __init__(self, threshold: float, capacity: int = 10000):
+        super().__init__()
+        self.name = f"Semantic(≥{threshold:.2f})"
+        self.threshold = threshold
+        self.capacity = capacity
+        self.vectors = np.zeros((capacity, EMBEDDING_DIM), dtype=np.float32)
+        self.sizes = np.zeros(capacity, dtype=np.int64)
+        self.last_used = np.full(capacity, -1, dtype=np.int64)
+        self.scope_ids = np.zeros(capacity, dtype=np.int64)
+        self._scopes: dict = {}
+        self.count = 0
+        self.tick = 0
+
+    def __len__(self):
+        return self.count
+
+    def get(self, key, now, vector=None, scope=None) -> bool:
+        self.tick += 1
+        scope_id = self._scopes.get(scope)
+        if self.count == 0 or scope_id is None:
+            return False
+        sims = np.where(self.scope_ids[:self.count] == scope_id, self.vectors[:self.count] @ vector, -np.inf)
+        best = int(np.argmax(sims))
+        if sims[best] >= self.threshold:
+            self.last_used[best] = self.tick
+            return True
+        return False
+
+    def put(self, key, size, now, vector=None, scope=None):
+        size += EMBEDDING_DIM * 4
+        if self.count < self.capacity:
+            slot = self.count
+            self.count += 1
+        else:
+            slot = int(np.argmin(self.last_used))
+            self.bytes -= int(self.sizes[slot])
+        self.vectors[slot] = vector
+        self.scope_ids[slot] = self._scopes.setdefault(scope, len(self._scopes))
+        self.sizes[slot] = size
+        self.last_used[slot] = self.tick
+        self.bytes += size
+        self._track()
+
+
+# --- Simulation ---
+CACHES = {
+    # cache: (key fn, value bytes fn, ms saved fn, LLM calls saved fn, semantic scope fn)
+    # Semantic policies only match queries within the same scope (exact keys already include it):
+    # an answer depends on the pathway and the patient as well as the query text
+    "answer": (lambda t: f"{t.pathway}|{t.query}|{t.demographics}", lambda t: t.answer_bytes,
+               lambda t: t.answer_ms, lambda t: t.llm_calls, lambda t: f"{t.pathway}|{t.demographics}"),
+    "intent": (lambda t: t.query, lambda t: INTENT_VALUE_BYTES, lambda t: t.intent_ms, lambda t: 1, lambda t: None),
+    "embedding": (lambda t: t.query, lambda t: EMBEDDING_DIM * 4, lambda t: t.embed_ms, lambda t: 0, lambda t: None),
+}
+
+
+def make_policies(cache: str) -> list:
+    policies = [LRUPolicy(c) for c in (100, 1000, 10000)]
+    policies += [LFUPolicy(c) for c in (100, 1000, 10000)]
+    policies += [TTLPolicy(ttl) for ttl in (300, 3600, 86400)]
+    if cache != "embedding":  # an embedding cache keyed by similarity would need the embedding first
+        policies += [SemanticPolicy(th) for th in (0.85, 0.90, 0.95, 0.98)]
+    return policies
+
+
+def simulate(turns: list[Turn], vectors: np.ndarray, cache: str, policy) -> dict:
+    key_fn, size_fn, ms_fn, calls_fn, scope_fn = CACHES[cache]
+    # Turns without recorded timings (older records) are costed at the median of those with them
+    known = [ms_fn(t) for t in turns if ms_fn(t) is not None]
+    fallback_ms = statistics.median(known) if known else 0.0
+
+    hits, ms_saved, calls_saved = 0, 0.0, 0
+    for i, turn in enumerate(turns):
+        key = key_fn(turn)
+        scope = scope_fn(turn)
+        if policy.get(key, turn.timestamp, vectors[i], scope):
+            hits += 1
+            ms = ms_fn(turn)
+            ms_saved += ms if ms is not None else fallback_ms
+            calls_saved += calls_fn(turn)
+        else:
+            policy.put(key, len(key.encode("utf-8")) + size_fn(turn) + ENTRY_OVERHEAD_BYTES, turn.timestamp, vectors[i], scope)
+    return {
+        "hit_ratio": hits / len(turns) if turns else 0.0,
+        "peak_entries": policy.peak_entries,
+        "peak_kib": policy.peak_bytes / 1024,
+        "llm_calls_saved": calls_saved,
+        "seconds_saved": ms_saved / 1000
+    }
+
+
+def main(argv: list[str] = None):
+    from app.base_config import AUDIT_LOG_DIR
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--since")
+    parser.add_argument("--until")
+    parser.add_argument("--dir", default=AUDIT_LOG_DIR)
+    parser.add_argument("--embedder", choices=["hash", "model"], default="hash",
+                        help="Embeddings for semantic policies: hashed trigrams, or the local production model")
+    parser.add_argument("--cache", choices=list(CACHES), action="append")
+    args = parser.parse_args(argv)
+
+    turns = load_turns(args.dir, normalize_time(args.since), normalize_time(args.until, end_of_day=True))
+    if not turns:
+        print("No audit records with queries found.")
+        sys.exit(1)
+    turns.sort(key=lambda t: t.timestamp)
+    vectors = (model_embed if args.embedder == "model" else hash_embed)([t.query for t in turns])
+
+    days = (turns[-1].timestamp - turns[0].timestamp) / 86400
+    print(f"🔁 Replaying {len(turns)} turns over {days:.1f} days ({len({t.query for t in turns})} distinct queries)\n")
+    print(f"{'cache':<11}{'policy':<20}{'hit %':>7}{'entries':>9}{'peak KiB':>10}{'LLM calls':>11}{'sec saved':>11}")
+    for cache in args.cache or list(CACHES):
+        for policy in make_policies(cache):
+            r = simulate(turns, vectors, cache, policy)
+            print(f"{cache:<11}{policy.name:<20}{r['hit_ratio'] * 100:>7.1f}{r['peak_entries']:>9}"
+                  f"{r['peak_kib']:>10.1f}{r['llm_calls_saved']:>11}{r['seconds_saved']:>11.1f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
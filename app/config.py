@@ -1,7 +1,10 @@
-from dotenv import load_dotenv
 import os
 
-load_dotenv()
+# .env loading and the settings offline tools need without credentials (audit log, index artifacts)
+from app.base_config import (  # noqa: F401
+    AUDIT_LOG_DIR, AUDIT_SEGMENT_MAX_BYTES, AUDIT_SEGMENT_MAX_AGE, AUDIT_FSYNC_INTERVAL, AUDIT_COMPRESSION,
+    INDEX_DIR, STW_LOOKUP_PATH, INDEX_MANIFEST_PATH, SNAPSHOT_DIR, DOCSTORE_DIR, PAGE_STORE_DIR, LOCAL_INDEX_DIR
+)
 
 WHATSAPP_PHONE_NUMBER_ID = os.getenv("WHATSAPP_PHONE_NUMBER_ID")
 WHATSAPP_TOKEN = os.getenv("WHATSAPP_TOKEN")
@@ -18,6 +21,46 @@ REDIS_TOKEN = os.getenv("UPSTASH_REDIS_REST_TOKEN")
 
 LIMIT_DAY = os.getenv("LIMIT_DAY")
 LIMIT_MINUTE = os.getenv("LIMIT_MINUTE")
+# Seconds between "rate limit active" notices to the same sender
+RATE_LIMIT_NOTICE_COOLDOWN = float(os.getenv("RATE_LIMIT_NOTICE_COOLDOWN", "60"))
+
+# Outbound Graph API client tuning (pooled, keep-alive HTTP/2)
+WHATSAPP_HTTP_TIMEOUT = float(os.getenv("WHATSAPP_HTTP_TIMEOUT", "10"))
+WHATSAPP_HTTP_CONNECT_TIMEOUT = float(os.getenv("WHATSAPP_HTTP_CONNECT_TIMEOUT", "3"))
+WHATSAPP_HTTP_MAX_CONNECTIONS = int(os.getenv("WHATSAPP_HTTP_MAX_CONNECTIONS", "20"))
+WHATSAPP_HTTP_KEEPALIVE = float(os.getenv("WHATSAPP_HTTP_KEEPALIVE", "120"))
+WHATSAPP_SEND_RETRIES = int(os.getenv("WHATSAPP_SEND_RETRIES", "3"))
+
+# Cloud API throughput (messages/sec per business number) and pair-rate (messages/sec per recipient)
+WHATSAPP_MPS = float(os.getenv("WHATSAPP_MPS", "80"))
+WHATSAPP_PAIR_RATE = float(os.getenv("WHATSAPP_PAIR_RATE", str(1 / 6)))
+WHATSAPP_PAIR_BURST = float(os.getenv("WHATSAPP_PAIR_BURST", "10"))
+
+# STATE_SERIALIZER (codec for conversation state blobs) is read by app.core.serialization.state_serializer
+
+# Retrieved child chunks are expanded to their page from PAGE_STORE_DIR
+PARENT_EXPANSION = os.getenv("PARENT_EXPANSION", "1") != "0"
+# Distinct parent blocks passed to the LLM, and the longest excerpt of one page
+PARENT_MAX_BLOCKS = int(os.getenv("PARENT_MAX_BLOCKS", "6"))
+PARENT_MAX_CHARS = int(os.getenv("PARENT_MAX_CHARS", "2400"))
+# Qdrant transport: gRPC (binary protobuf, port QDRANT_GRPC_PORT) or REST with a keep-alive pool
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "0") == "1"
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT", "10"))
+QDRANT_HTTP_KEEPALIVE = float(os.getenv("QDRANT_HTTP_KEEPALIVE", "120"))
+# Vector search backend: "qdrant", or "local" (int8-quantized codes with exact rescoring, from INDEX_DIR)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "qdrant")
+# Build-time embedding cache, keyed by chunk text hash (not shipped with the app)
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", ".cache/embeddings")
+# A guideline-scoped search whose best hit scores below this falls back to the whole corpus
+STW_FILTER_MIN_SCORE = float(os.getenv("STW_FILTER_MIN_SCORE", "0.3"))
+
+# Upstream pre-warming (DNS, pooled connections, embedding model) at startup and while idle
+WARMER_ENABLED = os.getenv("WARMER_ENABLED", "1") != "0"
+# Seconds between idle checks; a warm-up runs when nothing was served for this long
+WARMER_INTERVAL = float(os.getenv("WARMER_INTERVAL", "60"))
+# Keep-alive for the Groq connection pool, so warmed connections outlive the warm-up interval
+GROQ_HTTP_KEEPALIVE = float(os.getenv("GROQ_HTTP_KEEPALIVE", "120"))
 
 if not GROQ_API_KEY:
     raise RuntimeError("GROQ_API_KEY not set")
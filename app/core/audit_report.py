@@ -0,0 +1,80 @@
+"""
+Offline latency report from the clinical audit log.
+
+Computes p50/p95/p99 of every recorded stage (intent, embed, vector_search, retrieval,
+llm_answer, send, total) per pathway, plus LLM token usage per model.
+
+Usage:
+    python -m app.core.audit_report [--since 2026-10-01] [--until 2026-10-19] [--doctor <id>]
+"""
+import argparse
+import math
+from collections import defaultdict
+from app.core.audit_store import query_records, normalize_time
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def collect(records) -> tuple[dict, dict]:
+    """Groups stage timings by (pathway, stage) and token counts by model."""
+    timings = defaultdict(list)
+    tokens = defaultdict(lambda: {"calls": 0, "prompt": [], "completion": [], "duration": []})
+    for record in records:
+        pathway = record.get("input", {}).get("detected_intent", "unknown")
+        for stage, ms in record.get("timings_ms", {}).items():
+            if ms is not None:
+                timings[(pathway, stage)].append(ms)
+        for call in record.get("llm", []):
+            usage = tokens[call.get("model", "unknown")]
+            usage["calls"] += 1
+            for key, field in (("prompt", "prompt_tokens"), ("completion", "completion_tokens"), ("duration", "duration_ms")):
+                if call.get(field) is not None:
+                    usage[key].append(call[field])
+    return timings, tokens
+
+
+def render(timings: dict, tokens: dict) -> str:
+    lines = [f"{'pathway':<10}{'stage':<16}{'n':>7}" + "".join(f"{f'p{p} ms':>11}" for p in PERCENTILES)]
+    for (pathway, stage) in sorted(timings, key=lambda k: (k[0], k[1] == "total", k[1])):
+        values = sorted(timings[(pathway, stage)])
+        lines.append(f"{pathway:<10}{stage:<16}{len(values):>7}"
+                     + "".join(f"{percentile(values, p):>11.1f}" for p in PERCENTILES))
+
+    if tokens:
+        lines.append("")
+        lines.append(f"{'model':<28}{'calls':>7}{'prompt p50':>12}{'compl p50':>11}{'ms p95':>9}")
+        for model, usage in sorted(tokens.items()):
+            def p(values, q):
+                return f"{percentile(sorted(values), q):.0f}" if values else "-"
+            lines.append(f"{model:<28}{usage['calls']:>7}{p(usage['prompt'], 50):>12}"
+                         f"{p(usage['completion'], 50):>11}{p(usage['duration'], 95):>9}")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] = None):
+    from app.base_config import AUDIT_LOG_DIR
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--since")
+    parser.add_argument("--until")
+    parser.add_argument("--doctor")
+    parser.add_argument("--dir", default=AUDIT_LOG_DIR)
+    args = parser.parse_args(argv)
+
+    records = query_records(args.dir, doctor=args.doctor, since=normalize_time(args.since),
+                            until=normalize_time(args.until, end_of_day=True))
+    timings, tokens = collect(records)
+    if not timings:
+        print("No timed audit records found.")
+        return
+    print(render(timings, tokens))
+
+
+if __name__ == "__main__":
+    main()
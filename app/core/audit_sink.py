@@ -0,0 +1,148 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from app.core.serialization import dumps
+from app.core.audit_store import partition_dir, seal_segment, ZSTD_AVAILABLE
+
+# Sentinel that tells the writer thread to flush, close and exit
+_STOP = object()
+# Max records written per batch before the writer checks fsync/rotation again
+_MAX_BATCH = 1000
+
+
+class AuditSink:
+    """
+    Background audit log writer. The hot path only enqueues a dict; a writer thread:
+    1. Batches records into this worker's own segment file (no interleaving between workers),
+       inside a UTC day partition directory.
+    2. Flushes every batch and fsyncs every `fsync_interval` seconds.
+    3. Rotates segments by size, age or UTC hour change, then seals closed segments into
+       block-compressed files (gzip, or zstd if installed) with a query index (see audit_store).
+    4. Drains the queue on shutdown (close() is called from the app lifespan and atexit).
+    """
+    def __init__(
+        self,
+        directory: str = "logs/audit",
+        prefix: str = "clinical_audit",
+        max_bytes: int = 64 * 1024 * 1024,
+        max_age: float = 3600,
+        flush_interval: float = 1.0,
+        fsync_interval: float = 5.0,
+        compression: str = "gzip",
+        max_queue: int = 10000
+    ):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.compression = "zstd" if compression == "zstd" and ZSTD_AVAILABLE else "gzip"
+        self.max_queue = max_queue
+
+        self.written = 0
+        self.dropped = 0
+        self._queue: queue.Queue | None = None
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        self._lock = threading.Lock()
+        self._atexit_registered = False
+        self._segment_seq = 0
+
+    # --- Hot path ---
+    def submit(self, record: dict):
+        """Queues one audit record. Never blocks; drops (and counts) records if the writer falls far behind."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    # --- Lifecycle ---
+    def _ensure_started(self):
+        # Threads don't survive fork: a preforked worker starts its own writer on first use
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            self._thread = threading.Thread(target=self._run, name="audit-sink", daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.close)
+                self._atexit_registered = True
+
+    def close(self, timeout: float = 10.0):
+        """Flushes everything queued so far, closes and compresses the open segment."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    # --- Writer thread ---
+    def _segment_path(self, now: datetime) -> str:
+        self._segment_seq += 1
+        name = f"{self.prefix}-{now:%Y%m%dT%H%M%S}-{os.getpid()}-{self._segment_seq:04d}.jsonl"
+        return os.path.join(partition_dir(self.directory, now), name)
+
+    def _run(self):
+        handle, path, opened_at, last_fsync, opened_hour = None, None, 0.0, 0.0, None
+        while True:
+            stop = False
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+                while not stop and len(batch) < _MAX_BATCH:
+                    item = self._queue.get_nowait()
+                    if item is _STOP:
+                        stop = True
+                    else:
+                        batch.append(item)
+            except queue.Empty:
+                pass
+
+            try:
+                if batch:
+                    if handle is None:
+                        now_utc = datetime.now(timezone.utc).replace(tzinfo=None)
+                        path = self._segment_path(now_utc)
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        handle = open(path, "ab")
+                        opened_at = last_fsync = time.monotonic()
+                        opened_hour = now_utc.replace(minute=0, second=0, microsecond=0)
+                    handle.write(b"".join(dumps(record) + b"\n" for record in batch))
+                    handle.flush()
+                    self.written += len(batch)
+
+                if handle is not None:
+                    now = time.monotonic()
+                    if now - last_fsync >= self.fsync_interval:
+                        os.fsync(handle.fileno())
+                        last_fsync = now
+                    hour_changed = datetime.now(timezone.utc).replace(tzinfo=None) - opened_hour >= timedelta(hours=1)
+                    if stop or hour_changed or handle.tell() >= self.max_bytes or now - opened_at >= self.max_age:
+                        self._seal(handle, path)
+                        handle = None
+            except Exception as e:
+                print(f"⚠️ Audit sink write error: {e}")
+
+            if stop:
+                return
+
+    def _seal(self, handle, path: str):
+        """fsyncs, closes, compresses and indexes a finished segment."""
+        handle.flush()
+        os.fsync(handle.fileno())
+        handle.close()
+        seal_segment(path, self.compression)
+
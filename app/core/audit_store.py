@@ -0,0 +1,319 @@
+"""
+Time-partitioned, indexed storage for the clinical audit log.
+
+Layout (written by AuditSink, one directory per UTC day, one segment per worker per hour):
+    logs/audit/2026/10/19/clinical_audit-20261019T100000-<pid>-0001.jsonl        (open segment)
+    logs/audit/2026/10/19/clinical_audit-20261019T100000-<pid>-0001.jsonl.gz     (sealed segment)
+    logs/audit/2026/10/19/clinical_audit-20261019T100000-<pid>-0001.jsonl.gz.idx (its index)
+
+A sealed segment is a series of independently compressed blocks (gzip members / zstd frames),
+so any block can be decompressed on its own after a seek. The index holds:
+- a sparse time index: first/last timestamp -> byte offset/length of every block
+- a doctor_id index and a cited-volume index: key -> block numbers
+
+Usage:
+    python -m app.core.audit_store query --doctor 919900000000 --since 2026-10-01 --until 2026-10-19
+    python -m app.core.audit_store query --source Vol3 --count
+    python -m app.core.audit_store seal     # seal + index raw segments left behind by dead workers
+"""
+import argparse
+import glob
+import gzip
+import io
+import os
+import re
+import sys
+import zlib
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+from app.core.serialization import dumps, dumps_str, loads
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+# Records per independently compressed block: the unit of a seek
+BLOCK_RECORDS = 256
+INDEX_SUFFIX = ".idx"
+LEGACY_LOG_FILE = "logs/clinical_audit.jsonl"
+_VOLUME_PATTERN = re.compile(r"Vol_?(\d+)", re.IGNORECASE)
+_SEGMENT_PID = re.compile(r"-(\d+)-\d+\.jsonl$")
+
+
+# --- Layout ---
+def partition_dir(directory: str, when: datetime) -> str:
+    """Day partition for a UTC timestamp."""
+    return os.path.join(directory, f"{when:%Y}", f"{when:%m}", f"{when:%d}")
+
+
+def record_volumes(record: dict) -> set[str]:
+    """Volumes cited by a record's retrieval metadata, normalised to 'Vol3' form."""
+    volumes = set()
+    for ref in record.get("retrieval_metadata", {}).get("sources", []):
+        ref = ref if isinstance(ref, str) else str(ref.get("ref_id", ref.get("source", "")))
+        volumes.update(f"Vol{n}" for n in _VOLUME_PATTERN.findall(ref))
+    return volumes
+
+
+# --- Block codecs ---
+def compress_block(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor().compress(data)
+    return gzip.compress(data, mtime=0)
+
+
+def decompress_block(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data, wbits=31)
+
+
+# --- Sealing ---
+def seal_segment(path: str, compression: str = "gzip") -> str:
+    """
+    Converts a closed raw segment into block-compressed form plus its index, then removes the raw file.
+    Returns the sealed segment path.
+    """
+    codec = "zstd" if compression == "zstd" and ZSTD_AVAILABLE else "gzip"
+    target = path + (".zst" if codec == "zstd" else ".gz")
+    index = {"version": 1, "codec": codec, "records": 0, "min_ts": None, "max_ts": None,
+             "blocks": [], "doctors": {}, "sources": {}}
+
+    def flush(lines: list[bytes], records: list[dict], dst):
+        block_no = len(index["blocks"])
+        payload = compress_block(b"".join(lines), codec)
+        timestamps = [r.get("timestamp", "") for r in records]
+        index["blocks"].append({
+            "offset": dst.tell(), "length": len(payload), "records": len(records),
+            "first_ts": min(timestamps), "last_ts": max(timestamps)
+        })
+        dst.write(payload)
+        for key, values in (("doctors", {r.get("doctor_id") for r in records}),
+                            ("sources", set().union(*(record_volumes(r) for r in records)))):
+            for value in values:
+                if value:
+                    blocks = index[key].setdefault(str(value), [])
+                    if not blocks or blocks[-1] != block_no:
+                        blocks.append(block_no)
+
+    with open(path, "rb") as src, open(target + ".tmp", "wb") as dst:
+        lines, records = [], []
+        for line in src:
+            if not line.strip():
+                continue
+            try:
+                record = loads(line)
+            except ValueError:
+                continue  # torn final line from a crashed worker
+            lines.append(line if line.endswith(b"\n") else line + b"\n")
+            records.append(record)
+            if len(records) >= BLOCK_RECORDS:
+                flush(lines, records, dst)
+                index["records"] += len(records)
+                lines, records = [], []
+        if records:
+            flush(lines, records, dst)
+            index["records"] += len(records)
+
+    if index["blocks"]:
+        index["min_ts"] = min(b["first_ts"] for b in index["blocks"])
+        index["max_ts"] = max(b["last_ts"] for b in index["blocks"])
+    with open(target + INDEX_SUFFIX + ".tmp", "wb") as f:
+        f.write(dumps(index))
+    os.replace(target + ".tmp", target)
+    os.replace(target + INDEX_SUFFIX + ".tmp", target + INDEX_SUFFIX)
+    os.remove(path)
+    return target
+
+
+def seal_orphans(directory: str, compression: str = "gzip") -> list[str]:
+    """Seals raw segments whose writer process is no longer alive (crashed or killed workers)."""
+    sealed = []
+    for path in glob.glob(os.path.join(directory, "**", "*.jsonl"), recursive=True):
+        match = _SEGMENT_PID.search(path)
+        if not match or _pid_alive(int(match.group(1))):
+            continue
+        sealed.append(seal_segment(path, compression))
+    return sealed
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# --- Reading ---
+def read_segment(path: str) -> Iterator[dict]:
+    """Yields every record of one segment, raw or compressed (block-compressed files read as one stream)."""
+    if path.endswith(".zst"):
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError(f"zstandard is required to read {path}")
+        stream = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True, read_across_frames=True)
+        handle = io.BufferedReader(stream)
+    elif path.endswith(".gz"):
+        handle = gzip.open(path, "rb")
+    else:
+        handle = open(path, "rb")
+    with handle:
+        for line in handle:
+            if line.strip():
+                try:
+                    yield loads(line)
+                except ValueError:
+                    continue
+
+
+def _load_index(path: str) -> Optional[dict]:
+    try:
+        with open(path + INDEX_SUFFIX, "rb") as f:
+            return loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def iter_segments(directory: str, since: str = None, until: str = None) -> Iterator[str]:
+    """Segment paths in time order, pruned to the day partitions overlapping [since, until]."""
+    paths = []
+    if since or until:
+        start = datetime.fromisoformat(since[:10]) if since else None
+        # One day of slack: a batch written just after midnight lands in the next day's partition
+        end = datetime.fromisoformat(until[:10]) + timedelta(days=1) if until else None
+        for day_dir in sorted(glob.glob(os.path.join(directory, "[0-9]" * 4, "[0-9]" * 2, "[0-9]" * 2))):
+            day = datetime.strptime(os.path.relpath(day_dir, directory), os.path.join("%Y", "%m", "%d"))
+            if (start and day < start) or (end and day > end):
+                continue
+            paths.extend(glob.glob(os.path.join(day_dir, "*.jsonl*")))
+    else:
+        paths.extend(glob.glob(os.path.join(directory, "**", "*.jsonl*"), recursive=True))
+    # Flat segments from before day partitioning, and the original single-file log
+    paths.extend(glob.glob(os.path.join(directory, "*.jsonl*")))
+    if os.path.exists(LEGACY_LOG_FILE):
+        paths.append(LEGACY_LOG_FILE)
+
+    segments = sorted({p for p in paths if not p.endswith((INDEX_SUFFIX, ".tmp"))}, key=os.path.basename)
+    yield from segments
+
+
+def _matches(record: dict, doctor: str, since: str, until: str, source: str) -> bool:
+    ts = record.get("timestamp", "")
+    if since and ts < since:
+        return False
+    if until and ts > until:
+        return False
+    if doctor and record.get("doctor_id") != doctor:
+        return False
+    if source and source not in record_volumes(record):
+        return False
+    return True
+
+
+def query_records(directory: str, doctor: str = None, since: str = None, until: str = None,
+                  source: str = None, stats: dict = None) -> Iterator[dict]:
+    """
+    Yields audit records matching all given filters, in time order per segment.
+    Sealed segments are answered by seeking straight to candidate blocks via their index;
+    open/legacy segments are scanned.
+    """
+    source = f"Vol{_VOLUME_PATTERN.search(source).group(1)}" if source and _VOLUME_PATTERN.search(source) else source
+    stats = stats if stats is not None else {}
+    stats.setdefault("segments", 0)
+    stats.setdefault("segments_skipped", 0)
+    stats.setdefault("blocks_read", 0)
+    stats.setdefault("segments_scanned", 0)
+
+    for path in iter_segments(directory, since, until):
+        stats["segments"] += 1
+        index = _load_index(path)
+        if index is None:
+            stats["segments_scanned"] += 1
+            for record in read_segment(path):
+                if _matches(record, doctor, since, until, source):
+                    yield record
+            continue
+
+        if not index["blocks"] or (since and index["max_ts"] < since) or (until and index["min_ts"] > until):
+            stats["segments_skipped"] += 1
+            continue
+
+        candidates = set(range(len(index["blocks"])))
+        if doctor:
+            candidates &= set(index["doctors"].get(doctor, []))
+        if source:
+            candidates &= set(index["sources"].get(source, []))
+        candidates = [
+            n for n in sorted(candidates)
+            if not (since and index["blocks"][n]["last_ts"] < since)
+            and not (until and index["blocks"][n]["first_ts"] > until)
+        ]
+        if not candidates:
+            stats["segments_skipped"] += 1
+            continue
+
+        with open(path, "rb") as f:
+            for n in candidates:
+                block = index["blocks"][n]
+                f.seek(block["offset"])
+                data = decompress_block(f.read(block["length"]), index["codec"])
+                stats["blocks_read"] += 1
+                for line in data.splitlines():
+                    record = loads(line)
+                    if _matches(record, doctor, since, until, source):
+                        yield record
+
+
+def normalize_time(value: str, end_of_day: bool = False) -> Optional[str]:
+    """Accepts a date or datetime and returns the ISO form used in audit records."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if end_of_day and len(value) <= 10:
+        parsed += timedelta(days=1) - timedelta(microseconds=1)
+    return parsed.isoformat()
+
+
+def main(argv: list[str] = None):
+    from app.base_config import AUDIT_LOG_DIR, AUDIT_COMPRESSION
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    q = sub.add_parser("query", help="Find audit records by doctor, time range and cited volume")
+    q.add_argument("--doctor")
+    q.add_argument("--since", help="ISO date or datetime (UTC)")
+    q.add_argument("--until", help="ISO date or datetime (UTC); a bare date includes the whole day")
+    q.add_argument("--source", help="Cited volume, e.g. Vol3")
+    q.add_argument("--count", action="store_true", help="Only print the number of matches")
+    q.add_argument("--dir", default=AUDIT_LOG_DIR)
+    s = sub.add_parser("seal", help="Seal and index raw segments left behind by dead workers")
+    s.add_argument("--dir", default=AUDIT_LOG_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "seal":
+        for path in seal_orphans(args.dir, AUDIT_COMPRESSION):
+            print(f"✅ Sealed {path}")
+        return
+
+    stats = {}
+    matches = query_records(
+        args.dir, doctor=args.doctor, source=args.source,
+        since=normalize_time(args.since), until=normalize_time(args.until, end_of_day=True), stats=stats
+    )
+    count = 0
+    for record in matches:
+        count += 1
+        if not args.count:
+            sys.stdout.write(dumps_str(record) + "\n")
+    print(f"🔎 {count} records | segments: {stats['segments']} "
+          f"(skipped {stats['segments_skipped']}, scanned {stats['segments_scanned']}) | "
+          f"blocks read: {stats['blocks_read']}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,4 +11,15 @@ async def global_exception_handler(request: Request, exc: Exception):
     return JSONResponse(
         status_code=500,
         content={"status": "error", "message": "Internal Server Error"}
-    )
\ No newline at end of file
+    )
+
+
+class WhatsAppThrottledError(Exception):
+    """
+    Raised when Meta rejects an outbound message because of throughput or pair-rate limits
+    (HTTP 429, error codes 130429 / 131056 / 131048). The outbound dispatcher re-queues these.
+    """
+    def __init__(self, code, message: str = "", retry_after: float | None = None):
+        super().__init__(f"WhatsApp throttled ({code}): {message}")
+        self.code = code
+        self.retry_after = retry_after
@@ -1,51 +1,191 @@
+import re
 import time
-import asyncio
-from fastapi import Request
-from fastapi.responses import JSONResponse
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from app.whatsapp.sender import send_whatsapp_message
-from app.state_store.store import get_state, set_state
-from app.config import LIMIT_DAY, LIMIT_MINUTE
-
-# 1. Define the Key Function
-def get_whatsapp_sender_sync(request: Request) -> str:
-    """Retrieves phone number from state (populated by middleware)."""
-    return getattr(request.state, "sender_phone", get_remote_address(request))
-
-# 2. Initialize the Limiter
-limiter = Limiter(key_func=get_whatsapp_sender_sync)
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from upstash_redis.asyncio import Redis as AsyncRedis
+from app.whatsapp.sender import enqueue_whatsapp_message
+from app.state_store.store import REDIS_AVAILABLE
+from app.config import LIMIT_DAY, LIMIT_MINUTE, REDIS_URL, REDIS_TOKEN, RATE_LIMIT_NOTICE_COOLDOWN
 
 # --- THE STRATEGY ---
 # 1. "10/minute": Prevents rapid-fire spamming.
 # 2. "25/day": Absolute ceiling.
+# Both windows are sliding and shared by every worker/instance through Redis.
 LIMIT_STRATEGY = f"{LIMIT_MINUTE}; {LIMIT_DAY}"
 
-# 3. Define the Custom Handler
-async def custom_rate_limit_handler(request: Request, exc: RateLimitExceeded):
-    """Handles rate limit breaches with cooldown-aware WhatsApp notifications."""
-    sender_id = getattr(request.state, "sender_phone", None)
-    
-    if sender_id:
-        state = get_state(sender_id) or {}
-        last_notified = state.get("last_throttle_notification", 0)
-        current_time = time.time()
-
-        if current_time - last_notified > 60:
-            throttle_msg = (
-                "⏳ *Rate Limit Active*\n\n"
-                "To ensure clinical accuracy, I process messages one at a time. "
-                "Please wait 60 seconds before sending your next query."
-            )
-            asyncio.create_task(send_whatsapp_message(sender_id, throttle_msg))
-            
-            state["last_throttle_notification"] = current_time
-            set_state(sender_id, state)
-
-    # Note: Using 200 here as per your request to stop Meta's retry loop 
-    # while still blocking the local execution.
-    return JSONResponse(
-        status_code=200,
-        content={"error": "Rate limit exceeded"}
-    )
\ No newline at end of file
+THROTTLE_MESSAGE = (
+    "⏳ *Rate Limit Active*\n\n"
+    "To ensure clinical accuracy, I process messages one at a time. "
+    "Please wait 60 seconds before sending your next query."
+)
+
+UNIT_SECONDS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_LIMIT_PATTERN = re.compile(r"^\s*(\d+)\s*(?:/|per)\s*(\d+)?\s*(second|minute|hour|day)s?\s*$", re.IGNORECASE)
+
+# Sliding-window log over one sorted set per sender. Checks every window, records the hit
+# and claims the cooldown-notice slot in a single atomic round trip.
+# KEYS: hits zset, notice key | ARGV: now_ms, member, cooldown_ms, (limit, window_ms)...
+# Returns {allowed, retry_after_ms, notify}
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local longest = 0
+for i = 4, #ARGV, 2 do
+  longest = math.max(longest, tonumber(ARGV[i + 1]))
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - longest)
+
+local retry = 0
+for i = 4, #ARGV, 2 do
+  local limit = tonumber(ARGV[i])
+  local window = tonumber(ARGV[i + 1])
+  local count = redis.call('ZCOUNT', KEYS[1], '(' .. (now - window), '+inf')
+  if count >= limit then
+    local oldest = redis.call('ZRANGEBYSCORE', KEYS[1], '(' .. (now - window), '+inf', 'WITHSCORES', 'LIMIT', count - limit, 1)
+    retry = math.max(retry, tonumber(oldest[2]) + window - now)
+  end
+end
+
+if retry > 0 then
+  local notify = redis.call('SET', KEYS[2], now, 'PX', ARGV[3], 'NX')
+  return {0, retry, notify and 1 or 0}
+end
+
+redis.call('ZADD', KEYS[1], now, ARGV[2])
+redis.call('PEXPIRE', KEYS[1], longest)
+return {1, 0, 0}
+"""
+
+
+def parse_limit(spec: str) -> tuple[int, int]:
+    """Parses '10/minute', '25 per day' or '100/2 hours' into (limit, window_seconds)."""
+    match = _LIMIT_PATTERN.match(spec)
+    if not match:
+        raise ValueError(f"Invalid rate limit: {spec!r}")
+    count, multiplier, unit = match.groups()
+    return int(count), int(multiplier or 1) * UNIT_SECONDS[unit.lower()]
+
+
+@dataclass
+class RateLimitDecision:
+    allowed: bool
+    retry_after: float = 0.0   # seconds until the sender may send again
+    notify: bool = False       # True for the one caller per cooldown that should send the notice
+
+
+class SlidingWindowLimiter:
+    """
+    Per-sender sliding-window limiter shared across workers through Redis.
+    - One atomic Lua call per message: window check, hit recording and notice cooldown together.
+    - Hot senders that are already blocked are answered from a local cache, without a round trip.
+    - Falls back to an in-process sliding window if Redis is unavailable.
+    """
+    def __init__(self, limits: list[tuple[int, int]], redis: AsyncRedis | None = None,
+                 notice_cooldown: float = 60, prefix: str = "ratelimit"):
+        self.limits = limits
+        self.redis = redis
+        self.notice_cooldown = notice_cooldown
+        self.prefix = prefix
+        self._script_sha: str | None = None
+        # Local token cache: sender -> monotonic time until which we know they are blocked
+        self._blocked_until: dict[str, float] = {}
+        # In-process fallback state
+        self._local_hits: dict[str, deque] = {}
+        self._local_notice: dict[str, float] = {}
+
+    async def hit(self, sender_id: str) -> RateLimitDecision:
+        """Counts one message from `sender_id` against every window, if it is allowed."""
+        now = time.monotonic()
+        blocked_until = self._blocked_until.get(sender_id)
+        if blocked_until is not None:
+            if now < blocked_until:
+                return RateLimitDecision(False, blocked_until - now, False)
+            del self._blocked_until[sender_id]
+
+        decision = None
+        if self.redis is not None:
+            try:
+                decision = await self._hit_redis(sender_id)
+            except Exception as e:
+                print(f"⚠️ Rate limiter Redis error: {e}. Using local window.")
+        if decision is None:
+            decision = self._hit_local(sender_id)
+
+        if not decision.allowed:
+            # Cache the block, but never past the notice cooldown, so the next notice
+            # is still decided atomically by Redis.
+            self._blocked_until[sender_id] = now + min(decision.retry_after, self.notice_cooldown)
+        return decision
+
+    async def _hit_redis(self, sender_id: str) -> RateLimitDecision:
+        now_ms = int(time.time() * 1000)
+        keys = [f"{self.prefix}:{sender_id}", f"{self.prefix}:notice:{sender_id}"]
+        args = [str(now_ms), f"{now_ms}-{uuid.uuid4().hex[:8]}", str(int(self.notice_cooldown * 1000))]
+        for limit, window in self.limits:
+            args += [str(limit), str(window * 1000)]
+
+        if self._script_sha is None:
+            self._script_sha = await self.redis.script_load(SLIDING_WINDOW_SCRIPT)
+        try:
+            allowed, retry_ms, notify = await self.redis.evalsha(self._script_sha, keys=keys, args=args)
+        except Exception as e:
+            if "NOSCRIPT" not in str(e):
+                raise
+            allowed, retry_ms, notify = await self.redis.eval(SLIDING_WINDOW_SCRIPT, keys=keys, args=args)
+        return RateLimitDecision(bool(allowed), int(retry_ms) / 1000, bool(notify))
+
+    def _hit_local(self, sender_id: str) -> RateLimitDecision:
+        now = time.time()
+        hits = self._local_hits.setdefault(sender_id, deque())
+        longest = max(window for _, window in self.limits)
+        while hits and hits[0] <= now - longest:
+            hits.popleft()
+
+        retry = 0.0
+        for limit, window in self.limits:
+            in_window = [t for t in hits if t > now - window]
+            if len(in_window) >= limit:
+                retry = max(retry, in_window[len(in_window) - limit] + window - now)
+
+        if retry > 0:
+            notify = now >= self._local_notice.get(sender_id, 0)
+            if notify:
+                self._local_notice[sender_id] = now + self.notice_cooldown
+            return RateLimitDecision(False, retry, notify)
+
+        hits.append(now)
+        return RateLimitDecision(True)
+
+    def reset_connection(self, redis: AsyncRedis | None):
+        """Swaps in a fresh Redis client (after a fork); the loaded script SHA stays valid server-side."""
+        self.redis = redis
+
+    async def close(self):
+        if self.redis is not None:
+            await self.redis.close()
+
+
+def _build_limiter() -> SlidingWindowLimiter:
+    redis = AsyncRedis(url=REDIS_URL, token=REDIS_TOKEN) if REDIS_AVAILABLE else None
+    limits = [parse_limit(spec) for spec in LIMIT_STRATEGY.split(";") if spec.strip()]
+    return SlidingWindowLimiter(limits, redis=redis, notice_cooldown=RATE_LIMIT_NOTICE_COOLDOWN)
+
+
+limiter = _build_limiter()
+
+
+def reset_after_fork():
+    """Gives a forked worker its own Redis client instead of the parent's."""
+    if limiter.redis is not None:
+        limiter.reset_connection(AsyncRedis(url=REDIS_URL, token=REDIS_TOKEN))
+
+
+async def admit_message(sender_id: str) -> bool:
+    """
+    Admission check for one inbound message. Throttled senders get a single
+    cooldown-aware WhatsApp notice per cooldown window across all workers.
+    """
+    decision = await limiter.hit(sender_id)
+    if decision.notify:
+        enqueue_whatsapp_message(sender_id, THROTTLE_MESSAGE)
+    return decision.allowed
@@ -1,10 +1,20 @@
-import json
-import os
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
+from app.core.audit_sink import AuditSink
+from app.config import (
+    AUDIT_LOG_DIR, AUDIT_SEGMENT_MAX_BYTES, AUDIT_SEGMENT_MAX_AGE,
+    AUDIT_FSYNC_INTERVAL, AUDIT_COMPRESSION
+)
 
-# log file path for clinical interactions. Each line is a JSON object with details of the session, including demographics, retrieved sources, and AI response.
-LOG_FILE = "logs/clinical_audit.jsonl"
+# Background sink for clinical interactions. Each worker appends JSON lines (demographics, retrieved sources,
+# AI response) to its own segment under AUDIT_LOG_DIR; closed segments are rotated and compressed.
+audit_sink = AuditSink(
+    directory=AUDIT_LOG_DIR,
+    max_bytes=AUDIT_SEGMENT_MAX_BYTES,
+    max_age=AUDIT_SEGMENT_MAX_AGE,
+    fsync_interval=AUDIT_FSYNC_INTERVAL,
+    compression=AUDIT_COMPRESSION
+)
 
 def log_clinical_session(
     sender_id: str, 
@@ -12,14 +22,15 @@ def log_clinical_session(
     intent: str, 
     demographics: Dict[str, Any], 
     retrieved_refs: List[str], 
-    ai_response: str
+    ai_response: str,
+    trace: Optional[Dict[str, Any]] = None
 ):
     """
     Records a complete clinical interaction for audit and accuracy review.
+    `trace` (TurnTrace.to_dict()) adds similarity scores, LLM models/token usage
+    and per-stage timings. Only enqueues the record; the file I/O happens on the audit sink's writer thread.
     """
-    # Create directory if it doesn't exist
-    os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
-
+    trace = trace or {}
     log_entry = {
         "timestamp": datetime.utcnow().isoformat(),
         "doctor_id": sender_id,
@@ -30,11 +41,12 @@ def log_clinical_session(
         },
         "retrieval_metadata": {
             "sources": retrieved_refs,  # List of PDF page/section IDs
-            "source_count": len(retrieved_refs)
+            "source_count": len(retrieved_refs),
+            "hits": trace.get("retrieval", [])  # REF_ID + similarity score, in rank order
         },
+        "llm": trace.get("llm", []),
+        "timings_ms": trace.get("timings_ms", {}),
         "output": ai_response
     }
 
-    # Append as a single line to the JSONL file
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(log_entry) + "\n")
\ No newline at end of file
+    audit_sink.submit(log_entry)
\ No newline at end of file
@@ -0,0 +1,43 @@
+"""
+Hooks for preforked serving (see gunicorn.conf.py).
+
+The master imports the app once (preload_app) and loads the embedding model and maps the
+docstore, page store and any local index (when_ready). Workers are then forked and share
+those pages copy-on-write.
+Two things keep the sharing intact:
+- freeze_shared_heap() moves every object allocated so far into the GC's permanent
+  generation, so worker collections don't write to (and so copy) the shared pages.
+- after_fork() gives each worker its own network clients (keeping the mapped stores) and
+  limits torch to a few intra-op threads, so N workers don't oversubscribe the vCPUs.
+"""
+import gc
+import os
+
+
+def freeze_shared_heap():
+    """Called in the master just before forking."""
+    gc.collect()
+    gc.freeze()
+
+
+def after_fork(torch_threads: int = 1):
+    """Called in each worker right after fork, before it serves anything."""
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+
+    # Sockets and connection pools must not be shared between processes
+    from app.llm import groq_client
+    from app.state_store import store
+    from app.core import limiter
+    from app.whatsapp import sender
+    from app.rag import retriever, qdrant_pool
+    groq_client.reset_client()
+    store.reconnect()
+    limiter.reset_after_fork()
+    sender.reset_after_fork()
+    retriever.reset_after_fork()
+    qdrant_pool.reset_after_fork()
+    print(f"✅ Worker {os.getpid()} ready (torch threads: {torch_threads})")
@@ -0,0 +1,89 @@
+import base64
+import json
+import os
+from typing import Any
+from starlette.responses import JSONResponse
+
+# orjson is the fast path for all JSON; stdlib json is the fallback
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+# msgpack is only used for state blobs stored in Redis
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+# Upstash speaks REST/JSON, so binary state blobs travel base64-encoded behind this tag.
+# Untagged values are plain JSON (older entries, or the JSON codec).
+MSGPACK_STATE_PREFIX = "m1:"
+
+
+def state_serializer() -> str:
+    """
+    Codec for conversation state blobs in Redis: "json" (orjson fast path) or "msgpack".
+    Upstash's REST API only carries strings, so msgpack blobs are base64-wrapped; see bench_serialization.
+    Read from the environment rather than app.config, so offline tools using this module need no secrets.
+    """
+    return os.getenv("STATE_SERIALIZER", "json")
+
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if ORJSON_AVAILABLE else 0
+
+
+def _default(obj: Any):
+    """stdlib fallback for the types orjson handles natively (numpy arrays/scalars)."""
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """Serializes to compact UTF-8 JSON bytes."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=_default).encode("utf-8")
+
+
+def dumps_str(obj: Any) -> str:
+    """Serializes to a compact JSON string."""
+    return dumps(obj).decode("utf-8")
+
+
+def loads(data: bytes | str) -> Any:
+    """Parses JSON from bytes or str. Raises ValueError on malformed input."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def encode_state(state: dict) -> str:
+    """Encodes a conversation state blob for Redis (msgpack when enabled and available, else JSON)."""
+    if state_serializer() == "msgpack" and MSGPACK_AVAILABLE:
+        packed = msgpack.packb(state, use_bin_type=True)
+        return MSGPACK_STATE_PREFIX + base64.b64encode(packed).decode("ascii")
+    return dumps_str(state)
+
+
+def decode_state(raw: str | bytes | dict | None) -> dict | None:
+    """Decodes a state blob written by encode_state (either codec) or by older JSON-only code."""
+    if raw is None or isinstance(raw, dict):
+        return raw
+    if isinstance(raw, bytes):
+        raw = raw.decode("utf-8")
+    if raw.startswith(MSGPACK_STATE_PREFIX):
+        if not MSGPACK_AVAILABLE:
+            raise ValueError("State blob is msgpack-encoded but msgpack is not installed")
+        return msgpack.unpackb(base64.b64decode(raw[len(MSGPACK_STATE_PREFIX):]), raw=False)
+    return loads(raw)
+
+
+class FastJSONResponse(JSONResponse):
+    """Default FastAPI response class: renders through the orjson fast path."""
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,81 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# The trace of the clinical turn currently being processed (None outside a traced turn)
+_current_trace: ContextVar[Optional["TurnTrace"]] = ContextVar("current_trace", default=None)
+
+
+class TurnTrace:
+    """
+    Collects per-turn telemetry for the audit log: stage durations, retrieved REF_IDs with
+    similarity scores, and LLM models and token usage. Components record into
+    the current trace (if any) so function signatures stay unchanged.
+    """
+    def __init__(self, pathway: str):
+        self.pathway = pathway
+        self.started = time.perf_counter()
+        self.stages: dict[str, float] = {}
+        self.retrieval: list[dict] = []
+        self.llm_calls: list[dict] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        """Times a block of work; repeated stages accumulate."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - t0) * 1000
+
+    def record_retrieval(self, ref_id: str, score: float = None):
+        self.retrieval.append({"ref_id": ref_id, "score": round(float(score), 4) if score is not None else None})
+
+    def record_llm(self, model: str, usage=None, duration_ms: float = None):
+        self.llm_calls.append({
+            "model": model,
+            "prompt_tokens": getattr(usage, "prompt_tokens", None),
+            "completion_tokens": getattr(usage, "completion_tokens", None),
+            "duration_ms": round(duration_ms, 1) if duration_ms is not None else None
+        })
+
+    def ref_ids(self) -> list[str]:
+        return [r["ref_id"] for r in self.retrieval]
+
+    def to_dict(self) -> dict:
+        return {
+            "pathway": self.pathway,
+            "timings_ms": {
+                **{name: round(ms, 1) for name, ms in self.stages.items()},
+                "total": round((time.perf_counter() - self.started) * 1000, 1)
+            },
+            "retrieval": self.retrieval,
+            "llm": self.llm_calls
+        }
+
+
+@contextmanager
+def turn_trace(pathway: str):
+    """Makes a new TurnTrace current for the duration of one clinical turn."""
+    trace = TurnTrace(pathway)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def current_trace() -> Optional[TurnTrace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def traced_stage(name: str):
+    """Times a stage on the current trace; a no-op outside a traced turn."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    with trace.stage(name):
+        yield
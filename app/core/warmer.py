@@ -0,0 +1,137 @@
+import asyncio
+import socket
+import time
+from typing import Awaitable, Callable
+from urllib.parse import urlparse
+from app.config import VECTOR_DB_URL, REDIS_URL, WARMER_INTERVAL, VECTOR_BACKEND
+
+
+class UpstreamWarmer:
+    """
+    Keeps the first request after a quiet period on the warm path.
+    At startup, and whenever nothing has been served for `interval` seconds, it:
+    1. Resolves each upstream's hostname (refreshing the resolver cache).
+    2. Makes one cheap call through each shared client, so a pooled TLS connection is open.
+    3. Runs a dummy embedding, so model weights are paged in.
+    Per-upstream DNS and warm-call latency are kept as metrics (/debug-upstreams).
+    """
+    def __init__(self, targets: dict[str, Callable[[], Awaitable]], hosts: dict[str, str] = None,
+                 interval: float = 60, timeout: float = 10):
+        self.targets = targets
+        self.hosts = hosts or {}
+        self.interval = interval
+        self.timeout = timeout
+        self.last_activity = 0.0
+        self.metrics = {name: {"warms": 0, "failures": 0, "dns_ms": None, "warm_ms": None,
+                               "last_error": None, "last_warmed_at": None} for name in targets}
+        self._task: asyncio.Task | None = None
+
+    def touch(self):
+        """Marks real traffic: live requests keep connections warm on their own."""
+        self.last_activity = time.monotonic()
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        await self.warm_all()
+        while True:
+            await asyncio.sleep(self.interval)
+            if time.monotonic() - self.last_activity >= self.interval:
+                await self.warm_all()
+
+    async def warm_all(self):
+        """Warms every upstream concurrently; one slow or failing upstream doesn't hold up the rest."""
+        await asyncio.gather(*(self._warm(name) for name in self.targets))
+
+    async def _warm(self, name: str):
+        metrics = self.metrics[name]
+        try:
+            host = self.hosts.get(name)
+            if host:
+                t0 = time.perf_counter()
+                await asyncio.get_running_loop().getaddrinfo(host, 443, type=socket.SOCK_STREAM)
+                metrics["dns_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            t0 = time.perf_counter()
+            await asyncio.wait_for(self.targets[name](), self.timeout)
+            metrics["warm_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            metrics["warms"] += 1
+            metrics["last_error"] = None
+            metrics["last_warmed_at"] = time.time()
+        except Exception as e:
+            metrics["failures"] += 1
+            metrics["last_error"] = repr(e)
+            print(f"⚠️ Warm-up of {name} failed: {e!r}")
+
+    def stats(self) -> dict:
+        idle = time.monotonic() - self.last_activity if self.last_activity else None
+        return {"running": self._task is not None, "idle_seconds": round(idle, 1) if idle is not None else None,
+                "upstreams": self.metrics}
+
+
+# --- Production targets: one cheap call through each shared client ---
+async def _warm_whatsapp():
+    from app.whatsapp.sender import get_http_client
+    # Any response will do: the point is an open HTTP/2 connection in the pool
+    await get_http_client().get("https://graph.facebook.com/")
+
+
+async def _warm_groq():
+    from app.llm.groq_client import get_client
+    await get_client().models.list()
+
+
+async def _warm_qdrant():
+    from app.rag.qdrant_pool import get_async_client
+    from app.rag.retriever import COLLECTION_NAME
+    await get_async_client().collection_exists(COLLECTION_NAME)
+
+
+async def _warm_upstash():
+    from app.core.limiter import limiter
+    if limiter.redis is not None:
+        await limiter.redis.ping()
+
+
+async def _warm_embedding():
+    from app.rag.embeddings import embed_texts
+    await asyncio.to_thread(embed_texts, ["warm-up"])
+
+
+def _build_warmer(vector_backend: str = VECTOR_BACKEND) -> UpstreamWarmer:
+    targets = {
+        "whatsapp": _warm_whatsapp,
+        "groq": _warm_groq,
+        "qdrant": _warm_qdrant,
+        "upstash": _warm_upstash,
+        "embedding": _warm_embedding,
+    }
+    hosts = {
+        "whatsapp": "graph.facebook.com",
+        "groq": "api.groq.com",
+        "qdrant": urlparse(VECTOR_DB_URL).hostname,
+        "upstash": urlparse(REDIS_URL).hostname,
+    }
+    if vector_backend == "local":
+        # Searches never reach Qdrant: nothing to keep warm there
+        del targets["qdrant"], hosts["qdrant"]
+    return UpstreamWarmer(
+        targets=targets,
+        hosts=hosts,
+        interval=WARMER_INTERVAL,
+        # The first embedding includes loading the model
+        timeout=120
+    )
+
+
+warmer = _build_warmer()
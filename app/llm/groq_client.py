@@ -1,10 +1,29 @@
 import json
+import time
 from typing import Union
-from groq import AsyncGroq # Switched to Async
-from app.config import GROQ_API_KEY
+from app.config import GROQ_API_KEY, GROQ_HTTP_KEEPALIVE
+from app.core.telemetry import current_trace
 
-# Initialize Async client
-client = AsyncGroq(api_key=GROQ_API_KEY)
+# Async client, created on first use so importing the app doesn't pull in the groq SDK
+client = None
+
+
+def get_client():
+    global client
+    if client is None:
+        import httpx
+        from groq import AsyncGroq, DefaultAsyncHttpxClient # Switched to Async
+        # Longer keep-alive than httpx's 5s default so connections opened by the warmer survive
+        client = AsyncGroq(api_key=GROQ_API_KEY, http_client=DefaultAsyncHttpxClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=GROQ_HTTP_KEEPALIVE)
+        ))
+    return client
+
+
+def reset_client():
+    """Drops the client after a fork so workers never share the parent's connection pool."""
+    global client
+    client = None
 
 async def call_groq(
     messages: list, 
@@ -18,13 +37,17 @@ async def call_groq(
     """
     try:
         # Use 'await' to prevent blocking other users
-        response = await client.chat.completions.create(
+        t0 = time.perf_counter()
+        response = await get_client().chat.completions.create(
             model=model,
             messages=messages,
             temperature=temperature,
             max_tokens=max_tokens,
             response_format={"type": response_format}
         )
+        trace = current_trace()
+        if trace is not None:
+            trace.record_llm(model, getattr(response, "usage", None), (time.perf_counter() - t0) * 1000)
         
         raw_content = response.choices[0].message.content.strip()
         
@@ -1,19 +1,48 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
-from slowapi.errors import RateLimitExceeded
-from app.core.limiter import limiter, custom_rate_limit_handler
+from app.core.limiter import limiter
 from app.whatsapp.webhook import router as whatsapp_router
 from app.middleware.whatsapp_shield_middleware import WhatsAppShieldMiddleware
 from app.core.exceptions import global_exception_handler
+from app.whatsapp.sender import init_http_client, close_http_client, dispatcher
+from app.core.serialization import FastJSONResponse
+from app.core.logger import audit_sink
+from app.rag.embeddings import load_model
+from app.rag.qdrant_pool import close_async_client
+from app.core.warmer import warmer
+from app.config import WARMER_ENABLED
 import socket
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Opens app-lifetime network clients on startup and closes them on shutdown."""
+    await init_http_client()
+    await dispatcher.start()
+    if WARMER_ENABLED:
+        # Warms DNS, upstream connections and the embedding model in the background, then again whenever idle
+        await warmer.start()
+    else:
+        # Load the embedding model in the background: startup (and webhook acks) don't wait for torch.
+        # A no-op when gunicorn already preloaded it in the master.
+        model_warmup = asyncio.create_task(asyncio.to_thread(load_model))
+        model_warmup.add_done_callback(
+            lambda t: t.cancelled() or t.exception() is None or print(f"⚠️ Embedding model warm-up failed: {t.exception()}")
+        )
+    yield
+    await warmer.stop()
+    await dispatcher.stop()
+    await close_http_client()
+    await close_async_client()
+    await limiter.close()
+    # Flush queued audit records to disk before the worker exits
+    await asyncio.to_thread(audit_sink.close)
+
+
 # Initialize FastAPI app instance
-app = FastAPI(title="ICMR STW WhatsApp Demo")
-# Attach the limiter to App State
-app.state.limiter = limiter
-# Exception handler for rate limit breaches
-app.add_exception_handler(RateLimitExceeded, custom_rate_limit_handler)
+app = FastAPI(title="ICMR STW WhatsApp Demo", lifespan=lifespan, default_response_class=FastJSONResponse)
 # Register the global exception handler
 app.add_exception_handler(Exception, global_exception_handler)
 
@@ -37,4 +66,14 @@ def check_dns():
         # Tries to find the 'address' for the Facebook API
         return {"ip": socket.gethostbyname("graph.facebook.com")}
     except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+# Debug endpoint exposing outbound delivery metrics
+@app.get("/debug-outbound")
+def outbound_stats():
+    return dispatcher.stats()
+
+# Debug endpoint exposing per-upstream warm-up latency
+@app.get("/debug-upstreams")
+def upstream_stats():
+    return warmer.stats()
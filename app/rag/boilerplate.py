@@ -0,0 +1,188 @@
+"""
+Index-time text cleanup: repeated page furniture and near-duplicate chunks.
+
+Running headers, page footers, volume titles and disclaimers are the same block at the same
+place on page after page. `strip_boilerplate` streams a volume's pages (as yielded by the
+loader, with positioned "blocks") through a lookahead window, counts each block by
+(position band, normalised text) and drops blocks that repeat often enough before the
+page's text reaches the chunker.
+
+`NearDuplicateFilter` then drops chunks whose text is (near-)identical to one already
+indexed, using 64-bit SimHash over word shingles. `SectionDuplicateFilter` keeps one per
+(volume, STW): a dosing table or referral list shared by two guidelines stays indexed under
+both, with its own citation, so searches scoped to either guideline still find it. Chunks whose numbers differ are never
+treated as duplicates, so a paediatric and an adult dosing line stay separate.
+"""
+import hashlib
+import re
+from collections import Counter, deque
+from typing import Iterable, Iterator
+
+# Header/footer bands: top and bottom fraction of the page
+EDGE_BAND = 0.12
+# A block in a header/footer band is boilerplate once seen on this many pages...
+MIN_EDGE_REPEATS = 3
+# ...a block in the page body only when it is long (disclaimers, notices) and repeats more
+MIN_BODY_REPEATS = 5
+MIN_BODY_CHARS = 80
+# Pages read ahead before a page is emitted, so early pages see the counts of later ones
+LOOKAHEAD_PAGES = 40
+# Vertical position buckets for matching blocks across pages
+POSITION_BUCKETS = 20
+# Header/footer blocks up to this long may carry a page number that varies between pages
+MAX_FURNITURE_CHARS = 80
+
+SIMHASH_BITS = 64
+# Chunks within this many differing SimHash bits are near-duplicates
+MAX_HAMMING_DISTANCE = 3
+# Below this many words, only exact (normalised) duplicates are dropped
+MIN_SIMHASH_WORDS = 8
+
+# Page numbers in running headers/footers: a bare number ("12", "- 12 -"), "page 12 (of 80)",
+# or a number set off by a separator at either end ("Vol 2 | 12")
+_PAGE_NUMBER = re.compile(r"^[-–—]?\s*\d+\s*[-–—]?$|\bpage\s+\d+(?:\s*(?:of|/)\s*\d+)?|^\d+\s*[|·•]\s*|\s*[|·•]\s*\d+$")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+_WORD = re.compile(r"\w+")
+
+
+def _block_key(y: float, text: str) -> tuple:
+    text = " ".join(text.lower().split())
+    if y < EDGE_BAND or y > 1 - EDGE_BAND:
+        # Page numbers vary between otherwise identical headers and footers; any other number
+        # (a dose or table row near the page edge) is content and must match exactly
+        if len(text) <= MAX_FURNITURE_CHARS:
+            text = _PAGE_NUMBER.sub("#", text)
+        return ("top" if y < EDGE_BAND else "bottom"), text
+    return int(y * POSITION_BUCKETS), text
+
+
+def _is_boilerplate(key: tuple, counts: Counter) -> bool:
+    band, text = key
+    if band in ("top", "bottom"):
+        return counts[key] >= MIN_EDGE_REPEATS
+    return len(text) >= MIN_BODY_CHARS and counts[key] >= MIN_BODY_REPEATS
+
+
+class BoilerplateStats:
+    def __init__(self):
+        self.pages = 0
+        self.blocks_removed = 0
+        self.chars_total = 0
+        self.chars_removed = 0
+        self.examples: Counter = Counter()
+
+    def as_dict(self) -> dict:
+        share = self.chars_removed / self.chars_total if self.chars_total else 0.0
+        return {"pages": self.pages, "blocks_removed": self.blocks_removed,
+                "chars_removed": self.chars_removed, "share_removed": round(share, 4),
+                "top_blocks": [text for text, _ in self.examples.most_common(5)]}
+
+
+def strip_boilerplate(pages: Iterable[dict], stats: BoilerplateStats = None,
+                      lookahead: int = LOOKAHEAD_PAGES) -> Iterator[dict]:
+    """
+    Yields the pages of one volume, in order, with repeated header/footer/disclaimer blocks
+    removed from 'text' (and 'blocks' dropped). Memory is bounded by the lookahead window
+    plus one counter entry per distinct block.
+    """
+    stats = stats if stats is not None else BoilerplateStats()
+    counts: Counter = Counter()
+    window: deque = deque()
+
+    def emit(page: dict) -> dict:
+        kept = []
+        for y, text in page.get("blocks", []):
+            stats.chars_total += len(text)
+            key = _block_key(y, text)
+            if _is_boilerplate(key, counts):
+                stats.blocks_removed += 1
+                stats.chars_removed += len(text)
+                stats.examples[text] += 1
+            else:
+                kept.append(text)
+        stats.pages += 1
+        cleaned = {k: v for k, v in page.items() if k != "blocks"}
+        if "blocks" in page:
+            cleaned["text"] = "\n".join(kept)
+        return cleaned
+
+    for page in pages:
+        # A block counts once per page, however often it appears on it
+        counts.update({_block_key(y, text) for y, text in page.get("blocks", [])})
+        window.append(page)
+        if len(window) > lookahead:
+            yield emit(window.popleft())
+    while window:
+        yield emit(window.popleft())
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over word 3-shingles (single words for very short texts)."""
+    words = _WORD.findall(text.lower())
+    shingles = [" ".join(words[i:i + 3]) for i in range(max(len(words) - 2, 1))] if len(words) >= 3 else words
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if weights[bit] > 0)
+
+
+class NearDuplicateFilter:
+    """
+    Remembers every chunk it lets through; `is_duplicate` is True for a chunk that repeats one
+    of them exactly or within MAX_HAMMING_DISTANCE SimHash bits with the same numbers.
+    Candidates are found through four 16-bit bands: any two hashes within 3 bits share a band.
+    """
+    BANDS = 4
+
+    def __init__(self, max_distance: int = MAX_HAMMING_DISTANCE):
+        self.max_distance = max_distance
+        self.seen = 0
+        self.dropped = 0
+        self._exact: set[str] = set()
+        self._bands: list[dict[int, list[tuple[int, tuple]]]] = [{} for _ in range(self.BANDS)]
+
+    def is_duplicate(self, text: str) -> bool:
+        self.seen += 1
+        normalised = " ".join(text.lower().split())
+        exact = hashlib.blake2b(normalised.encode("utf-8"), digest_size=16).hexdigest()
+        if exact in self._exact:
+            self.dropped += 1
+            return True
+        self._exact.add(exact)
+
+        if len(normalised.split()) < MIN_SIMHASH_WORDS:
+            return False
+        fingerprint = simhash(normalised)
+        numbers = tuple(_NUMBER.findall(normalised))
+        width = SIMHASH_BITS // self.BANDS
+        keys = [(fingerprint >> (i * width)) & ((1 << width) - 1) for i in range(self.BANDS)]
+        for band, key in zip(self._bands, keys):
+            for other, other_numbers in band.get(key, ()):
+                if other_numbers == numbers and bin(fingerprint ^ other).count("1") <= self.max_distance:
+                    self.dropped += 1
+                    return True
+        for band, key in zip(self._bands, keys):
+            band.setdefault(key, []).append((fingerprint, numbers))
+        return False
+
+    def stats(self) -> dict:
+        return {"chunks_seen": self.seen, "duplicates_dropped": self.dropped}
+
+
+class SectionDuplicateFilter:
+    """One NearDuplicateFilter per scope key, e.g. (volume, stw_name); duplicates only count within a scope."""
+    def __init__(self, max_distance: int = MAX_HAMMING_DISTANCE):
+        self.max_distance = max_distance
+        self.filters: dict = {}
+
+    def is_duplicate(self, text: str, scope) -> bool:
+        filt = self.filters.get(scope)
+        if filt is None:
+            filt = self.filters[scope] = NearDuplicateFilter(self.max_distance)
+        return filt.is_duplicate(text)
+
+    def stats(self) -> dict:
+        return {"chunks_seen": sum(f.seen for f in self.filters.values()),
+                "duplicates_dropped": sum(f.dropped for f in self.filters.values())}
@@ -1,82 +1,210 @@
+import argparse
 import os
-import uuid
-import math
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
-from app.rag.loader import load_pdf_with_metadata  # Use the new loader
-from app.rag.chunker import chunk_text
-from app.rag.embeddings import embed_texts
-from app.config import VECTOR_DB_URL, VECTOR_DB_API_KEY
+from app.rag.loader import iter_pages_parallel
+from app.rag.chunker import iter_chunks, token_counter, CHILD_CHUNK_MAX_TOKENS, CHILD_CHUNK_OVERLAP_TOKENS
+from app.rag.embeddings import embed_texts, MODEL_ID, EMBEDDING_DIM
+from app.rag.embedding_cache import EmbeddingCache, text_hash
+from app.rag.sections import build_lookup, save_lookup
+from app.rag.snapshot import SnapshotWriter, import_collection, iter_snapshot, read_manifest
+from app.rag.verify_index import ManifestBuilder
+from app.rag.docstore import DocStoreWriter, PageStoreWriter
+from app.rag.local_index import build_local_index
+from app.rag.qdrant_pool import make_sync_client, upsert_batch
+from app.rag.boilerplate import BoilerplateStats, SectionDuplicateFilter, strip_boilerplate
+from app.config import (
+    STW_LOOKUP_PATH, EMBEDDING_CACHE_DIR, SNAPSHOT_DIR, INDEX_MANIFEST_PATH,
+    DOCSTORE_DIR, LOCAL_INDEX_DIR, PAGE_STORE_DIR
+)
 
 VOLUMES = ["Vol1.pdf", "Vol2.pdf", "Vol3.pdf", "Vol4.pdf"]
 BATCH_SIZE = 100
+COLLECTION_NAME = "icmr_stw_knowledge_base"
+# Keyword payload indexes every filter (and the integrity checks) rely on
+PAYLOAD_INDEXES = ["source", "stw_name", "chapter", "volume"]
 
-def build_unified_index():
-    """Builds a unified vector index for all ICMR-STW volumes with enhanced metadata for precise retrieval."""
-
-    client = QdrantClient(url=VECTOR_DB_URL, api_key=VECTOR_DB_API_KEY)
-    collection_name = "icmr_stw_knowledge_base"
-
+def create_collection(client: QdrantClient, collection_name: str, dim: int = EMBEDDING_DIM):
+    """(Re)creates the collection with its payload indexes."""
     print(f"🚀 Recreating collection: {collection_name}")
     if client.collection_exists(collection_name):
         client.delete_collection(collection_name)
-    
+
     client.create_collection(
         collection_name=collection_name,
-        vectors_config=models.VectorParams(size=384, distance=models.Distance.COSINE),
+        vectors_config=models.VectorParams(size=dim, distance=models.Distance.COSINE),
     )
 
     # Payload indexes for optimized filtering
-    for field in ["source", "stw_name"]:
+    for field in PAYLOAD_INDEXES:
         client.create_payload_index(
             collection_name=collection_name,
             field_name=field,
             field_schema=models.PayloadSchemaType.KEYWORD,
         )
 
-    # Process each volume, chunk it, embed it, and upsert to Qdrant with rich metadata
+def build_unified_index(use_cache: bool = True, compact_cache: bool = False, clean_text: bool = True):
+    """Builds a unified vector index for all ICMR-STW volumes with enhanced metadata for precise retrieval."""
+
+    client = make_sync_client()
+    collection_name = COLLECTION_NAME
+    create_collection(client, collection_name)
+
+    # One memoised tokenizer-backed counter shared by all volumes
+    count_tokens = token_counter()
+    # Every STW seen, for the condition -> STW lookup used to scope searches
+    sections = {}
+    # Unchanged chunks reuse their vectors from earlier builds; only new text is encoded
+    cache = EmbeddingCache(EMBEDDING_CACHE_DIR, MODEL_ID, EMBEDDING_DIM) if use_cache else None
+    # A portable copy of everything upserted, so the collection can be restored without re-embedding
+    snapshot = SnapshotWriter(SNAPSHOT_DIR, MODEL_ID, EMBEDDING_DIM, collection_name)
+    # Hashes of this build's chunks (only kept when compacting the cache afterwards)
+    indexed = set()
+    # What was indexed, per volume and page, for app.rag.verify_index
+    manifest = ManifestBuilder(collection_name, MODEL_ID)
+    # Chunk texts for the serving path, keyed by point id (ids are sequential across volumes)
+    docstore = DocStoreWriter(DOCSTORE_DIR, collection_name)
+    # Small child chunks are indexed; their pages are kept whole as the context they expand to
+    pagestore = PageStoreWriter(PAGE_STORE_DIR)
+    # Repeated headers/footers/disclaimers are removed per volume, near-duplicate chunks per
+    # (volume, STW): a passage shared by two guidelines stays findable by searches scoped to either
+    boilerplate = BoilerplateStats()
+    duplicates = SectionDuplicateFilter() if clean_text else None
+
+    # Process each volume, chunk it, embed it, and upsert to Qdrant with rich metadata.
+    # Pages are extracted in parallel page-range shards and chunks stream through in batches:
+    # extraction, embedding and upload never hold a whole volume.
     for file in VOLUMES:
         filename = f"data/stw/{file}"
         if not os.path.exists(filename): continue
 
         print(f"📄 Processing: {filename}...")
         try:
-            pages_data = load_pdf_with_metadata(filename)
-            all_points = []
-
-            for page in pages_data:
-                # Chunk each page individually to keep metadata accurate
-                chunks = chunk_text(page["text"])
-                if not chunks: continue
-                
-                embeddings = embed_texts(chunks)
-
-                for i, emb in enumerate(embeddings):
-                    all_points.append(
-                        models.PointStruct(
-                            id=str(uuid.uuid4()), 
-                            vector=emb.tolist(), 
-                            payload={
-                                "text": chunks[i], 
-                                "source": file,
-                                "page_number": page["page_number"],
-                                "stw_name": page["stw_title"]
-                            }
-                        )
-                    )
-
-            # Batch Upload
-            total_points = len(all_points)
-            num_batches = math.ceil(total_points / BATCH_SIZE)
-            for i in range(num_batches):
-                start = i * BATCH_SIZE
-                end = min((i + 1) * BATCH_SIZE, total_points)
-                client.upsert(collection_name=collection_name, points=all_points[start:end])
+            total_points = 0
+            batch = []
+            pages = iter_pages_parallel(filename)
+            if clean_text:
+                pages = strip_boilerplate(pages, boilerplate)
+            pages = _record_pages(pages, file, pagestore)
+            for chunk in iter_chunks(pages, CHILD_CHUNK_MAX_TOKENS, CHILD_CHUNK_OVERLAP_TOKENS, count_tokens):
+                if chunk.get("stw_heading"):
+                    sections.setdefault((chunk["stw_title"], file), {
+                        "stw_name": chunk["stw_title"], "title": chunk["stw_heading"],
+                        "chapter": chunk.get("chapter"), "volume": chunk.get("volume")
+                    })
+                if duplicates is not None and duplicates.is_duplicate(chunk["text"], (file, chunk["stw_title"])):
+                    continue
+                batch.append(chunk)
+                if len(batch) >= BATCH_SIZE:
+                    total_points += _upsert_batch(client, collection_name, file, batch, docstore, cache, snapshot, manifest)
+                    if compact_cache:
+                        indexed.update(text_hash(c["text"]) for c in batch)
+                    batch = []
+            if batch:
+                total_points += _upsert_batch(client, collection_name, file, batch, docstore, cache, snapshot, manifest)
+                if compact_cache:
+                    indexed.update(text_hash(c["text"]) for c in batch)
 
             print(f"✅ Indexed {total_points} points for {file}.")
 
         except Exception as e:
             print(f"❌ Error: {e}")
 
+    snapshot.close()
+    docstore.close()
+    pagestore.close()
+    manifest.save(INDEX_MANIFEST_PATH)
+    _build_local_index()
+    save_lookup(build_lookup(sections.values()), STW_LOOKUP_PATH)
+    print(f"🗺️  Wrote {len({k[0] for k in sections})} STWs to {STW_LOOKUP_PATH}")
+    if clean_text:
+        report = boilerplate.as_dict()
+        print(f"✂️  Boilerplate: removed {report['blocks_removed']} blocks, {report['share_removed']:.1%} of page text "
+              f"(most frequent: {report['top_blocks'][:3]})")
+        dedup = duplicates.stats()
+        indexed_points = sum(v["count"] for v in manifest.manifest["volumes"].values())
+        print(f"🧬 Near-duplicates: dropped {dedup['duplicates_dropped']} of {dedup['chunks_seen']} chunks; "
+              f"indexed {indexed_points}")
+    if cache is not None:
+        print(f"🧠 Embedding cache: {cache.stats()}")
+        if compact_cache:
+            print(f"🧹 Compacted cache: dropped {cache.compact(keep_hashes=indexed)} stale rows")
+
+def _record_pages(pages, file: str, pagestore: PageStoreWriter):
+    for page in pages:
+        pagestore.add(file, page["page_number"], page["text"])
+        yield page
+
+def _upsert_batch(client, collection_name: str, file: str, chunks: list[dict], docstore: DocStoreWriter,
+                  cache: EmbeddingCache = None, snapshot: SnapshotWriter = None,
+                  manifest: ManifestBuilder = None) -> int:
+    """Embeds one batch of chunks in a single model call (cache misses only) and upserts it."""
+    texts = [c["text"] for c in chunks]
+    embeddings = cache.embed(texts, embed_texts) if cache is not None else embed_texts(texts)
+    # Sequential integer ids: point id == docstore row
+    first_id = docstore.manifest["count"]
+    ids = list(range(first_id, first_id + len(chunks)))
+    payloads = [
+        {
+            "text": chunk["text"],
+            "chunk_hash": text_hash(chunk["text"]),
+            "source": file,
+            "page_number": chunk["page_number"],
+            "stw_name": chunk["stw_title"],
+            "chapter": chunk.get("chapter"),
+            "volume": chunk.get("volume")
+        }
+        for chunk in chunks
+    ]
+    upsert_batch(client, collection_name, ids, embeddings, payloads)
+    docstore.add(ids, payloads)
+    if snapshot is not None:
+        snapshot.add(ids, payloads, embeddings)
+    if manifest is not None:
+        for payload in payloads:
+            manifest.add(file, payload["page_number"], payload["chunk_hash"])
+    return len(ids)
+
+def restore_from_snapshot(directory: str = SNAPSHOT_DIR, collection_name: str = COLLECTION_NAME):
+    """Recreates the collection from a snapshot: pure I/O, no PDF parsing or embedding."""
+    client = make_sync_client()
+    manifest = read_manifest(directory)
+    if manifest["model_id"] != MODEL_ID:
+        raise RuntimeError(f"Snapshot was embedded with {manifest['model_id']}, the app queries with {MODEL_ID}")
+    create_collection(client, collection_name, manifest["dim"])
+    print(f"✅ Restored {import_collection(client, collection_name, directory)} points from {directory}")
+    # The restored points are the snapshot's points: rewrite the integrity manifest and docstore to match
+    index_manifest = ManifestBuilder(collection_name, manifest["model_id"])
+    docstore = DocStoreWriter(DOCSTORE_DIR, collection_name)
+    for ids, payloads, _ in iter_snapshot(directory):
+        for payload in payloads:
+            if payload.get("chunk_hash"):
+                index_manifest.add(payload["source"], payload["page_number"], payload["chunk_hash"])
+        # Snapshots of older builds have uuid ids, which are not docstore rows
+        if docstore is not None and all(isinstance(i, int) for i in ids):
+            docstore.add(ids, payloads)
+        elif docstore is not None:
+            print("⚠️  Snapshot point ids are not docstore rows: searches will fetch payloads from Qdrant")
+            docstore = None
+    index_manifest.save(INDEX_MANIFEST_PATH)
+    if docstore is not None:
+        docstore.close()
+        _build_local_index(directory)
+
+def _build_local_index(snapshot_dir: str = SNAPSHOT_DIR):
+    """Quantized codes for the local vector backend (VECTOR_BACKEND=local)."""
+    quant = build_local_index(snapshot_dir, LOCAL_INDEX_DIR)
+    print(f"🗜️  Quantized {quant['count']} vectors to {LOCAL_INDEX_DIR} ({quant['count'] * quant['dim'] / 1024 / 1024:.1f} MiB of codes)")
+
 if __name__ == "__main__":
-    build_unified_index()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build (or restore) the unified ICMR-STW vector index.")
+    parser.add_argument("--from-snapshot", nargs="?", const=SNAPSHOT_DIR, help="Restore from a snapshot instead of rebuilding")
+    parser.add_argument("--no-cache", action="store_true", help="Re-embed every chunk")
+    parser.add_argument("--compact-cache", action="store_true", help="Drop cached vectors not used by this build")
+    parser.add_argument("--keep-boilerplate", action="store_true", help="Index repeated headers/footers and near-duplicate chunks")
+    args = parser.parse_args()
+    if args.from_snapshot:
+        restore_from_snapshot(args.from_snapshot)
+    else:
+        build_unified_index(use_cache=not args.no_cache, compact_cache=args.compact_cache,
+                            clean_text=not args.keep_boilerplate)
@@ -1,61 +1,75 @@
-from qdrant_client import QdrantClient
+import asyncio
+import time
 from qdrant_client.http import models
-from app.config import VECTOR_DB_URL, VECTOR_DB_API_KEY
+from app.rag.build_all_indeces import COLLECTION_NAME, PAYLOAD_INDEXES
+from app.rag.verify_index import load_manifest, verify_index, print_report
+from app.rag.qdrant_pool import make_async_client
+from app.config import INDEX_MANIFEST_PATH
 
-def verify_and_fix_index():
+async def verify_and_fix_index(full: bool = True):
     """
-    1. Connects to Qdrant.
-    2. Ensures the 'source' payload index exists (prevents the 400 error).
-    3. Counts points for each volume to confirm extraction.
+    Fast health report for the vector index:
+    1. Collection status and point count.
+    2. Ensures the keyword payload indexes exist (filtering without them fails with a 400).
+    3. Exact per-volume point counts (all volumes concurrently) against the build manifest.
+    4. With `full`, the chunk-level integrity check from app.rag.verify_index.
     """
-    client = QdrantClient(url=VECTOR_DB_URL, api_key=VECTOR_DB_API_KEY)
-    collection_name = "icmr_stw_knowledge_base"
+    client = make_async_client()
+    collection_name = COLLECTION_NAME
+    manifest = load_manifest(INDEX_MANIFEST_PATH)
 
     print(f"🔍 Checking collection: {collection_name}")
 
     try:
-        # STEP 1: Check if collection exists
-        info = client.get_collection(collection_name=collection_name)
-        print(f"📊 Total Points in Collection: {info.points_count}")
-
-        # STEP 2: Create Payload Index if missing (This fixes your 400 error)
-        # We wrap this in try/except because it might already exist
-        print(f"🛠️  Ensuring 'source' index exists...")
-        client.create_payload_index(
-            collection_name=collection_name,
-            field_name="source",
-            field_schema=models.PayloadSchemaType.KEYWORD,
-        )
-        print("✅ 'source' index is ready.")
+        # STEP 1: Collection status
+        info = await client.get_collection(collection_name=collection_name)
+        print(f"📊 Status: {info.status} | Points: {info.points_count} | Indexed vectors: {info.indexed_vectors_count}")
+
+        # STEP 2: Create any missing payload index
+        missing = [f for f in PAYLOAD_INDEXES if f not in (info.payload_schema or {})]
+        for field in missing:
+            print(f"🛠️  Creating missing '{field}' index...")
+            await client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field,
+                field_schema=models.PayloadSchemaType.KEYWORD,
+            )
+        print(f"✅ Payload indexes ready: {', '.join(PAYLOAD_INDEXES)}")
 
         # STEP 3: Count points per volume
-        volumes = ["Vol1.pdf", "Vol2.pdf", "Vol3.pdf", "Vol4.pdf"]
-        total_indexed = 0
-        
-        print("\n--- Volume Distribution ---")
-        for vol in volumes:
-            res = client.count(
+        volumes = list(manifest["volumes"]) if manifest else ["Vol1.pdf", "Vol2.pdf", "Vol3.pdf", "Vol4.pdf"]
+        counts = await asyncio.gather(*(
+            client.count(
                 collection_name=collection_name,
                 count_filter=models.Filter(
-                    must=[
-                        models.FieldCondition(
-                            key="source",
-                            match=models.MatchValue(value=vol)
-                        )
-                    ]
-                )
+                    must=[models.FieldCondition(key="source", match=models.MatchValue(value=vol))]
+                ),
+                exact=True
             )
-            print(f"📄 {vol}: {res.count} points")
-            total_indexed += res.count
+            for vol in volumes
+        ))
+
+        print("\n--- Volume Distribution ---")
+        for vol, res in zip(volumes, counts):
+            expected = manifest["volumes"][vol]["count"] if manifest else None
+            status = "" if expected is None else (" ✅" if res.count == expected else f" ❌ (built {expected})")
+            print(f"📄 {vol}: {res.count} points{status}")
+
+        if manifest is None:
+            print(f"\n⚠️  No index manifest at {INDEX_MANIFEST_PATH}: counts cannot be checked. Rebuild the index to create one.")
+            return
 
-        if total_indexed < 1000:
-            print("\n⚠️  WARNING: Point count is very low for 4 volumes.")
-            print("Your 'build_unified_index.py' likely stopped after the first file or failed on extraction.")
-        else:
-            print("\n✨ Extraction appears successful and indexed.")
+        # STEP 4: Chunk-level verification
+        if full:
+            print("\n--- Chunk Integrity ---")
+            t0 = time.perf_counter()
+            reports = await verify_index(client, manifest, collection_name)
+            print_report(reports, time.perf_counter() - t0)
 
     except Exception as e:
         print(f"❌ Critical Error: {e}")
+    finally:
+        await client.close()
 
 if __name__ == "__main__":
-    verify_and_fix_index()
\ No newline at end of file
+    asyncio.run(verify_and_fix_index())
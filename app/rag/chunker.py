@@ -1,28 +1,167 @@
 import re
+from typing import Callable, Iterable, Iterator
+
+# Chunk budget in embedding-model tokens (all-MiniLM-L6-v2 truncates at 256 including [CLS]/[SEP])
+CHUNK_MAX_TOKENS = 200
+CHUNK_OVERLAP_TOKENS = 40
+# Child chunks for parent-child retrieval: small for precise matching, expanded to their page when retrieved
+CHILD_CHUNK_MAX_TOKENS = 96
+CHILD_CHUNK_OVERLAP_TOKENS = 16
+
+# A dose and its unit must land in the same chunk: "500 mg", "10-20 mg/kg/day", "0.1 mL / kg", "5 %"
+_DOSE = re.compile(
+    r"\d+(?:\.\d+)?(?:\s*(?:-|–|to)\s*\d+(?:\.\d+)?)?\s*"
+    r"(?:mg|mcg|µg|μg|g|kg|ml|mL|L|IU|units?|U|mEq|mmol|%|drops?|tabs?|puffs?)"
+    r"(?:\s*/\s*(?:kg|m2|m²|day|d|dose|hr|h|hour|min|ml|mL|L|dL))*"
+    r"(?![A-Za-z])"
+)
+_WORD = re.compile(r"\S+")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?]) +")
+
+
+def token_counter(tokenizer=None) -> Callable[[str], int]:
+    """
+    Returns a memoised word -> token count function. Defaults to the embedding model's own
+    tokenizer, so chunk budgets match what the embedder actually sees. WordPiece splits on
+    whitespace first, so per-word counts add up to the count for the whole chunk.
+    """
+    if tokenizer is None:
+        from app.rag.embeddings import load_model
+        tokenizer = load_model().tokenizer
+    cache: dict[str, int] = {}
+
+    def count(word: str) -> int:
+        n = cache.get(word)
+        if n is None:
+            n = cache[word] = len(tokenizer.tokenize(word))
+        return n
+    return count
+
+
+def _units(text: str, count_tokens: Callable[[str], int], max_tokens: int) -> Iterator[tuple[int, int, int, bool]]:
+    """
+    Yields atomic units of `text` as (start, end, tokens, starts_sentence).
+    A unit is a word, or a whole dose expression spanning several words.
+    """
+    sentence_starts = {0} | {m.end() for m in _SENTENCE_BREAK.finditer(text)}
+    doses = [m.span() for m in _DOSE.finditer(text)]
+    dose_i = 0
+    words = _WORD.finditer(text)
+    for word in words:
+        start, end = word.span()
+        # Extend the unit to the end of any dose expression that starts inside this word
+        while dose_i < len(doses) and doses[dose_i][1] <= start:
+            dose_i += 1
+        if dose_i < len(doses) and doses[dose_i][0] < end < doses[dose_i][1]:
+            dose_end = doses[dose_i][1]
+            for word in words:
+                end = word.end()
+                if end >= dose_end:
+                    break
+
+        n = count_tokens(text[start:end])
+        if n <= max_tokens:
+            yield start, end, n, start in sentence_starts
+            continue
+        # A single unbroken string longer than the budget (tables, URLs): hard-split by characters.
+        # Each token covers at least one character, so max_tokens characters never exceed the budget.
+        for piece in range(start, end, max_tokens):
+            piece_end = min(piece + max_tokens, end)
+            yield piece, piece_end, count_tokens(text[piece:piece_end]), piece == start and start in sentence_starts
+
+
+def _overlap_tail(window: list, overlap_tokens: int) -> list:
+    """
+    The units carried into the next chunk: at most `overlap_tokens`, starting at a sentence
+    boundary when one falls inside that budget, and always shorter than the window itself.
+    """
+    budget, start, sentence_start = 0, len(window), None
+    for i in range(len(window) - 1, 0, -1):
+        budget += window[i][2]
+        if budget > overlap_tokens:
+            break
+        start = i
+        if window[i][3]:
+            sentence_start = i
+    return window[sentence_start if sentence_start is not None else start:]
+
+
+def _sentences(units: Iterator[tuple]) -> Iterator[list]:
+    sentence = []
+    for unit in units:
+        if unit[3] and sentence:
+            yield sentence
+            sentence = []
+        sentence.append(unit)
+    if sentence:
+        yield sentence
+
+
+def iter_text_chunks(
+    text: str,
+    max_tokens: int = CHUNK_MAX_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+    count_tokens: Callable[[str], int] = None
+) -> Iterator[str]:
+    """
+    Sentence-aware sliding-window chunking bounded by token count.
+    Whole sentences are packed while they fit; a sentence longer than the budget is split
+    between words (never inside a dose expression). Consecutive chunks share up to
+    `overlap_tokens` tokens. Chunks are slices of the normalised text, not concatenations.
+    """
+    count_tokens = count_tokens or token_counter()
+    # Normalize extra whitespace
+    text = re.sub(r"\s+", " ", text).strip()
+
+    window, total, fresh = [], 0, False
+
+    def flush():
+        nonlocal window, total, fresh
+        chunk = text[window[0][0]:window[-1][1]]
+        window = _overlap_tail(window, overlap_tokens)
+        total = sum(u[2] for u in window)
+        fresh = False
+        return chunk
+
+    for sentence in _sentences(_units(text, count_tokens, max_tokens)):
+        if fresh and total + sum(u[2] for u in sentence) > max_tokens:
+            yield flush()
+        for unit in sentence:
+            if total + unit[2] > max_tokens:
+                if fresh:
+                    yield flush()
+                # The carried-over tail might still leave no room for this unit
+                if total + unit[2] > max_tokens:
+                    window, total = [], 0
+            window.append(unit)
+            total += unit[2]
+            fresh = True
+    if fresh:
+        yield text[window[0][0]:window[-1][1]]
+
+
+def iter_chunks(
+    pages: Iterable[dict],
+    max_tokens: int = CHUNK_MAX_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+    count_tokens: Callable[[str], int] = None
+) -> Iterator[dict]:
+    """
+    Streams pages (as yielded by the loader) into chunks, one page at a time, so a whole
+    volume is never held in memory. Each chunk keeps its page's metadata.
+    """
+    count_tokens = count_tokens or token_counter()
+    for page in pages:
+        text = page.get("text", "")
+        # Positioned blocks are the loader's raw material, not chunk metadata
+        meta = {k: v for k, v in page.items() if k not in ("text", "blocks")}
+        for chunk in iter_text_chunks(text, max_tokens, overlap_tokens, count_tokens):
+            yield {**meta, "text": chunk}
+
 
 def chunk_text(text: str, chunk_size: int = 600, overlap: int = 150) -> list[str]:
     """
-    Semantic chunking: Normalizes whitespace and splits by sentences 
-    to preserve context.
-    """
-    # Normalize extra whitespace and mid-word hyphens
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Split by sentences (looks for period followed by space)
-    sentences = re.split(r'(?<=[.!?]) +', text)
-    
-    chunks = []
-    current_chunk = ""
-    
-    for sentence in sentences:
-        if len(current_chunk) + len(sentence) <= chunk_size:
-            current_chunk += sentence + " "
-        else:
-            chunks.append(current_chunk.strip())
-            # Overlap: simple implementation starts new chunk with the current sentence
-            current_chunk = sentence + " "
-            
-    if current_chunk:
-        chunks.append(current_chunk.strip())
-        
-    return chunks
\ No newline at end of file
+    Semantic chunking: Normalizes whitespace and splits by sentences
+    to preserve context. Sizes are in characters; use iter_text_chunks for token budgets.
+    """
+    return list(iter_text_chunks(text, chunk_size, overlap, count_tokens=lambda word: len(word) + 1))
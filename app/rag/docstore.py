@@ -0,0 +1,168 @@
+"""
+Local, memory-mapped chunk store: chunk text and citation metadata keyed by point id.
+The page store next to it holds each page's (cleaned) text keyed by (source, page_number),
+the parent context that retrieved child chunks are expanded to.
+
+Layout:
+    <dir>/manifest.json   {"count", "collection"}
+    <dir>/text.bin        chunk texts, concatenated UTF-8
+    <dir>/text.idx        uint64 offsets into text.bin (count + 1 of them)
+    <dir>/meta.bin        citation metadata (source, page, STW, ...), one JSON object per row
+    <dir>/meta.idx        uint64 offsets into meta.bin
+
+The index builder gives points sequential integer ids and writes row `id` of this store for
+each of them, so searches only need ids and scores back from Qdrant. Rows are read by slicing
+the memory maps: nothing is loaded up front and forked workers share the pages.
+"""
+import json
+import mmap
+import os
+from typing import Optional
+import numpy as np
+from app.core.serialization import dumps, loads
+
+MANIFEST = "manifest.json"
+# Payload fields kept in meta.bin; everything else stays in Qdrant only
+META_FIELDS = ("source", "page_number", "stw_name", "chapter", "volume", "chunk_hash")
+
+
+class DocStoreWriter:
+    """Appends rows in point-id order; written to a temp dir and swapped in on close()."""
+    def __init__(self, directory: str, collection: str = None):
+        self.directory = directory
+        self.tmp = directory.rstrip("/") + ".tmp"
+        os.makedirs(self.tmp, exist_ok=True)
+        self.manifest = {"count": 0, "collection": collection}
+        self._files = {name: open(os.path.join(self.tmp, name), "wb") for name in ("text.bin", "meta.bin")}
+        self._offsets = {"text": [0], "meta": [0]}
+
+    def add(self, ids: list[int], payloads: list[dict]):
+        if ids and ids[0] != self.manifest["count"]:
+            raise ValueError(f"Docstore rows must follow point ids: expected {self.manifest['count']}, got {ids[0]}")
+        for payload in payloads:
+            self._write("text", payload["text"].encode("utf-8"))
+            self._write("meta", dumps({k: payload.get(k) for k in META_FIELDS}))
+        self.manifest["count"] += len(ids)
+
+    def _write(self, column: str, data: bytes):
+        self._files[f"{column}.bin"].write(data)
+        self._offsets[column].append(self._offsets[column][-1] + len(data))
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        for column, offsets in self._offsets.items():
+            np.asarray(offsets, dtype=np.uint64).tofile(os.path.join(self.tmp, f"{column}.idx"))
+        with open(os.path.join(self.tmp, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+        _swap_into(self.tmp, self.directory)
+
+
+def _swap_into(tmp: str, directory: str):
+    """Replaces `directory` with the finished `tmp` dir, so readers never see a half-written store."""
+    if os.path.exists(directory):
+        old = directory.rstrip("/") + ".old"
+        os.replace(directory, old)
+        os.replace(tmp, directory)
+        for name in os.listdir(old):
+            os.remove(os.path.join(old, name))
+        os.rmdir(old)
+    else:
+        os.replace(tmp, directory)
+
+
+class _Column:
+    def __init__(self, directory: str, name: str):
+        self.offsets = np.memmap(os.path.join(directory, f"{name}.idx"), dtype=np.uint64, mode="r")
+        with open(os.path.join(directory, f"{name}.bin"), "rb") as f:
+            # mmap cannot map an empty file
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+        self._view = memoryview(self._map)
+
+    def __getitem__(self, row: int) -> memoryview:
+        return self._view[int(self.offsets[row]):int(self.offsets[row + 1])]
+
+
+class DocStore:
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, MANIFEST), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self._text = _Column(directory, "text")
+        self._meta = _Column(directory, "meta")
+
+    def __len__(self):
+        return self.manifest["count"]
+
+    def text(self, point_id: int) -> str:
+        return str(self._text[point_id], "utf-8")
+
+    def get(self, point_id, chunk_hash: str = None) -> Optional[dict]:
+        """
+        The stored payload for a point ({"text", "source", "page_number", ...}), or None when the
+        id is not a row here, or `chunk_hash` shows the row belongs to a different build.
+        """
+        if not isinstance(point_id, int) or not 0 <= point_id < len(self):
+            return None
+        meta = loads(bytes(self._meta[point_id]))
+        if chunk_hash is not None and meta.get("chunk_hash") != chunk_hash:
+            return None
+        return {"text": self.text(point_id), **meta}
+
+
+def load_docstore(directory: str) -> Optional[DocStore]:
+    """The docstore at `directory`, or None if the index was built without one."""
+    try:
+        return DocStore(directory)
+    except (OSError, ValueError):
+        return None
+
+
+# --- Page store (parents of the indexed chunks) ---
+class PageStoreWriter:
+    """Page texts in arrival order, whitespace-normalised like the chunker's input, so chunks are substrings."""
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.tmp = directory.rstrip("/") + ".tmp"
+        os.makedirs(self.tmp, exist_ok=True)
+        self.keys: list[list] = []
+        self._text = open(os.path.join(self.tmp, "text.bin"), "wb")
+        self._offsets = [0]
+
+    def add(self, source: str, page_number: int, text: str):
+        data = " ".join(text.split()).encode("utf-8")
+        self._text.write(data)
+        self._offsets.append(self._offsets[-1] + len(data))
+        self.keys.append([source, page_number])
+
+    def close(self):
+        self._text.close()
+        np.asarray(self._offsets, dtype=np.uint64).tofile(os.path.join(self.tmp, "text.idx"))
+        with open(os.path.join(self.tmp, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump({"count": len(self.keys), "keys": self.keys}, f)
+        _swap_into(self.tmp, self.directory)
+
+
+class PageStore:
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, MANIFEST), encoding="utf-8") as f:
+            keys = json.load(f)["keys"]
+        self._rows = {(source, page): row for row, (source, page) in enumerate(keys)}
+        self._text = _Column(directory, "text")
+
+    def __len__(self):
+        return len(self._rows)
+
+    def keys(self):
+        """(source, page_number) of every stored page."""
+        return self._rows.keys()
+
+    def get(self, source: str, page_number) -> Optional[str]:
+        row = self._rows.get((source, page_number))
+        return None if row is None else str(self._text[row], "utf-8")
+
+
+def load_page_store(directory: str) -> Optional[PageStore]:
+    try:
+        return PageStore(directory)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,110 @@
+"""
+Persistent, content-addressed embedding cache for index builds.
+
+Layout (one directory per embedding model):
+    <cache_dir>/<model_id>/vectors.f32   append-only float32 rows, memory-mapped for reads
+    <cache_dir>/<model_id>/index.tsv     append-only "text_hash<TAB>row" lines
+
+A chunk's vector is looked up by the hash of its text, so re-running the builder after a
+collection reset, or after re-chunking one volume, only encodes chunks whose text changed.
+"""
+import hashlib
+import os
+from typing import Callable, Iterable
+import numpy as np
+
+
+def text_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, directory: str, model_id: str, dim: int):
+        self.dim = dim
+        self.directory = os.path.join(directory, model_id.replace("/", "__"))
+        os.makedirs(self.directory, exist_ok=True)
+        self.vectors_path = os.path.join(self.directory, "vectors.f32")
+        self.index_path = os.path.join(self.directory, "index.tsv")
+        self.hits = 0
+        self.misses = 0
+        self._index: dict[str, int] = {}
+        self._rows = 0
+        self._mmap = None
+        self._load()
+
+    def _load(self):
+        row_bytes = self.dim * 4
+        self._rows = os.path.getsize(self.vectors_path) // row_bytes if os.path.exists(self.vectors_path) else 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding="utf-8") as f:
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    # Ignore a torn last line, or rows whose vector never made it to disk
+                    if len(parts) == 2 and parts[1].isdigit() and int(parts[1]) < self._rows:
+                        self._index[parts[0]] = int(parts[1])
+        self._mmap = None
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, text: str) -> bool:
+        return text_hash(text) in self._index
+
+    def _vectors(self) -> np.ndarray:
+        # Re-map lazily after appends; reads never copy the file into memory
+        if self._mmap is None or self._mmap.shape[0] < self._rows:
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self._rows, self.dim)) \
+                if self._rows else np.zeros((0, self.dim), dtype=np.float32)
+        return self._mmap
+
+    def _append(self, hashes: list[str], vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        # Vectors first, then the index lines that point at them: a crash in between only leaves unreferenced rows
+        with open(self.vectors_path, "ab") as f:
+            # Drop a torn partial row from an interrupted build so rows stay aligned
+            f.truncate(self._rows * self.dim * 4)
+            f.write(vectors.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            for i, h in enumerate(hashes):
+                self._index[h] = self._rows + i
+                f.write(f"{h}\t{self._rows + i}\n")
+        self._rows += len(hashes)
+
+    def embed(self, texts: list[str], embed_fn: Callable[[list[str]], np.ndarray]) -> np.ndarray:
+        """Vectors for `texts`: cached rows where present, one `embed_fn` call for all misses."""
+        hashes = [text_hash(t) for t in texts]
+        missing = {}
+        for i, h in enumerate(hashes):
+            if h not in self._index and h not in missing:
+                missing[h] = i
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+
+        if missing:
+            self._append(list(missing), embed_fn([texts[i] for i in missing.values()]))
+        rows = np.fromiter((self._index[h] for h in hashes), dtype=np.int64, count=len(hashes))
+        return np.asarray(self._vectors()[rows])
+
+    def compact(self, keep_hashes: Iterable[str] = None) -> int:
+        """
+        Rewrites the cache without duplicate or orphaned rows, optionally keeping only the given
+        text hashes (e.g. the chunks of the latest build). Returns the number of rows dropped.
+        """
+        live = self._index if keep_hashes is None else {h: self._index[h] for h in keep_hashes if h in self._index}
+        before = self._rows
+        vectors = self._vectors()
+        with open(self.vectors_path + ".tmp", "wb") as vf, open(self.index_path + ".tmp", "w", encoding="utf-8") as xf:
+            for new_row, (h, row) in enumerate(live.items()):
+                vf.write(np.ascontiguousarray(vectors[row]).tobytes())
+                xf.write(f"{h}\t{new_row}\n")
+        self._mmap = None
+        os.replace(self.vectors_path + ".tmp", self.vectors_path)
+        os.replace(self.index_path + ".tmp", self.index_path)
+        self._index = {}
+        self._load()
+        return before - self._rows
+
+    def stats(self) -> dict:
+        return {"entries": len(self._index), "rows": self._rows, "hits": self.hits, "misses": self.misses}
@@ -1,20 +1,50 @@
 import os
-from sentence_transformers import SentenceTransformer
+import threading
 import numpy as np
 
 # Point to a local directory inside your container
 MODEL_PATH = "./model_cache/all-MiniLM-L6-v2"
+# Identifies the vector space (embedding caches and index snapshots are only valid for this model)
+MODEL_ID = "all-MiniLM-L6-v2"
+EMBEDDING_DIM = 384
+
+# torch and sentence_transformers are imported with the model, not with this module,
+# so the webhook can ack before the ML stack is loaded
+_model = None
+_model_lock = threading.Lock()
+
+
+def load_model():
+    """
+    Loads the embedding model once per process (thread-safe: the startup warm-up and the first
+    request may race). Under gunicorn's preload_app this runs in the master before forking, so
+    every worker shares the weights copy-on-write instead of loading its own.
+    """
+    global _model
+    if _model is not None:
+        return _model
+    with _model_lock:
+        if _model is None:
+            from sentence_transformers import SentenceTransformer
+            # Check if local model exists, otherwise it will try to download (only during build)
+            if os.path.exists(MODEL_PATH):
+                model = SentenceTransformer(MODEL_PATH)
+            else:
+                # This branch should only run during your Docker build step
+                model = SentenceTransformer(MODEL_ID)
+            # Inference only: no autograd state that would dirty shared pages
+            model.eval()
+            _model = model
+    return _model
+
+
+def model_loaded() -> bool:
+    return _model is not None
 
-# Check if local model exists, otherwise it will try to download (only during build)
-if os.path.exists(MODEL_PATH):
-    _model = SentenceTransformer(MODEL_PATH)
-else:
-    # This branch should only run during your Docker build step
-    _model = SentenceTransformer("all-MiniLM-L6-v2")
 
 def embed_texts(texts: list[str]) -> np.ndarray:
     """
     Generates embeddings for a list of texts using the SentenceTransformer model.
     The model is loaded from a local path to avoid repeated downloads, ensuring efficient embedding generation for the RAG system.
     """
-    return _model.encode(texts, convert_to_numpy=True)
+    return load_model().encode(texts, convert_to_numpy=True)
@@ -1,6 +1,24 @@
 import json
 from app.llm.groq_client import call_groq
-from app.rag.retriever import retrieve_relevant_chunks
+from app.rag.retriever import retrieve_for_intent
+from app.core.telemetry import current_trace, traced_stage
+
+
+def build_context(chunks_with_metadata: list[dict]) -> str:
+    """Builds the prompt context with Precision Reference IDs and records them on the current trace."""
+    trace = current_trace()
+    context_blocks = []
+    for chunk in chunks_with_metadata:
+        vol = chunk.get('source', 'Vol_X').replace('.pdf', '').replace('Vol', 'Vol_')
+        stw = chunk.get('stw_name', 'Guideline').replace(' ', '_')
+        pg = chunk.get('page_number', 'NA')
+        
+        ref_id = f"ICMR-STW-{vol}-{stw}:Pg_no:{pg}"
+        context_blocks.append(f"[REF_ID: {ref_id}]\n{chunk['text']}")
+        if trace is not None:
+            trace.record_retrieval(ref_id, chunk.get('score'))
+    
+    return "\n\n---\n\n".join(context_blocks)
 
 async def explain_with_strict_rag(
     query: str, 
@@ -11,21 +29,12 @@ async def explain_with_strict_rag(
     """
     Clinical Explainer. It Uses Hierarchical Domain Mapping and Probabilistic Ranking.
     """
-    # 1. Retrieve clinical data (using the domain-aware expanded search)
-    search_term = expanded_search if expanded_search else query
-    chunks_with_metadata = await retrieve_relevant_chunks(search_term)
+    # 1. Retrieve clinical data: the raw query plus one search per ranked condition, fused
+    with traced_stage("retrieval"):
+        chunks_with_metadata = await retrieve_for_intent(query, intent_data, expanded_search)
     
     # 2. Build context with Precision Reference IDs
-    context_blocks = []
-    for chunk in chunks_with_metadata:
-        vol = chunk.get('source', 'Vol_X').replace('.pdf', '').replace('Vol', 'Vol_')
-        stw = chunk.get('stw_name', 'Guideline').replace(' ', '_')
-        pg = chunk.get('page_number', 'NA')
-        
-        ref_id = f"ICMR-STW-{vol}-{stw}:Pg_no:{pg}"
-        context_blocks.append(f"[REF_ID: {ref_id}]\n{chunk['text']}")
-    
-    context = "\n\n---\n\n".join(context_blocks)
+    context = build_context(chunks_with_metadata)
 
     # 3. Hierarchical Probability Prompt
     prompt = f"""
@@ -71,28 +80,21 @@ async def explain_with_strict_rag(
        - If the drug dose or rule differs for other related conditions (e.g., Sinusitis vs. Pharyngitis), list them in ranked order of probability.
     """
 
-    return await call_groq(
-        messages=[{"role": "user", "content": prompt}],
-        model="llama-3.3-70b-versatile",
-        temperature=0, 
-        response_format="text"
-    )
+    with traced_stage("llm_answer"):
+        return await call_groq(
+            messages=[{"role": "user", "content": prompt}],
+            model="llama-3.3-70b-versatile",
+            temperature=0, 
+            response_format="text"
+        )
 
-async def explain_with_hybrid_rag(query: str, expanded_search: str = None) -> str:
+async def explain_with_hybrid_rag(query: str, expanded_search: str = None, intent_data: dict = None) -> str:
     # 1. Retrieve RAG chunks
-    chunks_with_metadata = await retrieve_relevant_chunks(expanded_search or query)
+    with traced_stage("retrieval"):
+        chunks_with_metadata = await retrieve_for_intent(query, intent_data, expanded_search)
     
     # 2. Build context with Precision Reference IDs (Same as strict mode)
-    context_blocks = []
-    for chunk in chunks_with_metadata:
-        vol = chunk.get('source', 'Vol_X').replace('.pdf', '').replace('Vol', 'Vol_')
-        stw = chunk.get('stw_name', 'Guideline').replace(' ', '_')
-        pg = chunk.get('page_number', 'NA')
-        
-        ref_id = f"ICMR-STW-{vol}-{stw}:Pg_no:{pg}"
-        context_blocks.append(f"[REF_ID: {ref_id}]\n{chunk['text']}")
-    
-    context = "\n\n---\n\n".join(context_blocks)
+    context = build_context(chunks_with_metadata)
 
     prompt = f"""
     SYSTEM: You are a Clinical Research Assistant. 
@@ -111,8 +113,9 @@ async def explain_with_hybrid_rag(query: str, expanded_search: str = None) -> st
     4. Provide clear, bulleted drug dosages and protocols.
     """
 
-    return await call_groq(
-        messages=[{"role": "user", "content": prompt}],
-        model="llama-3.3-70b-versatile",
-        temperature=0.2
-    )
\ No newline at end of file
+    with traced_stage("llm_answer"):
+        return await call_groq(
+            messages=[{"role": "user", "content": prompt}],
+            model="llama-3.3-70b-versatile",
+            temperature=0.2
+        )
\ No newline at end of file
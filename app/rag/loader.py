@@ -1,52 +1,159 @@
-import fitz  # PyMuPDF
+import os
 import re
-from typing import List, Dict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional
+from app.rag.sections import SectionMap, scan_headings, sections_from_headings, slugify, volume_name
+
+# Pages per unit of work when several processes extract one volume
+SHARD_PAGES = 32
+
+
+def _extract_page(page, page_num: int) -> Dict:
+    """Text and STW title of one PyMuPDF page."""
+    # Get text blocks to preserve reading order of columns
+    blocks = page.get_text("blocks")
+    # Sort blocks: Primary sort by vertical position (y1),
+    # Secondary sort by horizontal (x0) to handle multi-column clinical tables
+    blocks.sort(key=lambda b: (b[1], b[0]))
+
+    page_text_lines = []
+    # (vertical position as a fraction of page height, text) per block, for boilerplate detection
+    positioned = []
+    height = page.rect.height or 1.0
+    for b in blocks:
+        # block[4] is the text content
+        clean_line = b[4].replace("\n", " ").strip()
+        if clean_line:
+            page_text_lines.append(clean_line)
+            positioned.append((round(b[1] / height, 3), clean_line))
+
+    # Join the text for the current page
+    page_content = "\n".join(page_text_lines)
+
+    # --- STW Title Detection Logic ---
+    # We assume the first significant line of a page is often the STW title or header.
+    # We clean it to be used in a REF_ID (remove spaces/special chars)
+    stw_title = "General_Guideline"
+    if page_text_lines:
+        # Look at the first 2 lines to find a valid title, skipping common noise
+        for line in page_text_lines[:2]:
+            if len(line) > 3 and not line.isdigit():
+                # Clean the title: Replace spaces/slashes with underscores
+                stw_title = re.sub(r'[^a-zA-Z0-9]', '_', line).strip('_')
+                break
+
+    return {
+        "page_number": page_num,
+        "stw_title": stw_title,
+        "text": page_content,
+        "blocks": positioned
+    }
+
+
+def page_count(pdf_path: str) -> int:
+    import fitz  # PyMuPDF: only needed when indexing, kept off the serving import path
+    with fitz.open(pdf_path) as doc:
+        return doc.page_count
+
+
+def _volume_sections(doc, headings: Optional[list] = None) -> SectionMap:
+    """The outline's sections, or (without an outline) sections from the volume's headings."""
+    sections = SectionMap.from_toc(doc.get_toc(simple=True))
+    if sections:
+        return sections
+    return sections_from_headings(scan_headings(doc) if headings is None else headings)
+
+
+def _with_section(data: Dict, sections: SectionMap, volume: str) -> Dict:
+    section = sections.lookup(data["page_number"])
+    if section["stw"]:
+        # Otherwise keep the first-line guess from _extract_page
+        data["stw_title"] = slugify(section["stw"])
+    data["stw_heading"] = section["stw"]
+    data["chapter"] = section["chapter"]
+    data["volume"] = volume
+    return data
+
+
+def iter_pages(pdf_path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict]:
+    """
+    Lazily yields pages [start, stop) (0-based) of a PDF, one at a time: memory stays O(page).
+    Page numbers in the yielded dicts are 1-based, as everywhere else.
+    Each page carries its section from the outline/headings (see app.rag.sections):
+    'stw_title' (slug used as stw_name), 'stw_heading', 'chapter' and 'volume'.
+    """
+    import fitz  # PyMuPDF: only needed when indexing, kept off the serving import path
+    volume = volume_name(pdf_path)
+    with fitz.open(pdf_path) as doc:
+        sections = _volume_sections(doc)
+        stop = doc.page_count if stop is None else min(stop, doc.page_count)
+        for page_index in range(start, stop):
+            yield _with_section(_extract_page(doc.load_page(page_index), page_index + 1), sections, volume)
+
+
+def page_shards(total_pages: int, shard_pages: int = SHARD_PAGES) -> List[tuple[int, int]]:
+    """Splits [0, total_pages) into disjoint, contiguous (start, stop) page ranges."""
+    return [(start, min(start + shard_pages, total_pages)) for start in range(0, total_pages, shard_pages)]
+
+
+def _extract_shard(args: tuple[str, int, int]) -> List[Dict]:
+    """Pages of one shard without sections: those are assigned in the parent, across shards."""
+    import fitz
+    pdf_path, start, stop = args
+    with fitz.open(pdf_path) as doc:
+        return [_extract_page(doc.load_page(i), i + 1) for i in range(start, min(stop, doc.page_count))]
+
+
+def _scan_shard(args: tuple[str, int, int]) -> list:
+    import fitz
+    pdf_path, start, stop = args
+    with fitz.open(pdf_path) as doc:
+        return scan_headings(doc, start, stop)
+
+
+def iter_pages_parallel(pdf_path: str, workers: Optional[int] = None, shard_pages: int = SHARD_PAGES) -> Iterator[Dict]:
+    """
+    Yields the pages of one volume in order, extracted by `workers` processes that each open
+    the PDF and parse disjoint page ranges. At most two shards per worker are in flight,
+    so memory stays bounded by shard size rather than volume size.
+    Volumes without an outline get a first parallel pass that only collects headings; the
+    parent builds the section map from all of them and assigns every page its section, so the
+    result is the same as iter_pages().
+    """
+    import fitz
+    workers = workers or os.cpu_count() or 1
+    shards = page_shards(page_count(pdf_path), shard_pages)
+    if workers <= 1 or len(shards) <= 1:
+        yield from iter_pages(pdf_path)
+        return
+
+    volume = volume_name(pdf_path)
+    with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as pool:
+        with fitz.open(pdf_path) as doc:
+            has_outline = bool(SectionMap.from_toc(doc.get_toc(simple=True)))
+            headings = None if has_outline else [
+                h for shard in pool.map(_scan_shard, [(pdf_path, start, stop) for start, stop in shards]) for h in shard
+            ]
+            sections = _volume_sections(doc, headings)
+
+        pending = []
+        next_shard = 0
+        while next_shard < len(shards) or pending:
+            while next_shard < len(shards) and len(pending) < 2 * workers:
+                start, stop = shards[next_shard]
+                pending.append(pool.submit(_extract_shard, (pdf_path, start, stop)))
+                next_shard += 1
+            # Yield in page order: wait on the oldest shard
+            for data in pending.pop(0).result():
+                yield _with_section(data, sections, volume)
+
 
 def load_pdf_with_metadata(pdf_path: str) -> List[Dict]:
     """
-    Extracts text from PDF by blocks while preserving page numbers and 
+    Extracts text from PDF by blocks while preserving page numbers and
     detecting potential STW titles from headers.
-    
+
     Returns:
         List[Dict]: A list of dictionaries containing 'page_number', 'stw_title', and 'text'.
     """
-    doc = fitz.open(pdf_path)
-    pages_data = []
-
-    for page_num, page in enumerate(doc, start=1):
-        # Get text blocks to preserve reading order of columns
-        blocks = page.get_text("blocks")
-        # Sort blocks: Primary sort by vertical position (y1), 
-        # Secondary sort by horizontal (x0) to handle multi-column clinical tables
-        blocks.sort(key=lambda b: (b[1], b[0])) 
-        
-        page_text_lines = []
-        for b in blocks:
-            # block[4] is the text content
-            clean_line = b[4].replace("\n", " ").strip()
-            if clean_line:
-                page_text_lines.append(clean_line)
-
-        # Join the text for the current page
-        page_content = "\n".join(page_text_lines)
-        
-        # --- STW Title Detection Logic ---
-        # We assume the first significant line of a page is often the STW title or header.
-        # We clean it to be used in a REF_ID (remove spaces/special chars)
-        stw_title = "General_Guideline"
-        if page_text_lines:
-            # Look at the first 2 lines to find a valid title, skipping common noise
-            for line in page_text_lines[:2]:
-                if len(line) > 3 and not line.isdigit():
-                    # Clean the title: Replace spaces/slashes with underscores
-                    stw_title = re.sub(r'[^a-zA-Z0-9]', '_', line).strip('_')
-                    break
-
-        pages_data.append({
-            "page_number": page_num,
-            "stw_title": stw_title,
-            "text": page_content
-        })
-
-    doc.close()
-    return pages_data
\ No newline at end of file
+    return list(iter_pages(pdf_path))
@@ -0,0 +1,227 @@
+"""
+Self-hosted vector search over the build's snapshot, without Qdrant.
+
+The chunk vectors are stored as int8-range scalar-quantized codes (one byte per dimension,
+per-dimension min/max scaling of the unit-normalised vectors: 4x smaller than float32).
+A search scores every code with vectorized NumPy, keeps a shortlist of
+`RESCORE_FACTOR * top_k` candidates, and rescores those exactly against the full float32
+vectors, read on demand from the snapshot's memory map.
+
+Layout (built from a snapshot whose point ids are its row numbers, see build_all_indeces):
+    <dir>/quant.json     {"count", "dim", "model_id", "stw_names"}
+    <dir>/codes.u8       uint8 codes, count x dim
+    <dir>/scale.f32      per-dimension scale and offset (2 x dim)
+    <dir>/stw_ids.u16    STW of each row (index into stw_names), for scoped searches
+
+Codes and full vectors are memory maps, so forked workers share one copy of each.
+"""
+import asyncio
+import json
+import os
+from typing import Optional
+import numpy as np
+from app.rag.snapshot import VECTORS, iter_snapshot, read_manifest
+
+QUANT = "quant.json"
+CODES = "codes.u8"
+SCALE = "scale.f32"
+STW_IDS = "stw_ids.u16"
+# Candidates rescored exactly per result
+RESCORE_FACTOR = 4
+# Rows scored per block, bounding the float32 temporary
+SCORE_BLOCK_ROWS = 8192
+NO_STW = 0xFFFF
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def build_local_index(snapshot_dir: str, directory: str, block_rows: int = SCORE_BLOCK_ROWS) -> dict:
+    """Quantizes a snapshot's vectors into `directory`; returns the written quant.json contents."""
+    manifest = read_manifest(snapshot_dir)
+    count, dim = manifest["count"], manifest["dim"]
+    stw_names: dict[str, int] = {}
+    stw_ids = np.full(count, NO_STW, dtype=np.uint16)
+    row = 0
+    for ids, payloads, _ in iter_snapshot(snapshot_dir):
+        if ids != list(range(row, row + len(ids))):
+            raise ValueError("Snapshot point ids are not row numbers: rebuild the index to use the local backend")
+        for i, payload in enumerate(payloads):
+            name = payload.get("stw_name")
+            if name is not None:
+                stw_ids[row + i] = stw_names.setdefault(name, len(stw_names))
+        row += len(ids)
+
+    vectors = np.memmap(os.path.join(snapshot_dir, VECTORS), dtype=np.float32, mode="r", shape=(count, dim)) \
+        if count else np.zeros((0, dim), dtype=np.float32)
+    lo = np.full(dim, np.inf, dtype=np.float32)
+    hi = np.full(dim, -np.inf, dtype=np.float32)
+    for start in range(0, count, block_rows):
+        block = _normalise(vectors[start:start + block_rows])
+        lo, hi = np.minimum(lo, block.min(axis=0)), np.maximum(hi, block.max(axis=0))
+    if not count:
+        lo, hi = np.zeros(dim, dtype=np.float32), np.ones(dim, dtype=np.float32)
+    scale = np.maximum(hi - lo, 1e-12) / 255.0
+
+    tmp = directory.rstrip("/") + ".tmp"
+    os.makedirs(tmp, exist_ok=True)
+    with open(os.path.join(tmp, CODES), "wb") as f:
+        for start in range(0, count, block_rows):
+            block = _normalise(vectors[start:start + block_rows])
+            f.write(np.clip(np.rint((block - lo) / scale), 0, 255).astype(np.uint8).tobytes())
+    np.stack([scale, lo]).astype(np.float32).tofile(os.path.join(tmp, SCALE))
+    stw_ids.tofile(os.path.join(tmp, STW_IDS))
+    quant = {"count": count, "dim": dim, "model_id": manifest["model_id"], "stw_names": list(stw_names)}
+    with open(os.path.join(tmp, QUANT), "w", encoding="utf-8") as f:
+        json.dump(quant, f)
+
+    if os.path.exists(directory):
+        old = directory.rstrip("/") + ".old"
+        os.replace(directory, old)
+        os.replace(tmp, directory)
+        for name in os.listdir(old):
+            os.remove(os.path.join(old, name))
+        os.rmdir(old)
+    else:
+        os.replace(tmp, directory)
+    return quant
+
+
+class LocalIndex:
+    def __init__(self, directory: str, snapshot_dir: str):
+        with open(os.path.join(directory, QUANT), encoding="utf-8") as f:
+            self.quant = json.load(f)
+        self.count, self.dim = self.quant["count"], self.quant["dim"]
+        self.snapshot_dir = snapshot_dir
+        if read_manifest(snapshot_dir)["count"] != self.count:
+            raise ValueError(f"{directory} was not quantized from the snapshot in {snapshot_dir}: rebuild it")
+        self._stw_index = {name: i for i, name in enumerate(self.quant["stw_names"])}
+        scale, lo = np.fromfile(os.path.join(directory, SCALE), dtype=np.float32).reshape(2, self.dim)
+        self.scale, self.lo = scale, lo
+        self.codes = np.memmap(os.path.join(directory, CODES), dtype=np.uint8, mode="r", shape=(self.count, self.dim)) \
+            if self.count else np.zeros((0, self.dim), dtype=np.uint8)
+        self.stw_ids = np.fromfile(os.path.join(directory, STW_IDS), dtype=np.uint16)
+        self._vectors = None
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Full-precision vectors, mapped on first rescore."""
+        if self._vectors is None:
+            self._vectors = np.memmap(os.path.join(self.snapshot_dir, VECTORS), dtype=np.float32, mode="r",
+                                      shape=(self.count, self.dim)) if self.count else np.zeros((0, self.dim), np.float32)
+        return self._vectors
+
+    def scope_mask(self, stw_names) -> Optional[np.ndarray]:
+        """Rows belonging to the given STWs (None = no restriction)."""
+        if not stw_names:
+            return None
+        wanted = [self._stw_index[n] for n in stw_names if n in self._stw_index]
+        return np.isin(self.stw_ids, np.array(wanted, dtype=np.uint16))
+
+    def _top(self, scores: np.ndarray, k: int) -> np.ndarray:
+        k = min(k, scores.shape[0])
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64)
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top], kind="stable")]
+
+    def approximate_scores(self, queries: np.ndarray) -> np.ndarray:
+        """Cosine estimates from the codes for every row: (count x n_queries)."""
+        queries = _normalise(queries).reshape(-1, self.dim)
+        # code * scale + lo reconstructs each vector, so q . v = code . (q * scale) + q . lo
+        weights = (queries * self.scale).T
+        bias = queries @ self.lo
+        scores = np.empty((self.count, queries.shape[0]), dtype=np.float32)
+        for start in range(0, self.count, SCORE_BLOCK_ROWS):
+            block = self.codes[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+            scores[start:start + block.shape[0]] = block @ weights + bias
+        return scores
+
+    def search(self, queries: np.ndarray, top_k: int, stw_scopes: list = None,
+               rescore: int = RESCORE_FACTOR) -> list[list[tuple[int, float]]]:
+        """
+        (row, cosine) hits per query: quantized scoring over all rows, exact rescoring of the
+        shortlist. `stw_scopes[i]` restricts query i to those STWs; `rescore=0` skips rescoring.
+        """
+        queries = _normalise(queries).reshape(-1, self.dim)
+        approx = self.approximate_scores(queries)
+        stw_scopes = stw_scopes or [None] * len(queries)
+        results = []
+        for i, (query, scope) in enumerate(zip(queries, stw_scopes)):
+            scores = approx[:, i]
+            mask = self.scope_mask(scope)
+            if mask is not None:
+                scores = np.where(mask, scores, -np.inf)
+            candidates = self._top(scores, top_k * rescore if rescore else top_k)
+            candidates = candidates[np.isfinite(scores[candidates])]
+            if rescore:
+                rows = np.sort(candidates)
+                exact = _normalise(self.vectors[rows]) @ query
+                order = self._top(exact, top_k)
+                results.append([(int(rows[j]), float(exact[j])) for j in order])
+            else:
+                results.append([(int(r), float(scores[r])) for r in candidates])
+        return results
+
+    def search_exact(self, queries: np.ndarray, top_k: int, stw_scopes: list = None) -> list[list[tuple[int, float]]]:
+        """Brute-force float32 search over the full vectors (reference for recall)."""
+        queries = _normalise(queries).reshape(-1, self.dim)
+        stw_scopes = stw_scopes or [None] * len(queries)
+        scores = np.empty((self.count, queries.shape[0]), dtype=np.float32)
+        for start in range(0, self.count, SCORE_BLOCK_ROWS):
+            scores[start:start + SCORE_BLOCK_ROWS] = _normalise(self.vectors[start:start + SCORE_BLOCK_ROWS]) @ queries.T
+        results = []
+        for i, scope in enumerate(stw_scopes):
+            column = scores[:, i]
+            mask = self.scope_mask(scope)
+            if mask is not None:
+                column = np.where(mask, column, -np.inf)
+            top = self._top(column, top_k)
+            results.append([(int(r), float(column[r])) for r in top if np.isfinite(column[r])])
+        return results
+
+    def memory_bytes(self) -> dict:
+        return {"codes": self.count * self.dim, "float32": self.count * self.dim * 4}
+
+
+class LocalVectorStore:
+    """
+    VectorStore-compatible search over a LocalIndex, with payloads from the docstore.
+    The NumPy scan and rescoring run in a worker thread (NumPy releases the GIL), not on the event loop.
+    """
+    def __init__(self, index: LocalIndex, docstore):
+        self.index = index
+        self.docstore = docstore
+
+    def _payloads(self, hits: list[tuple[int, float]]) -> list[dict]:
+        return [{**(self.docstore.get(row) or {}), "id": row, "score": score} for row, score in hits]
+
+    async def search(self, query_embedding, top_k: int = 7, stw_names: list[str] = None) -> list[dict]:
+        from app.config import STW_FILTER_MIN_SCORE
+        if stw_names:
+            scoped = (await asyncio.to_thread(self.index.search, np.asarray(query_embedding), top_k, [stw_names]))[0]
+            if scoped and scoped[0][1] >= STW_FILTER_MIN_SCORE:
+                return self._payloads(scoped)
+        return self._payloads((await asyncio.to_thread(self.index.search, np.asarray(query_embedding), top_k))[0])
+
+    async def search_batch(self, query_embeddings, top_k: int = 7, stw_scopes: list = None) -> list[list[dict]]:
+        from app.config import STW_FILTER_MIN_SCORE
+        query_embeddings = np.asarray(query_embeddings)
+        stw_scopes = stw_scopes or [None] * len(query_embeddings)
+        results = await asyncio.to_thread(self.index.search, query_embeddings, top_k, stw_scopes)
+        # Weak scoped results fall back to the whole corpus, as in search()
+        weak = [i for i, (scope, hits) in enumerate(zip(stw_scopes, results))
+                if scope and not (hits and hits[0][1] >= STW_FILTER_MIN_SCORE)]
+        if weak:
+            for i, hits in zip(weak, await asyncio.to_thread(self.index.search, query_embeddings[weak], top_k)):
+                results[i] = hits
+        return [self._payloads(hits) for hits in results]
+
+
+def load_local_store(directory: str, snapshot_dir: str, docstore) -> LocalVectorStore:
+    if docstore is None:
+        raise RuntimeError("The local vector backend needs the docstore written by the index builder")
+    return LocalVectorStore(LocalIndex(directory, snapshot_dir), docstore)
@@ -0,0 +1,113 @@
+"""
+Qdrant clients with shared transport settings.
+
+The serving path uses one process-wide AsyncQdrantClient: a keep-alive REST connection pool,
+or a gRPC channel with QDRANT_PREFER_GRPC=1 (binary protobuf instead of JSON for vectors and
+scored points). It is created on first use, dropped after a fork and closed in the app lifespan.
+Scripts (index builder, snapshots, integrity checks) build their own clients with the same
+settings through make_sync_client() / make_async_client().
+
+The batch helpers are shared by the builder (upserts) and the vector store (searches).
+"""
+from typing import Optional
+from app.config import (
+    VECTOR_DB_URL, VECTOR_DB_API_KEY, QDRANT_PREFER_GRPC, QDRANT_GRPC_PORT, QDRANT_TIMEOUT, QDRANT_HTTP_KEEPALIVE
+)
+
+# Queries sent per query_batch_points call
+SEARCH_BATCH_MAX = 32
+# gRPC pings keep idle channels open through load balancers between requests
+GRPC_OPTIONS = {"grpc.keepalive_time_ms": 60_000, "grpc.keepalive_timeout_ms": 10_000}
+
+_async_client = None
+
+
+def client_options(prefer_grpc: bool = None, url: str = None) -> dict:
+    import httpx
+    return {
+        "url": url or VECTOR_DB_URL,
+        "api_key": VECTOR_DB_API_KEY,
+        "prefer_grpc": QDRANT_PREFER_GRPC if prefer_grpc is None else prefer_grpc,
+        "grpc_port": QDRANT_GRPC_PORT,
+        "grpc_options": GRPC_OPTIONS,
+        "timeout": QDRANT_TIMEOUT,
+        # qdrant-client disables keep-alive for localhost by default; always pool connections
+        "limits": httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=QDRANT_HTTP_KEEPALIVE),
+    }
+
+
+def make_sync_client(**overrides):
+    from qdrant_client import QdrantClient
+    return QdrantClient(**client_options(**overrides))
+
+
+def make_async_client(**overrides):
+    from qdrant_client import AsyncQdrantClient
+    return AsyncQdrantClient(**client_options(**overrides))
+
+
+def get_async_client():
+    """The process-wide async client used for retrieval."""
+    global _async_client
+    if _async_client is None:
+        _async_client = make_async_client()
+    return _async_client
+
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        client, _async_client = _async_client, None
+        await client.close()
+
+
+def reset_after_fork():
+    """Drops a client inherited from the parent process so the worker opens its own connections."""
+    global _async_client
+    _async_client = None
+
+
+# --- Batch helpers ---
+def point_structs(ids: list, vectors, payloads: list[dict]) -> list:
+    from qdrant_client.http import models
+    return [
+        models.PointStruct(id=point_id, vector=vector.tolist() if hasattr(vector, "tolist") else vector, payload=payload)
+        for point_id, vector, payload in zip(ids, vectors, payloads)
+    ]
+
+
+def upsert_batch(client, collection: str, ids: list, vectors, payloads: list[dict], wait: bool = True) -> int:
+    """One upsert call for a batch of points (sync client)."""
+    client.upsert(collection_name=collection, points=point_structs(ids, vectors, payloads), wait=wait)
+    return len(ids)
+
+
+async def upsert_batch_async(client, collection: str, ids: list, vectors, payloads: list[dict], wait: bool = True) -> int:
+    await client.upsert(collection_name=collection, points=point_structs(ids, vectors, payloads), wait=wait)
+    return len(ids)
+
+
+def stw_filter(stw_names: Optional[list]):
+    from qdrant_client.http import models
+    if not stw_names:
+        return None
+    return models.Filter(must=[models.FieldCondition(key="stw_name", match=models.MatchAny(any=list(stw_names)))])
+
+
+async def search_batch(client, collection: str, vectors, top_k: int, filters: list = None, with_payload=True) -> list:
+    """
+    Scored points for several query vectors, SEARCH_BATCH_MAX per query_batch_points round trip.
+    `filters[i]` (a models.Filter or None) applies to query i.
+    """
+    from qdrant_client.http import models
+    filters = filters or [None] * len(vectors)
+    requests = [
+        models.QueryRequest(query=vector.tolist() if hasattr(vector, "tolist") else vector,
+                            filter=query_filter, limit=top_k, with_payload=with_payload)
+        for vector, query_filter in zip(vectors, filters)
+    ]
+    results = []
+    for start in range(0, len(requests), SEARCH_BATCH_MAX):
+        responses = await client.query_batch_points(collection_name=collection, requests=requests[start:start + SEARCH_BATCH_MAX])
+        results.extend(response.points for response in responses)
+    return results
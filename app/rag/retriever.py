@@ -1,16 +1,180 @@
 from app.rag.embeddings import embed_texts
-from app.rag.vector_store import VectorStore
+from app.core.telemetry import traced_stage
+from app.rag.sections import ConditionLookup, scope_from_intent
+from app.config import (
+    STW_LOOKUP_PATH, DOCSTORE_DIR, VECTOR_BACKEND, LOCAL_INDEX_DIR, SNAPSHOT_DIR,
+    PAGE_STORE_DIR, PARENT_EXPANSION, PARENT_MAX_BLOCKS, PARENT_MAX_CHARS
+)
 
-async def retrieve_relevant_chunks(query: str, top_k: int = 15) -> list[dict]:
+COLLECTION_NAME = "icmr_stw_knowledge_base"
+# Reciprocal-rank fusion: rank damping constant and per-query weights by condition probability
+RRF_K = 60
+RAW_QUERY_WEIGHT = 1.0
+CONDITION_WEIGHTS = {"high": 1.0, "medium": 0.6, "low": 0.3}
+# One store (and Qdrant connection pool) per process, reused across queries
+_store = None
+# Condition -> STW lookup written by the index builder (empty if the index predates it)
+_lookup = None
+# Page texts that child chunks expand to (None if the index predates the page store)
+_pages = None
+_pages_loaded = False
+
+
+def get_vector_store():
+    """Returns the process-wide VectorStore for the unified collection established for the 4 volumes."""
+    global _store
+    if _store is None:
+        # Imported on first use: qdrant_client is heavy and not needed to ack webhooks
+        from app.rag.docstore import load_docstore
+        if VECTOR_BACKEND == "local":
+            from app.rag.local_index import load_local_store
+            _store = load_local_store(LOCAL_INDEX_DIR, SNAPSHOT_DIR, load_docstore(DOCSTORE_DIR))
+        else:
+            from app.rag.vector_store import VectorStore
+            _store = VectorStore(collection_name=COLLECTION_NAME, docstore=load_docstore(DOCSTORE_DIR))
+    return _store
+
+
+def get_condition_lookup() -> ConditionLookup:
+    global _lookup
+    if _lookup is None:
+        _lookup = ConditionLookup.load(STW_LOOKUP_PATH)
+    return _lookup
+
+
+def get_page_store():
+    global _pages, _pages_loaded
+    if not _pages_loaded:
+        from app.rag.docstore import load_page_store
+        _pages = load_page_store(PAGE_STORE_DIR)
+        _pages_loaded = True
+    return _pages
+
+
+def search_scope(intent_data: dict) -> list[str]:
+    """stw_name values to restrict retrieval to, from the intent classifier's output."""
+    return scope_from_intent(intent_data, get_condition_lookup())
+
+
+def preload_stores():
+    """Maps the docstore, page store and (VECTOR_BACKEND=local) quantized index; called in the master before forking."""
+    get_vector_store()
+    get_page_store()
+    get_condition_lookup()
+
+
+def reset_after_fork():
+    """
+    Keeps stores inherited from the parent: they are read-only memory maps, shared copy-on-write.
+    The shared Qdrant client is reset in app.rag.qdrant_pool; only a store holding its own client is dropped.
+    """
+    global _store
+    if getattr(_store, "_client", None) is not None:
+        _store = None
+
+
+async def retrieve_relevant_chunks(query: str, top_k: int = 15, stw_names: list[str] = None) -> list[dict]:
     """
     Retrieves clinical guidelines from the unified knowledge base.
     Returns a list of dictionaries containing 'text' and 'source'.
+    `stw_names` narrows the search to those guidelines (falling back to the whole corpus).
     """
-    # Uses the unified collection established for the 4 volumes
-    store = VectorStore(collection_name="icmr_stw_knowledge_base")
+    store = get_vector_store()
     
     # Generate embedding for the clinical query
-    query_embedding = embed_texts([query])
+    with traced_stage("embed"):
+        query_embedding = embed_texts([query])
     
     # Returns the list of payloads (dicts) from VectorStore
-    return await store.search(query_embedding, top_k)
\ No newline at end of file
+    with traced_stage("vector_search"):
+        return await store.search(query_embedding, top_k, stw_names=stw_names)
+
+
+def reciprocal_rank_fusion(result_lists: list[list[dict]], weights: list[float], top_k: int, k: int = RRF_K) -> list[dict]:
+    """
+    Fuses ranked result lists: each chunk scores sum(weight / (k + rank)) over the lists it appears in.
+    Chunks keep their best similarity as 'score' and gain 'rrf_score'.
+    """
+    fused: dict = {}
+    for results, weight in zip(result_lists, weights):
+        for rank, chunk in enumerate(results, start=1):
+            key = chunk.get("id") or (chunk.get("source"), chunk.get("page_number"), chunk.get("text"))
+            entry = fused.get(key)
+            if entry is None:
+                entry = fused[key] = {**chunk, "rrf_score": 0.0}
+            elif chunk.get("score", 0) > entry.get("score", 0):
+                entry["score"] = chunk["score"]
+            entry["rrf_score"] += weight / (k + rank)
+    return sorted(fused.values(), key=lambda c: c["rrf_score"], reverse=True)[:top_k]
+
+
+def _excerpt(page_text: str, children: list[str], max_chars: int) -> str:
+    """The page, or when it is too long, the stretch of it around the retrieved children."""
+    if len(page_text) <= max_chars:
+        return page_text
+    spans = [(i, i + len(c)) for c in children if (i := page_text.find(c)) >= 0]
+    if not spans:
+        return page_text[:max_chars]
+    start, end = min(s for s, _ in spans), max(e for _, e in spans)
+    # Centre the window on the children, then widen it to the budget on both sides
+    margin = max((max_chars - (end - start)) // 2, 0)
+    start = max(0, min(start - margin, len(page_text) - max_chars))
+    return page_text[start:start + max_chars]
+
+
+def expand_to_parents(chunks: list[dict], page_store=None, max_parents: int = PARENT_MAX_BLOCKS,
+                      max_chars: int = PARENT_MAX_CHARS) -> list[dict]:
+    """
+    Replaces ranked child chunks with their pages, in order of each page's best hit: several
+    hits on one page become one context block. Pages missing from the store keep their
+    child chunks' text. Each parent records how many children pointed at it ('child_hits').
+    """
+    if page_store is None:
+        return chunks
+    parents: dict = {}
+    children: dict = {}
+    for chunk in chunks:
+        key = (chunk.get("source"), chunk.get("page_number"))
+        children.setdefault(key, []).append(chunk["text"])
+        if key in parents:
+            parents[key]["child_hits"] += 1
+            continue
+        if len(parents) < max_parents:
+            parents[key] = {**chunk, "child_hits": 1}
+    for key, parent in parents.items():
+        page_text = page_store.get(*key)
+        parent["text"] = _excerpt(page_text, children[key], max_chars) if page_text else " ... ".join(children[key])
+    return list(parents.values())
+
+
+async def retrieve_for_intent(query: str, intent_data: dict = None, expanded_search: str = None, top_k: int = 15) -> list[dict]:
+    """
+    Differential-aware retrieval: one query for the raw text plus one per ranked condition
+    (each scoped to its own guideline when the lookup knows it), embedded in one model call,
+    searched in one batched round trip and fused with probability-weighted RRF.
+    Without ranked conditions this is a single (scoped) search, as before.
+    """
+    children = await _retrieve_children(query, intent_data, expanded_search, top_k)
+    # Small chunks match precisely; the prompt gets their pages, deduplicated
+    return expand_to_parents(children, get_page_store()) if PARENT_EXPANSION else children
+
+
+async def _retrieve_children(query: str, intent_data: dict, expanded_search: str, top_k: int) -> list[dict]:
+    conditions = [c for c in (intent_data or {}).get("ranked_conditions", []) if isinstance(c, dict) and c.get("name")]
+    if not conditions:
+        return await retrieve_relevant_chunks(expanded_search or query, top_k, stw_names=search_scope(intent_data))
+
+    lookup = get_condition_lookup()
+    queries, weights, scopes = [query], [RAW_QUERY_WEIGHT], [None]
+    for condition in conditions:
+        queries.append(condition["name"])
+        weights.append(CONDITION_WEIGHTS.get(str(condition.get("probability", "")).lower(), CONDITION_WEIGHTS["low"]))
+        stw_name = lookup.resolve(condition["name"])
+        scopes.append([stw_name] if stw_name else None)
+
+    store = get_vector_store()
+    with traced_stage("embed"):
+        query_embeddings = embed_texts(queries)
+    with traced_stage("vector_search"):
+        result_lists = await store.search_batch(query_embeddings, top_k, stw_scopes=scopes)
+    return reciprocal_rank_fusion(result_lists, weights, top_k)
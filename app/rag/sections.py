@@ -0,0 +1,205 @@
+"""
+Section map for the STW volumes: which guideline (STW), chapter and volume every page belongs to.
+
+Built from the PDF outline (`doc.get_toc()`): level-1 entries are chapters, level-2 entries
+are individual STWs (a one-level outline is read as STWs). Volumes without a usable outline
+fall back to heading detection: a line near the top of a page set clearly larger than the
+page's body text starts a new section. Headings are collected for the whole volume first
+(in parallel by the loader), so the chapter level comes from the volume's heading sizes and
+every page range gets the same sections however the volume is split.
+
+The index builder also writes a condition -> STW lookup (INDEX_DIR/stw_lookup.json) so the
+retriever can restrict a search to the guidelines the intent classifier points at.
+"""
+import bisect
+import json
+import os
+import re
+import statistics
+from typing import Iterable, Optional
+
+# A heading is at least this much larger than the page's median body font size...
+HEADING_SIZE_RATIO = 1.25
+# ...and starts in the top part of the page
+HEADING_TOP_FRACTION = 0.3
+# Headings within this factor of a volume's largest heading size are chapter headings
+CHAPTER_SIZE_RATIO = 1.1
+# Token-set overlap needed to map a free-text condition name onto an STW title
+CONDITION_MATCH_THRESHOLD = 0.6
+_STOPWORDS = {"the", "of", "and", "in", "with", "for", "a", "an", "to", "acute", "chronic"}
+
+
+def slugify(title: str) -> str:
+    """'Acute Rhinosinusitis (ARS)' -> 'Acute_Rhinosinusitis_ARS': the stw_name payload form."""
+    return re.sub(r"[^a-zA-Z0-9]+", "_", title).strip("_")
+
+
+def volume_name(pdf_path: str) -> str:
+    """'data/stw/Vol1.pdf' -> 'Vol1'"""
+    return os.path.splitext(os.path.basename(pdf_path))[0]
+
+
+class SectionMap:
+    """Page number (1-based) -> {"stw", "chapter"} from the outline's page ranges."""
+    def __init__(self, entries: list[tuple[int, str, Optional[str]]]):
+        # (start_page, stw_title, chapter_title), sorted by start page
+        self.entries = sorted(entries, key=lambda e: e[0])
+        self._starts = [e[0] for e in self.entries]
+
+    @classmethod
+    def from_toc(cls, toc: list) -> "SectionMap":
+        levels = {level for level, _, _ in toc}
+        stw_level = 2 if 2 in levels else 1
+        entries, chapter = [], None
+        for level, title, page in toc:
+            title = " ".join(title.split())
+            if page < 1:
+                continue
+            if level < stw_level:
+                chapter = title
+                # A chapter's own pages (before its first STW) belong to the chapter
+                entries.append((page, None, chapter))
+            elif level == stw_level:
+                entries.append((page, title, chapter))
+        return cls(entries)
+
+    def __bool__(self):
+        return bool(self.entries)
+
+    def lookup(self, page_number: int) -> dict:
+        i = bisect.bisect_right(self._starts, page_number) - 1
+        if i < 0:
+            return {"stw": None, "chapter": None}
+        _, stw, chapter = self.entries[i]
+        return {"stw": stw, "chapter": chapter}
+
+
+def detect_heading(page) -> Optional[tuple[str, float]]:
+    """
+    The first line near the top of a page whose font is clearly larger than the page's body text,
+    as (text, font size); None if the page has no such heading.
+    """
+    lines = []
+    for block in page.get_text("dict").get("blocks", []):
+        for line in block.get("lines", []):
+            spans = [s for s in line.get("spans", []) if s.get("text", "").strip()]
+            if spans:
+                text = " ".join(s["text"].strip() for s in spans)
+                lines.append((line["bbox"][1], max(s["size"] for s in spans), text, sum(len(s["text"]) for s in spans)))
+    if len(lines) < 2:
+        return None
+
+    # Body size: the median size weighted by characters
+    sizes = [size for _, size, _, chars in lines for _ in range(min(chars, 200))]
+    body = statistics.median(sizes)
+    top = page.rect.height * HEADING_TOP_FRACTION
+    for y, size, text, _ in sorted(lines):
+        if y > top:
+            break
+        if size >= body * HEADING_SIZE_RATIO and len(text) > 3 and not text.isdigit():
+            return " ".join(text.split()), size
+    return None
+
+
+def scan_headings(doc, start: int = 0, stop: Optional[int] = None) -> list[tuple[int, str, float]]:
+    """(page number, heading, font size) for every page in [start, stop) (0-based) that has a heading."""
+    stop = doc.page_count if stop is None else min(stop, doc.page_count)
+    headings = []
+    for page_index in range(start, stop):
+        heading = detect_heading(doc.load_page(page_index))
+        if heading:
+            headings.append((page_index + 1, *heading))
+    return headings
+
+
+def sections_from_headings(headings: list[tuple[int, str, float]]) -> SectionMap:
+    """
+    Section map for a volume without an outline, from all of its detected headings in page order.
+    When the headings come in more than one size, those at the volume's largest size are chapters
+    and the rest STWs; a single size means every heading is an STW (like a one-level outline).
+    """
+    entries, chapter = [], None
+    largest = max((size for _, _, size in headings), default=0.0)
+    two_levels = any(size * CHAPTER_SIZE_RATIO < largest for _, _, size in headings)
+    for page_number, text, size in sorted(headings, key=lambda h: h[0]):
+        if two_levels and size * CHAPTER_SIZE_RATIO >= largest:
+            chapter = text
+            entries.append((page_number, None, chapter))
+        else:
+            entries.append((page_number, text, chapter))
+    return SectionMap(entries)
+
+
+# --- Condition -> STW lookup ---
+def _tokens(text: str) -> set[str]:
+    return {t for t in re.findall(r"[a-z0-9]+", text.lower()) if t not in _STOPWORDS}
+
+
+def build_lookup(sections: Iterable[dict]) -> dict:
+    """
+    sections: {"stw_name", "title", "chapter", "volume"} per STW seen while indexing.
+    Returns the JSON-serialisable lookup written next to the index.
+    """
+    stws = {}
+    for section in sections:
+        entry = stws.setdefault(section["stw_name"], {
+            "title": section["title"], "chapter": section.get("chapter"), "volumes": []
+        })
+        if section.get("volume") and section["volume"] not in entry["volumes"]:
+            entry["volumes"].append(section["volume"])
+    return {"version": 1, "stws": stws}
+
+
+def save_lookup(lookup: dict, path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(lookup, f, indent=2, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+
+
+class ConditionLookup:
+    """Maps classifier output (condition names or STW names) to indexed stw_name values."""
+    def __init__(self, lookup: dict):
+        self.stws = lookup.get("stws", {})
+        self._tokens = {name: _tokens(entry["title"]) for name, entry in self.stws.items()}
+        self._by_slug = {name.lower(): name for name in self.stws}
+
+    @classmethod
+    def load(cls, path: str) -> "ConditionLookup":
+        try:
+            with open(path, encoding="utf-8") as f:
+                return cls(json.load(f))
+        except (OSError, ValueError):
+            return cls({})
+
+    def resolve(self, name: str) -> Optional[str]:
+        slug = slugify(name).lower()
+        if slug in self._by_slug:
+            return self._by_slug[slug]
+        wanted = _tokens(name)
+        if not wanted:
+            return None
+        best, best_score = None, 0.0
+        for stw_name, tokens in self._tokens.items():
+            # Also matches selector names with a domain prefix, e.g. 'ENT_Acute_Rhinosinusitis'
+            score = len(wanted & tokens) / min(len(wanted), len(tokens) or 1)
+            if score > best_score:
+                best, best_score = stw_name, score
+        return best if best_score >= CONDITION_MATCH_THRESHOLD else None
+
+    def resolve_all(self, names: Iterable[str]) -> list[str]:
+        resolved = []
+        for name in names:
+            stw_name = self.resolve(name)
+            if stw_name and stw_name not in resolved:
+                resolved.append(stw_name)
+        return resolved
+
+
+def scope_from_intent(intent_data: dict, lookup: "ConditionLookup") -> list[str]:
+    """stw_name filter values for a query, from the classifier's ranked_conditions and/or selector rankings."""
+    if not intent_data:
+        return []
+    names = [c.get("name", "") for c in intent_data.get("ranked_conditions", []) if isinstance(c, dict)]
+    names += [r.get("stw", "") for r in intent_data.get("rankings", []) if isinstance(r, dict)]
+    return lookup.resolve_all(n for n in names if n)
@@ -0,0 +1,129 @@
+"""
+Portable index snapshots: every point's id, payload and vector, independent of any vector store.
+
+Layout:
+    <dir>/manifest.json   {"model_id", "dim", "count", "collection"}
+    <dir>/payloads.jsonl  one {"id": ..., "payload": {...}} per point
+    <dir>/vectors.f32     float32 rows in the same order
+
+The index builder writes a snapshot as it indexes. Restoring a collection (after a reset, or
+on a new Qdrant cluster) is then an upload, with no PDF parsing or embedding.
+
+Usage:
+    python -m app.rag.snapshot export index_data/snapshot     # from the live collection
+    python -m app.rag.snapshot import index_data/snapshot     # recreate the collection from disk
+"""
+import argparse
+import json
+import os
+from typing import Iterator
+import numpy as np
+from app.core.serialization import dumps, loads
+
+MANIFEST = "manifest.json"
+PAYLOADS = "payloads.jsonl"
+VECTORS = "vectors.f32"
+
+
+class SnapshotWriter:
+    """Streams points to a snapshot directory; written to a temp dir and swapped in on close()."""
+    def __init__(self, directory: str, model_id: str, dim: int, collection: str = None):
+        self.directory = directory
+        self.tmp = directory.rstrip("/") + ".tmp"
+        os.makedirs(self.tmp, exist_ok=True)
+        self.manifest = {"model_id": model_id, "dim": dim, "count": 0, "collection": collection}
+        self._payloads = open(os.path.join(self.tmp, PAYLOADS), "wb")
+        self._vectors = open(os.path.join(self.tmp, VECTORS), "wb")
+
+    def add(self, ids: list, payloads: list[dict], vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.manifest["dim"])
+        self._payloads.write(b"".join(dumps({"id": i, "payload": p}) + b"\n" for i, p in zip(ids, payloads)))
+        self._vectors.write(vectors.tobytes())
+        self.manifest["count"] += len(ids)
+
+    def close(self):
+        self._payloads.close()
+        self._vectors.close()
+        with open(os.path.join(self.tmp, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+        if os.path.exists(self.directory):
+            old = self.directory.rstrip("/") + ".old"
+            os.replace(self.directory, old)
+            os.replace(self.tmp, self.directory)
+            for name in os.listdir(old):
+                os.remove(os.path.join(old, name))
+            os.rmdir(old)
+        else:
+            os.replace(self.tmp, self.directory)
+
+
+def read_manifest(directory: str) -> dict:
+    with open(os.path.join(directory, MANIFEST), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def iter_snapshot(directory: str, batch_size: int = 256) -> Iterator[tuple[list, list[dict], np.ndarray]]:
+    """Yields (ids, payloads, vectors) batches; vectors are read through a memory map."""
+    manifest = read_manifest(directory)
+    count, dim = manifest["count"], manifest["dim"]
+    vectors = np.memmap(os.path.join(directory, VECTORS), dtype=np.float32, mode="r", shape=(count, dim)) \
+        if count else np.zeros((0, dim), dtype=np.float32)
+    ids, payloads, start = [], [], 0
+    with open(os.path.join(directory, PAYLOADS), "rb") as f:
+        for line in f:
+            record = loads(line)
+            ids.append(record["id"])
+            payloads.append(record["payload"])
+            if len(ids) == batch_size:
+                yield ids, payloads, np.asarray(vectors[start:start + len(ids)])
+                start += len(ids)
+                ids, payloads = [], []
+    if ids:
+        yield ids, payloads, np.asarray(vectors[start:start + len(ids)])
+
+
+def export_collection(client, collection: str, directory: str, model_id: str, dim: int, batch_size: int = 256) -> int:
+    """Scrolls a live Qdrant collection (payloads + vectors) into a snapshot."""
+    writer = SnapshotWriter(directory, model_id, dim, collection)
+    offset = None
+    while True:
+        points, offset = client.scroll(collection_name=collection, limit=batch_size, offset=offset,
+                                       with_payload=True, with_vectors=True)
+        if points:
+            writer.add([p.id for p in points], [p.payload for p in points], np.array([p.vector for p in points]))
+        if offset is None:
+            break
+    writer.close()
+    return writer.manifest["count"]
+
+
+def import_collection(client, collection: str, directory: str, batch_size: int = 256) -> int:
+    """Uploads a snapshot into an (already created) Qdrant collection."""
+    from app.rag.qdrant_pool import upsert_batch
+    total = 0
+    for ids, payloads, vectors in iter_snapshot(directory, batch_size):
+        total += upsert_batch(client, collection, ids, vectors, payloads)
+    return total
+
+
+def main():
+    from app.rag.qdrant_pool import make_sync_client
+    from app.rag.embeddings import MODEL_ID, EMBEDDING_DIM
+    from app.rag.build_all_indeces import COLLECTION_NAME, restore_from_snapshot
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("directory")
+    parser.add_argument("--collection", default=COLLECTION_NAME)
+    args = parser.parse_args()
+
+    client = make_sync_client()
+    if args.command == "export":
+        count = export_collection(client, args.collection, args.directory, MODEL_ID, EMBEDDING_DIM)
+        print(f"✅ Exported {count} points to {args.directory}")
+    else:
+        restore_from_snapshot(args.directory, args.collection)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,62 +1,44 @@
 import asyncio
-from qdrant_client import QdrantClient
-from qdrant_client.http import models
-from app.rag.loader import load_pdf_text
-from app.config import VECTOR_DB_URL, VECTOR_DB_API_KEY
+import os
+import time
+from app.rag.loader import page_count
+from app.rag.verify_index import load_manifest, verify_index, print_report
+from app.rag.qdrant_pool import make_async_client
+from app.config import INDEX_MANIFEST_PATH
 
 async def validate_pdf_integrity():
     """
-    This script validates the integrity of the PDF extraction and indexing process by:
-    1. Loading the original PDF text to get the expected head and tail snippets.
-    2. Scrolling through the Qdrant collection to retrieve all chunks for each volume.
-    3. Checking if the head and tail snippets are present in the retrieved chunks, confirming that the entire document was processed and indexed correctly.
-    This is crucial for ensuring that the RAG system functions correctly.
+    Validates the PDF extraction and indexing process end to end:
+    1. Checks the build manifest covers each volume up to its last page (extraction did not stop early).
+    2. Streams every indexed chunk of every volume (paginated async scrolls, volumes concurrently)
+       and compares the chunk hashes and per-page counts against the manifest.
+    Any missing, extra or duplicate chunk is reported with the pages it belongs to.
     """
-    client = QdrantClient(url=VECTOR_DB_URL, api_key=VECTOR_DB_API_KEY)
-    collection = "icmr_stw_knowledge_base"
-    volumes = ["Vol1.pdf", "Vol2.pdf", "Vol3.pdf", "Vol4.pdf"]
+    manifest = load_manifest(INDEX_MANIFEST_PATH)
+    if manifest is None:
+        print(f"❌ No index manifest at {INDEX_MANIFEST_PATH}: rebuild the index to create one")
+        return
 
-    print(f"🕵️ Starting Boundary Integrity Test (No Index Required)...")
+    print(f"🕵️ Starting Index Integrity Test...")
 
-    for vol in volumes:
+    for vol, entry in manifest["volumes"].items():
         path = f"data/stw/{vol}"
-        try:
-            # 1. Load local text to get the 'expected' end of the file
-            full_text = load_pdf_text(path)
-            # Normalize whitespace to match the chunker's behavior
-            clean_full_text = " ".join(full_text.split())
-            
-            # The last 200 characters of the PDF
-            expected_tail_snippet = clean_full_text[-200:]
-
-            # 2. Scroll to get the points for this volume
-            # We fetch a few points to see if the 'tail' is among them
-            points, _ = client.scroll(
-                collection_name=collection,
-                scroll_filter=models.Filter(
-                    must=[models.FieldCondition(key="source", match=models.MatchValue(value=vol))]
-                ),
-                limit=1000, # Large enough to see the whole volume's chunks
-                with_payload=True,
-                with_vectors=False
-            )
-
-            if not points:
-                print(f"📄 {vol}: ❌ NO DATA FOUND IN DB")
-                continue
-
-            # 3. Verify Head and Tail
-            # Check if any of the stored chunks contain the end-of-file snippet
-            found_tail = any(expected_tail_snippet[:50] in p.payload.get("text", "") for p in points)
-            found_head = any(clean_full_text[:50] in p.payload.get("text", "") for p in points)
-
-            head_status = "✅ FOUND" if found_head else "❌ MISSING"
-            tail_status = "✅ FOUND" if found_tail else "❌ MISSING"
-            
-            print(f"📄 {vol}: Head: {head_status} | Tail: {tail_status}")
-
-        except Exception as e:
-            print(f"❌ Error validating {vol}: {e}")
+        if not os.path.exists(path):
+            continue
+        last_indexed = max((int(p) for p in entry["pages"] if p.isdigit()), default=0)
+        pages = page_count(path)
+        coverage = "✅" if last_indexed >= pages - 1 else "⚠️"
+        print(f"📄 {vol}: {coverage} chunks up to page {last_indexed} of {pages}")
+
+    client = make_async_client()
+    try:
+        t0 = time.perf_counter()
+        reports = await verify_index(client, manifest)
+        print_report(reports, time.perf_counter() - t0)
+    except Exception as e:
+        print(f"❌ Error validating index: {e}")
+    finally:
+        await client.close()
 
 if __name__ == "__main__":
-    asyncio.run(validate_pdf_integrity())
\ No newline at end of file
+    asyncio.run(validate_pdf_integrity())
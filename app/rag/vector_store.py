@@ -1,47 +1,107 @@
-import os
 import uuid
-from qdrant_client import AsyncQdrantClient
-from qdrant_client.http import models
-from app.config import VECTOR_DB_URL, VECTOR_DB_API_KEY
+from app.rag import qdrant_pool
+from app.config import STW_FILTER_MIN_SCORE
 
 class VectorStore:
     """
     This class encapsulates interactions with the Qdrant vector database, providing methods to add embeddings and search for relevant chunks based on a query embedding. 
     It is designed to be used in asynchronous contexts, such as FastAPI background tasks, to ensure non-blocking operations when retrieving clinical guidelines from the unified knowledge base.
     """
-    def __init__(self, collection_name: str):
-        """Initializes the VectorStore with the specified collection name and sets up the Qdrant client connection."""
-        self.url = VECTOR_DB_URL
-        self.api_key = VECTOR_DB_API_KEY
+    def __init__(self, collection_name: str, docstore=None, client=None):
+        """
+        Initializes the VectorStore with the specified collection name on the process-wide Qdrant client
+        (REST or gRPC, see app.rag.qdrant_pool) unless a client is given.
+        With a local `docstore`, searches only fetch ids, scores and chunk hashes; texts and citation
+        metadata are read from the docstore.
+        """
         self.collection_name = collection_name
-        # Use AsyncQdrantClient for FastAPI background tasks
-        self.client = AsyncQdrantClient(url=self.url, api_key=self.api_key)
+        self._client = client
+        self.docstore = docstore
+        # The hash is enough to check each hit against its docstore row
+        self.with_payload = ["chunk_hash"] if docstore is not None else True
+
+    @property
+    def client(self):
+        # Resolved per call: the shared client is recreated after a fork or a lifespan restart
+        return self._client or qdrant_pool.get_async_client()
 
     async def add(self, embeddings, texts: list[str], sources: list[str] = None):
         """Adds points to Qdrant Cloud with source metadata."""
-        points = [
-            models.PointStruct(
-                id=str(uuid.uuid4()),
-                vector=emb.tolist(),
-                payload={
-                    "text": texts[i],
-                    "source": sources[i] if sources else "Unknown"
-                }
-            )
-            for i, emb in enumerate(embeddings)
-        ]
-        await self.client.upsert(collection_name=self.collection_name, points=points)
+        await qdrant_pool.upsert_batch_async(
+            self.client, self.collection_name,
+            ids=[str(uuid.uuid4()) for _ in texts],
+            vectors=embeddings,
+            payloads=[{"text": text, "source": sources[i] if sources else "Unknown"} for i, text in enumerate(texts)]
+        )
 
-    async def search(self, query_embedding, top_k: int = 7) -> list[dict]:
-        """Searches the collection and returns full payload dictionaries."""
+    async def search(self, query_embedding, top_k: int = 7, stw_names: list[str] = None) -> list[dict]:
+        """
+        Searches the collection and returns full payload dictionaries with their similarity score.
+        With `stw_names`, only those guidelines' chunks are searched (stw_name payload index); if that
+        scope yields nothing convincing, the search is repeated over the whole corpus.
+        """
         vector = query_embedding[0].tolist() if hasattr(query_embedding, 'tolist') else query_embedding[0]
-        
+
+        if stw_names:
+            scoped = await self._query(vector, top_k, qdrant_pool.stw_filter(stw_names))
+            if scoped and scoped[0]["score"] >= STW_FILTER_MIN_SCORE:
+                return scoped
+
+        return await self._query(vector, top_k)
+
+    async def search_batch(self, query_embeddings, top_k: int = 7, stw_scopes: list = None) -> list[list[dict]]:
+        """
+        Runs several searches in batched round trips (query_batch_points). `stw_scopes[i]`, when given,
+        restricts query i to those guidelines; as in search(), scoped queries whose best hit is below
+        STW_FILTER_MIN_SCORE are repeated over the whole corpus (one more batch for all of them).
+        Returns one result list per query, in order.
+        """
+        stw_scopes = stw_scopes or [None] * len(query_embeddings)
+        point_lists = await qdrant_pool.search_batch(
+            self.client, self.collection_name, query_embeddings, top_k,
+            filters=[qdrant_pool.stw_filter(scope) for scope in stw_scopes],
+            with_payload=self.with_payload
+        )
+        weak = [i for i, (scope, points) in enumerate(zip(stw_scopes, point_lists))
+                if scope and not (points and points[0].score >= STW_FILTER_MIN_SCORE)]
+        if weak:
+            retried = await qdrant_pool.search_batch(
+                self.client, self.collection_name, [query_embeddings[i] for i in weak], top_k,
+                with_payload=self.with_payload
+            )
+            for i, points in zip(weak, retried):
+                point_lists[i] = points
+        return await self._hydrate(point_lists)
+
+    async def _query(self, vector: list[float], top_k: int, query_filter=None) -> list[dict]:
         results = await self.client.query_points(
             collection_name=self.collection_name,
             query=vector,
+            query_filter=query_filter,
             limit=top_k,
-            with_payload=True
+            with_payload=self.with_payload
         )
         
-        # Returns list of dicts: [{"text": "...", "source": "Vol1.pdf"}, ...]
-        return [point.payload for point in results.points]
\ No newline at end of file
+        # Returns list of dicts: [{"text": "...", "source": "Vol1.pdf", "id": "...", "score": 0.71}, ...]
+        return (await self._hydrate([results.points]))[0]
+
+    async def _hydrate(self, point_lists: list) -> list[list[dict]]:
+        """
+        Payload dicts for scored points. Full payloads are used as returned; slim hits are filled in
+        from the docstore, and any the docstore cannot vouch for (built separately) are fetched from
+        Qdrant in one retrieve call.
+        """
+        if self.docstore is None:
+            return [[{**point.payload, "id": point.id, "score": point.score} for point in points] for points in point_lists]
+
+        payloads = {}
+        for points in point_lists:
+            for point in points:
+                if point.id not in payloads:
+                    payloads[point.id] = self.docstore.get(point.id, (point.payload or {}).get("chunk_hash"))
+        stale = [point_id for point_id, payload in payloads.items() if payload is None]
+        if stale:
+            for record in await self.client.retrieve(collection_name=self.collection_name, ids=stale, with_payload=True):
+                payloads[record.id] = record.payload
+        return [[{**(payloads.get(point.id) or {}), "id": point.id, "score": point.score} for point in points]
+                for points in point_lists]
@@ -0,0 +1,162 @@
+"""
+Index integrity verification against the build-time manifest.
+
+The index builder records, per volume, how many chunks it upserted on every page and the
+hash of every chunk's text (INDEX_DIR/manifest.json; points carry the same hash as the
+`chunk_hash` payload). The verifier streams every point of every volume with paginated
+async scrolls, all volumes concurrently, and reports per volume:
+- missing chunks (in the manifest, not in the collection) and the pages they came from
+- extra chunks (in the collection, not in the manifest)
+- duplicate chunks (stored more often than they were built)
+- points without a chunk_hash (indexed before manifests existed)
+
+Usage:
+    python -m app.rag.verify_index [--manifest index_data/manifest.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+from typing import Optional
+
+SCROLL_PAGE_SIZE = 1000
+# Pages listed per problem in the report
+SAMPLE_PAGES = 10
+
+
+# --- Manifest (written by the builder) ---
+class ManifestBuilder:
+    def __init__(self, collection: str, model_id: str):
+        self.manifest = {"version": 1, "collection": collection, "model_id": model_id, "volumes": {}}
+
+    def add(self, source: str, page_number: int, chunk_hash: str):
+        volume = self.manifest["volumes"].setdefault(source, {"count": 0, "pages": {}, "hashes": {}})
+        volume["count"] += 1
+        volume["pages"][str(page_number)] = volume["pages"].get(str(page_number), 0) + 1
+        volume["hashes"][chunk_hash] = volume["hashes"].get(chunk_hash, 0) + 1
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f)
+        os.replace(path + ".tmp", path)
+
+
+def load_manifest(path: str) -> Optional[dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# --- Scanning the collection ---
+async def scan_volume(client, collection: str, source: str, page_size: int = SCROLL_PAGE_SIZE) -> dict:
+    """Streams every point of one volume (hash and page only) through paginated scrolls."""
+    from qdrant_client.http import models
+    hashes, pages, unhashed, points = Counter(), Counter(), 0, 0
+    hash_pages: dict[str, set] = {}
+    offset = None
+    while True:
+        batch, offset = await client.scroll(
+            collection_name=collection,
+            scroll_filter=models.Filter(must=[models.FieldCondition(key="source", match=models.MatchValue(value=source))]),
+            limit=page_size,
+            offset=offset,
+            with_payload=["chunk_hash", "page_number"],
+            with_vectors=False
+        )
+        for point in batch:
+            points += 1
+            payload = point.payload or {}
+            page = str(payload.get("page_number"))
+            pages[page] += 1
+            chunk_hash = payload.get("chunk_hash")
+            if chunk_hash is None:
+                unhashed += 1
+                continue
+            hashes[chunk_hash] += 1
+            hash_pages.setdefault(chunk_hash, set()).add(page)
+        if offset is None:
+            break
+    return {"points": points, "hashes": hashes, "pages": pages, "unhashed": unhashed, "hash_pages": hash_pages}
+
+
+def compare_volume(expected: dict, found: dict) -> dict:
+    """Diffs one volume's manifest entry against a scan of the collection."""
+    expected_hashes = Counter(expected.get("hashes", {}))
+    found_hashes = found["hashes"]
+    missing = expected_hashes - found_hashes
+    extra = Counter({h: n for h, n in found_hashes.items() if h not in expected_hashes})
+    duplicates = Counter({h: found_hashes[h] - n for h, n in expected_hashes.items() if found_hashes[h] > n})
+
+    expected_pages = Counter({p: n for p, n in expected.get("pages", {}).items()})
+    short_pages = sorted((p for p in expected_pages if found["pages"][p] < expected_pages[p]), key=_page_key)
+    extra_pages = sorted({p for h in extra for p in found["hash_pages"].get(h, ())}, key=_page_key)
+    ok = not missing and not extra and not duplicates and not found["unhashed"]
+    return {
+        "ok": ok,
+        "expected": expected.get("count", 0),
+        "found": found["points"],
+        "missing": sum(missing.values()),
+        "extra": sum(extra.values()),
+        "duplicates": sum(duplicates.values()),
+        "unhashed": found["unhashed"],
+        "pages_short": short_pages[:SAMPLE_PAGES],
+        "pages_with_extra": extra_pages[:SAMPLE_PAGES],
+    }
+
+
+def _page_key(page: str):
+    return int(page) if page.isdigit() else 0
+
+
+async def verify_index(client, manifest: dict, collection: str = None, page_size: int = SCROLL_PAGE_SIZE) -> dict:
+    """Scans all manifest volumes concurrently and returns {volume: report}."""
+    collection = collection or manifest["collection"]
+    volumes = list(manifest["volumes"])
+    scans = await asyncio.gather(*(scan_volume(client, collection, v, page_size) for v in volumes))
+    return {volume: compare_volume(manifest["volumes"][volume], scan) for volume, scan in zip(volumes, scans)}
+
+
+def print_report(reports: dict, elapsed: float = None):
+    for volume, r in reports.items():
+        status = "✅" if r["ok"] else "❌"
+        print(f"📄 {volume}: {status} {r['found']}/{r['expected']} points | missing {r['missing']} | "
+              f"extra {r['extra']} | duplicates {r['duplicates']}" + (f" | no hash {r['unhashed']}" if r["unhashed"] else ""))
+        if r["pages_short"]:
+            print(f"    pages missing chunks: {', '.join(r['pages_short'])}")
+        if r["pages_with_extra"]:
+            print(f"    pages with unexpected chunks: {', '.join(r['pages_with_extra'])}")
+        if r["unhashed"]:
+            print("    points predate chunk hashes: rebuild (or restore a snapshot) to verify them")
+    if elapsed is not None:
+        print(f"⏱️  Verified {sum(r['found'] for r in reports.values())} points in {elapsed:.1f}s")
+
+
+async def main():
+    from app.rag.qdrant_pool import make_async_client
+    from app.config import INDEX_MANIFEST_PATH
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--manifest", default=INDEX_MANIFEST_PATH)
+    parser.add_argument("--collection")
+    args = parser.parse_args()
+
+    manifest = load_manifest(args.manifest)
+    if manifest is None:
+        print(f"❌ No index manifest at {args.manifest}: run the index builder first")
+        return
+    client = make_async_client()
+    try:
+        t0 = time.perf_counter()
+        reports = await verify_index(client, manifest, args.collection)
+        print_report(reports, time.perf_counter() - t0)
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,6 +1,6 @@
-import json
 from upstash_redis import Redis
 from app.config import REDIS_URL, REDIS_TOKEN
+from app.core.serialization import encode_state, decode_state
 
 # Internal dictionary for fallback if Redis is unavailable
 _FALLBACK_STORE = {}
@@ -18,6 +18,12 @@ except Exception as e:
     REDIS_AVAILABLE = False
     print(f"⚠️ Redis unavailable: {e}. Falling back to in-memory state store.")
 
+def reconnect():
+    """Opens a fresh Redis client in a forked worker instead of reusing the parent's connections."""
+    global r
+    if REDIS_AVAILABLE:
+        r = Redis(url=REDIS_URL, token=REDIS_TOKEN)
+
 def get_state(sender_id: str):
     """Retrieves state from Redis or fallback dictionary."""
     if REDIS_AVAILABLE:
@@ -25,7 +31,7 @@ def get_state(sender_id: str):
             state_data = r.get(f"state:{sender_id}")
             # upstash_redis returns the value directly (often already a dict or string)
             if state_data:
-                return json.loads(state_data) if isinstance(state_data, str) else state_data
+                return decode_state(state_data)
             return None
         except Exception:
             pass
@@ -36,7 +42,7 @@ def set_state(sender_id: str, state: dict):
     if REDIS_AVAILABLE:
         try:
             # upstash_redis uses ex=seconds in the set command
-            r.set(f"state:{sender_id}", json.dumps(state), ex=3600)
+            r.set(f"state:{sender_id}", encode_state(state), ex=3600)
             return
         except Exception as e:
             print(f"Redis Set Error: {e}")
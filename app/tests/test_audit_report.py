@@ -0,0 +1,30 @@
+from app.core.audit_report import collect, percentile, render
+
+
+def make_record(pathway: str, total: float, llm_ms: float) -> dict:
+    return {
+        "input": {"detected_intent": pathway},
+        "timings_ms": {"intent": 300.0, "retrieval": 120.0, "llm_answer": llm_ms, "total": total},
+        "llm": [{"model": "llama-3.3-70b-versatile", "prompt_tokens": 2400, "completion_tokens": 380, "duration_ms": llm_ms}]
+    }
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([7], 99) == 7
+
+
+def test_collect_groups_by_pathway_and_stage():
+    records = [make_record("case", 2000 + i, 1500 + i) for i in range(10)]
+    records += [make_record("search", 1000, 700)]
+    timings, tokens = collect(records)
+
+    assert len(timings[("case", "total")]) == 10
+    assert timings[("search", "llm_answer")] == [700]
+    assert tokens["llama-3.3-70b-versatile"]["calls"] == 11
+
+    report = render(timings, tokens)
+    assert "case" in report and "llm_answer" in report and "p99 ms" in report
@@ -0,0 +1,33 @@
+import glob
+import os
+import time
+from app.core.audit_sink import AuditSink
+from app.core.audit_store import read_segment
+
+
+def test_records_are_flushed_and_compressed_on_close(tmp_path):
+    sink = AuditSink(directory=str(tmp_path), flush_interval=0.01)
+    for i in range(50):
+        sink.submit({"doctor_id": f"doc{i % 3}", "n": i})
+    sink.close()
+
+    segments = glob.glob(os.path.join(tmp_path, "*", "*", "*", "clinical_audit-*.jsonl.gz"))
+    assert len(segments) == 1
+    assert str(os.getpid()) in segments[0]
+    assert [r["n"] for r in read_segment(segments[0])] == list(range(50))
+    assert sink.written == 50 and sink.dropped == 0
+
+
+def test_segments_rotate_by_size(tmp_path):
+    sink = AuditSink(directory=str(tmp_path), flush_interval=0.01, max_bytes=200)
+    for i in range(20):
+        sink.submit({"doctor_id": "doc1", "output": "x" * 50, "n": i})
+        time.sleep(0.005)
+    sink.close()
+
+    segments = sorted(glob.glob(os.path.join(tmp_path, "*", "*", "*", "*.jsonl.gz")))
+    assert len(segments) > 1
+    records = []
+    for path in segments:
+        records.extend(read_segment(path))
+    assert [r["n"] for r in records] == list(range(20))
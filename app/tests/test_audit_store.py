@@ -0,0 +1,60 @@
+import os
+from unittest.mock import patch
+from app.core import audit_store
+from app.core.audit_store import query_records, seal_segment
+
+
+def make_record(i: int) -> dict:
+    return {
+        "timestamp": f"2026-10-{1 + i // 100:02d}T{i % 24:02d}:00:00",
+        "doctor_id": f"doc{i % 5}",
+        "retrieval_metadata": {"sources": [f"ICMR-STW-Vol_{1 + i % 4}-Guideline:Pg_no:{i}"]},
+        "output": f"answer {i}"
+    }
+
+
+def write_sealed_segment(tmp_path, records) -> str:
+    day_dir = tmp_path / "2026" / "10" / "01"
+    day_dir.mkdir(parents=True)
+    raw = day_dir / "clinical_audit-20261001T000000-1-0001.jsonl"
+    raw.write_text("".join(audit_store.dumps_str(r) + "\n" for r in records))
+    with patch.object(audit_store, "BLOCK_RECORDS", 10):
+        return seal_segment(str(raw))
+
+
+def test_seal_builds_block_index(tmp_path):
+    sealed = write_sealed_segment(tmp_path, [make_record(i) for i in range(95)])
+
+    assert sealed.endswith(".jsonl.gz") and os.path.exists(sealed + ".idx")
+    index = audit_store._load_index(sealed)
+    assert index["records"] == 95 and len(index["blocks"]) == 10
+    assert "doc3" in index["doctors"] and "Vol2" in index["sources"]
+    assert list(audit_store.read_segment(sealed)) == [make_record(i) for i in range(95)]
+
+
+def test_query_seeks_only_candidate_blocks(tmp_path):
+    # Doctor doc0 only appears in the first block
+    records = [make_record(i) for i in range(1, 95)]
+    records.insert(0, make_record(0))
+    records = [r if i < 10 or r["doctor_id"] != "doc0" else {**r, "doctor_id": "doc9"} for i, r in enumerate(records)]
+    write_sealed_segment(tmp_path, records)
+
+    stats = {}
+    with patch.object(audit_store, "LEGACY_LOG_FILE", str(tmp_path / "missing.jsonl")):
+        found = list(query_records(str(tmp_path), doctor="doc0", stats=stats))
+
+    assert [r["doctor_id"] for r in found] == ["doc0", "doc0"]
+    assert stats["blocks_read"] == 1
+
+
+def test_query_by_time_range_and_volume(tmp_path):
+    records = [make_record(i) for i in range(95)]
+    write_sealed_segment(tmp_path, records)
+
+    with patch.object(audit_store, "LEGACY_LOG_FILE", str(tmp_path / "missing.jsonl")):
+        found = list(query_records(str(tmp_path), source="Vol3",
+                                   since="2026-10-01T05:00:00", until="2026-10-01T10:00:00"))
+
+    expected = [r for r in records if "Vol_3" in r["retrieval_metadata"]["sources"][0]
+                and "2026-10-01T05:00:00" <= r["timestamp"] <= "2026-10-01T10:00:00"]
+    assert found == expected and found
@@ -0,0 +1,90 @@
+import fitz
+from app.rag.boilerplate import BoilerplateStats, NearDuplicateFilter, SectionDuplicateFilter, simhash, strip_boilerplate
+from app.rag.loader import iter_pages
+
+DISCLAIMER = ("This guideline is intended for use by qualified medical practitioners and does not replace "
+              "clinical judgement in individual cases.")
+
+
+def page(n, body):
+    return {"page_number": n, "text": "", "blocks": [
+        (0.04, "Standard Treatment Workflows of India 2022"),
+        (0.3, body),
+        (0.6, DISCLAIMER),
+        (0.95, f"Page {n}"),
+    ]}
+
+
+def test_repeated_headers_footers_and_disclaimers_are_stripped():
+    pages = [page(n, f"Unique clinical content for page {n}.") for n in range(1, 9)]
+    stats = BoilerplateStats()
+    cleaned = list(strip_boilerplate(pages, stats, lookahead=4))
+
+    assert [p["text"] for p in cleaned] == [f"Unique clinical content for page {n}." for n in range(1, 9)]
+    assert all("blocks" not in p for p in cleaned)
+    assert stats.blocks_removed == 24
+    assert DISCLAIMER in stats.as_dict()["top_blocks"]
+
+
+def test_rare_blocks_are_kept():
+    pages = [page(1, "a"), page(2, "b")]
+    cleaned = list(strip_boilerplate(pages))
+    assert cleaned[0]["text"].startswith("Standard Treatment Workflows")
+
+
+def test_loader_pages_carry_positioned_blocks(tmp_path):
+    path = tmp_path / "running.pdf"
+    doc = fitz.open()
+    for i in range(1, 6):
+        p = doc.new_page()
+        p.insert_text((72, 40), "ICMR Standard Treatment Workflows")
+        p.insert_text((72, 300), f"Give amoxicillin for {i} days.")
+        p.insert_text((72, 820), f"{i}")
+    doc.save(path)
+    doc.close()
+
+    cleaned = list(strip_boilerplate(iter_pages(str(path))))
+    assert [p["text"] for p in cleaned] == [f"Give amoxicillin for {i} days." for i in range(1, 6)]
+
+
+def test_near_duplicates_dropped_but_different_doses_kept():
+    base = ("Amoxicillin is the first line antibiotic for acute bacterial rhinosinusitis in adults, "
+            "given for seven days with review at seventy two hours if symptoms persist. Dose 500 mg TDS.")
+    filt = NearDuplicateFilter()
+    assert not filt.is_duplicate(base)
+    assert filt.is_duplicate(base.upper())
+    assert filt.is_duplicate(base.replace("first line", "first-line"))
+    assert not filt.is_duplicate(base.replace("500 mg", "250 mg"))
+    assert filt.stats() == {"chunks_seen": 4, "duplicates_dropped": 2}
+
+
+def test_simhash_is_close_for_small_edits():
+    a = simhash("fever with headache and neck stiffness in a child under five years of age")
+    b = simhash("fever with headache and neck stiffness in a child under 5 years of age")
+    c = simhash("topical nasal decongestants should not be used for more than three days")
+    assert bin(a ^ b).count("1") < bin(a ^ c).count("1")
+
+
+def test_body_blocks_differing_only_in_numbers_are_content():
+    body = "Paracetamol {} mg/kg per dose every six hours, not exceeding four doses in twenty four hours."
+    pages = [{"page_number": n, "text": "", "blocks": [(0.5, body.format(n))]} for n in range(1, 8)]
+    assert [p["text"] for p in strip_boilerplate(pages)] == [body.format(n) for n in range(1, 8)]
+
+
+def test_edge_blocks_only_collapse_page_numbers():
+    # Dosing rows near the page bottom differ only in their numbers; only "Page n" is furniture
+    pages = [{"page_number": n, "text": "", "blocks": [
+        (0.5, f"Body {n}"), (0.92, f"Amoxicillin {125 * n} mg TDS"), (0.97, f"Page {n}")
+    ]} for n in range(1, 7)]
+    cleaned = [p["text"] for p in strip_boilerplate(pages)]
+    assert cleaned == [f"Body {n}\nAmoxicillin {125 * n} mg TDS" for n in range(1, 7)]
+
+
+def test_passage_shared_by_two_stws_of_one_volume_stays_under_both():
+    referral = ("Refer urgently if there is periorbital swelling, diplopia, reduced vision, severe headache, "
+                "altered sensorium or signs of meningitis.")
+    filt = SectionDuplicateFilter()
+    assert not filt.is_duplicate(referral, ("Vol2.pdf", "Acute_Rhinosinusitis"))
+    assert not filt.is_duplicate(referral, ("Vol2.pdf", "Chronic_Rhinosinusitis"))
+    assert filt.is_duplicate(referral, ("Vol2.pdf", "Acute_Rhinosinusitis"))
+    assert filt.stats() == {"chunks_seen": 3, "duplicates_dropped": 1}
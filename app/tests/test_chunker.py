@@ -0,0 +1,64 @@
+import re
+from app.rag.chunker import iter_text_chunks, iter_chunks, chunk_text, token_counter
+
+
+class FakeTokenizer:
+    """One token per 4 characters, like a crude WordPiece."""
+    def tokenize(self, word: str) -> list[str]:
+        return [word[i:i + 4] for i in range(0, len(word), 4)]
+
+
+count = token_counter(FakeTokenizer())
+
+
+def tokens(text: str) -> int:
+    return sum(count(word) for word in text.split())
+
+
+def test_chunks_respect_token_budget():
+    text = " ".join(f"Sentence number {i} describes supportive management in detail." for i in range(40))
+    chunks = list(iter_text_chunks(text, max_tokens=30, overlap_tokens=8, count_tokens=count))
+
+    assert len(chunks) > 1
+    assert all(tokens(c) <= 30 for c in chunks)
+
+
+def test_consecutive_chunks_overlap():
+    text = " ".join(f"w{i}" for i in range(100))
+    chunks = list(iter_text_chunks(text, max_tokens=20, overlap_tokens=5, count_tokens=count))
+
+    for previous, current in zip(chunks, chunks[1:]):
+        shared = set(previous.split()) & set(current.split())
+        assert 0 < len(shared) <= 5
+    assert chunks[-1].endswith("w99")
+
+
+def test_long_sentence_never_splits_dose_from_unit():
+    text = "Give " + " ".join(f"drug {chr(65 + i)} 10 - 20 mg / kg / day then" for i in range(26)) + "."
+    chunks = list(iter_text_chunks(text, max_tokens=16, overlap_tokens=4, count_tokens=count))
+
+    for chunk in chunks:
+        assert not chunk.startswith(("mg", "- 20", "20 mg", "/ kg"))
+        assert not chunk.endswith(("10", "10 -", "20", "mg /", "kg /"))
+
+
+def test_oversized_token_is_split():
+    text = "x" * 500
+    chunks = list(iter_text_chunks(text, max_tokens=10, overlap_tokens=2, count_tokens=count))
+    assert all(tokens(c) <= 10 for c in chunks)
+    assert "".join(chunks).count("x") >= 500
+
+
+def test_iter_chunks_keeps_page_metadata():
+    pages = iter([{"page_number": 3, "stw_title": "AES", "text": "Short page. Two sentences."}])
+    chunks = list(iter_chunks(pages, count_tokens=count))
+    assert chunks == [{"page_number": 3, "stw_title": "AES", "text": "Short page. Two sentences."}]
+
+
+def test_chunk_text_character_budget_honours_overlap():
+    text = " ".join(f"Line {i} of the guideline." for i in range(100))
+    chunks = chunk_text(text, chunk_size=200, overlap=50)
+
+    assert all(len(c) <= 200 for c in chunks)
+    lines = [set(re.findall(r"Line \d+ ", c)) for c in chunks]
+    assert all(a & b for a, b in zip(lines, lines[1:]))
@@ -0,0 +1,115 @@
+import asyncio
+import pytest
+from app.core.exceptions import WhatsAppThrottledError
+from app.whatsapp.dispatcher import OutboundDispatcher, TokenBucket, PRIORITY_REPLY, PRIORITY_NOTICE
+
+
+def make_dispatcher(deliver, **kwargs):
+    options = {"rate": 1000, "burst": 1000, "pair_rate": 1000, "pair_burst": 1000, "retry_base": 0.01}
+    options.update(kwargs)
+    return OutboundDispatcher(deliver=deliver, **options)
+
+
+def test_token_bucket_refuses_when_empty():
+    bucket = TokenBucket(rate=1, capacity=2)
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() > 0
+
+
+@pytest.mark.asyncio
+async def test_messages_to_one_recipient_stay_in_order():
+    delivered = []
+
+    async def deliver(payload):
+        await asyncio.sleep(0.001)
+        delivered.append(payload["n"])
+        return {"ok": True}
+
+    dispatcher = make_dispatcher(deliver, concurrency=4)
+    await dispatcher.start()
+    futures = [dispatcher.enqueue("doc1", {"n": i}) for i in range(10)]
+    await asyncio.gather(*futures)
+    await dispatcher.stop()
+
+    assert delivered == list(range(10))
+    assert dispatcher.metrics["sent"] == 10
+
+
+@pytest.mark.asyncio
+async def test_replies_overtake_queued_notices():
+    delivered = []
+
+    async def deliver(payload):
+        delivered.append(payload["kind"])
+        return {"ok": True}
+
+    # One token per 20ms: everything queues up behind the number bucket
+    dispatcher = make_dispatcher(deliver, rate=50, burst=1, concurrency=1)
+    await dispatcher.start()
+    notices = [dispatcher.enqueue(f"spam{i}", {"kind": "notice"}, PRIORITY_NOTICE) for i in range(5)]
+    reply = dispatcher.enqueue("doc1", {"kind": "reply"}, PRIORITY_REPLY)
+    await asyncio.gather(reply, *notices)
+    await dispatcher.stop()
+
+    assert delivered.index("reply") <= 1
+
+
+@pytest.mark.asyncio
+async def test_throttled_message_is_retried_then_delivered():
+    attempts = []
+
+    async def deliver(payload):
+        attempts.append(payload)
+        if len(attempts) < 3:
+            raise WhatsAppThrottledError(131056, "Pair rate limit hit")
+        return {"messages": [{"id": "wamid.ok"}]}
+
+    dispatcher = make_dispatcher(deliver)
+    await dispatcher.start()
+    result = await dispatcher.send("doc1", {"text": "hi"})
+    await dispatcher.stop()
+
+    assert result["messages"][0]["id"] == "wamid.ok"
+    assert dispatcher.metrics["retried"] == 2
+    assert dispatcher.metrics["sent"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_notices_are_dropped():
+    async def deliver(payload):
+        return {"ok": True}
+
+    dispatcher = make_dispatcher(deliver)
+    await dispatcher.start()
+    future = dispatcher.enqueue("doc1", {"text": "notice"}, PRIORITY_NOTICE, ttl=0.000001)
+    await asyncio.sleep(0.01)
+    await dispatcher.stop()
+
+    assert await future is None
+    assert dispatcher.metrics["expired"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stop_drains_direct_deliveries():
+    release = asyncio.Event()
+
+    async def deliver(payload):
+        if payload["text"] == "slow":
+            await asyncio.sleep(10)
+        await release.wait()
+        return {"ok": True}
+
+    # Never started: messages go out directly, outside the worker queue
+    dispatcher = make_dispatcher(deliver)
+    quick = dispatcher.enqueue("doc1", {"text": "quick"})
+    slow = dispatcher.enqueue("doc2", {"text": "slow"})
+    assert len(dispatcher._direct_tasks) == 2
+
+    asyncio.get_running_loop().call_later(0.01, release.set)
+    await dispatcher.stop(drain_timeout=0.1)
+
+    assert await quick == {"ok": True}
+    assert await slow is None
+    assert dispatcher.metrics["sent"] == 1
+    assert not dispatcher._direct_tasks
@@ -0,0 +1,86 @@
+import pytest
+from types import SimpleNamespace
+from app.rag.docstore import DocStoreWriter, PageStoreWriter, load_docstore, load_page_store
+from app.rag.embedding_cache import text_hash
+from app.rag.vector_store import VectorStore
+
+
+def payload(text, page=1):
+    return {"text": text, "chunk_hash": text_hash(text), "source": "Vol1.pdf", "page_number": page,
+            "stw_name": "Acute_Rhinosinusitis", "chapter": "ENT", "volume": "Vol1"}
+
+
+def write_store(directory, texts):
+    writer = DocStoreWriter(directory, "kb")
+    writer.add(list(range(len(texts))), [payload(t, i + 1) for i, t in enumerate(texts)])
+    writer.close()
+    return load_docstore(directory)
+
+
+def test_rows_round_trip_by_point_id(tmp_path):
+    store = write_store(str(tmp_path / "docstore"), ["Amoxicillin 500 mg TDS", "Paracetamol 15 mg/kg – max 4 doses", ""])
+    assert len(store) == 3
+    assert store.get(1)["text"] == "Paracetamol 15 mg/kg – max 4 doses"
+    assert store.get(1)["page_number"] == 2 and store.get(1)["stw_name"] == "Acute_Rhinosinusitis"
+    assert store.get(2)["text"] == ""
+    assert store.get(3) is None and store.get("a-uuid") is None
+
+
+def test_rows_from_another_build_are_rejected(tmp_path):
+    store = write_store(str(tmp_path / "docstore"), ["old text"])
+    assert store.get(0, text_hash("old text")) is not None
+    assert store.get(0, text_hash("rebuilt text")) is None
+
+
+def test_writer_requires_sequential_ids(tmp_path):
+    writer = DocStoreWriter(str(tmp_path / "docstore"))
+    with pytest.raises(ValueError):
+        writer.add([5], [payload("x")])
+
+
+def test_missing_docstore_loads_as_none(tmp_path):
+    assert load_docstore(str(tmp_path / "absent")) is None
+
+
+class FakeQdrant:
+    def __init__(self, hits, payloads):
+        self.hits, self.payloads = hits, payloads
+        self.requested_payload = None
+        self.retrieved = []
+
+    async def query_points(self, collection_name, query, query_filter, limit, with_payload):
+        self.requested_payload = with_payload
+        return SimpleNamespace(points=self.hits)
+
+    async def retrieve(self, collection_name, ids, with_payload):
+        self.retrieved.extend(ids)
+        return [SimpleNamespace(id=i, payload=self.payloads[i]) for i in ids]
+
+
+@pytest.mark.asyncio
+async def test_search_reads_text_locally_and_fetches_only_stale_hits(tmp_path):
+    client = FakeQdrant(
+        hits=[SimpleNamespace(id=1, score=0.9, payload={"chunk_hash": text_hash("second chunk")}),
+              SimpleNamespace(id=0, score=0.8, payload={"chunk_hash": text_hash("changed chunk")})],
+        payloads={0: payload("changed chunk")}
+    )
+    store = VectorStore("kb", docstore=write_store(str(tmp_path / "docstore"), ["first chunk", "second chunk"]), client=client)
+
+    results = await store.search([[0.1, 0.2]], top_k=2)
+
+    assert store.client.requested_payload == ["chunk_hash"]
+    assert [r["text"] for r in results] == ["second chunk", "changed chunk"]
+    assert [r["score"] for r in results] == [0.9, 0.8]
+    assert store.client.retrieved == [0]
+
+
+def test_page_store_keys_pages_by_source_and_number(tmp_path):
+    writer = PageStoreWriter(str(tmp_path / "pages"))
+    writer.add("Vol1.pdf", 12, "Acute   rhinosinusitis\nfirst line: amoxicillin")
+    writer.add("Vol2.pdf", 12, "AES in children")
+    writer.close()
+
+    pages = load_page_store(str(tmp_path / "pages"))
+    assert pages.get("Vol1.pdf", 12) == "Acute rhinosinusitis first line: amoxicillin"
+    assert pages.get("Vol2.pdf", 12) == "AES in children"
+    assert pages.get("Vol1.pdf", 13) is None
@@ -0,0 +1,61 @@
+import numpy as np
+from app.rag.embedding_cache import EmbeddingCache, text_hash
+from app.rag.snapshot import SnapshotWriter, iter_snapshot, read_manifest
+
+DIM = 4
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.encoded = []
+
+    def __call__(self, texts):
+        self.encoded.extend(texts)
+        return np.array([[len(t), i, 0, 1] for i, t in enumerate(texts)], dtype=np.float32)
+
+
+def test_only_misses_are_encoded_and_survive_reopen(tmp_path):
+    embed = CountingEmbedder()
+    cache = EmbeddingCache(str(tmp_path), "test-model", DIM)
+    first = cache.embed(["alpha", "beta", "alpha"], embed)
+    assert embed.encoded == ["alpha", "beta"]
+    assert np.array_equal(first[0], first[2])
+
+    reopened = EmbeddingCache(str(tmp_path), "test-model", DIM)
+    second = reopened.embed(["beta", "gamma"], embed)
+    assert embed.encoded == ["alpha", "beta", "gamma"]
+    assert np.array_equal(second[0], first[1])
+    assert reopened.stats()["hits"] == 1
+
+
+def test_models_do_not_share_vectors(tmp_path):
+    embed = CountingEmbedder()
+    EmbeddingCache(str(tmp_path), "model-a", DIM).embed(["alpha"], embed)
+    EmbeddingCache(str(tmp_path), "model-b", DIM).embed(["alpha"], embed)
+    assert embed.encoded == ["alpha", "alpha"]
+
+
+def test_compact_keeps_only_live_rows(tmp_path):
+    embed = CountingEmbedder()
+    cache = EmbeddingCache(str(tmp_path), "test-model", DIM)
+    vectors = cache.embed(["alpha", "beta", "gamma"], embed)
+
+    assert cache.compact(keep_hashes={text_hash("gamma"), text_hash("alpha")}) == 1
+    assert "beta" not in cache
+    assert np.array_equal(cache.embed(["alpha", "gamma"], embed), vectors[[0, 2]])
+    assert len(embed.encoded) == 3
+
+
+def test_snapshot_round_trip(tmp_path):
+    directory = str(tmp_path / "snapshot")
+    writer = SnapshotWriter(directory, "test-model", DIM, "collection")
+    vectors = np.arange(3 * DIM, dtype=np.float32).reshape(3, DIM)
+    writer.add(["a", "b"], [{"text": "A"}, {"text": "B"}], vectors[:2])
+    writer.add(["c"], [{"text": "C"}], vectors[2:])
+    writer.close()
+
+    assert read_manifest(directory)["count"] == 3
+    batches = list(iter_snapshot(directory, batch_size=2))
+    assert [ids for ids, _, _ in batches] == [["a", "b"], ["c"]]
+    assert np.array_equal(np.vstack([v for _, _, v in batches]), vectors)
+    assert batches[1][1] == [{"text": "C"}]
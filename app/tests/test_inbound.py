@@ -0,0 +1,47 @@
+import pytest
+from unittest.mock import patch
+from app.whatsapp.inbound import dispatch_inbound, split_events
+
+
+def make_payload(messages=(), statuses=0):
+    return {"entry": [{"changes": [{"value": {
+        "messages": [{"from": s, "type": "text", "text": {"body": t}} for s, t in messages],
+        "statuses": [{"status": "read"} for _ in range(statuses)]
+    }}]}]}
+
+
+def test_split_events_separates_statuses():
+    messages, statuses = split_events(make_payload([("919900000000", "hi")], statuses=3))
+    assert len(messages) == 1
+    assert statuses == 3
+
+
+@pytest.mark.asyncio
+async def test_each_message_charged_to_its_own_sender():
+    charged, scheduled = [], []
+
+    async def fake_admit(sender_id):
+        charged.append(sender_id)
+        return sender_id != "917700000000"
+
+    payload = make_payload([("919900000000", "fever"), ("918800000000", "cough"),
+                            ("917700000000", "spam"), ("919900000000", "45")], statuses=2)
+
+    with patch("app.whatsapp.inbound.admit_message", fake_admit):
+        counts = await dispatch_inbound(payload, lambda s, t: scheduled.append((s, t)))
+
+    assert sorted(charged) == ["917700000000", "918800000000", "919900000000", "919900000000"]
+    assert counts == {"accepted": 3, "throttled": 1, "ignored": 0, "statuses": 2}
+    # A sender's messages keep their order
+    assert [t for s, t in scheduled if s == "919900000000"] == ["fever", "45"]
+
+
+@pytest.mark.asyncio
+async def test_status_only_payload_costs_no_admission():
+    async def fail_admit(sender_id):
+        raise AssertionError("statuses must not hit the limiter")
+
+    with patch("app.whatsapp.inbound.admit_message", fail_admit):
+        counts = await dispatch_inbound(make_payload(statuses=5), lambda s, t: None)
+
+    assert counts["statuses"] == 5 and counts["accepted"] == 0
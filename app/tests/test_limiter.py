@@ -0,0 +1,53 @@
+import pytest
+from app.core.limiter import SlidingWindowLimiter, parse_limit
+
+
+def test_parse_limit_formats():
+    assert parse_limit("10/minute") == (10, 60)
+    assert parse_limit("25 per day") == (25, 86400)
+    assert parse_limit("100/2 hours") == (100, 7200)
+    with pytest.raises(ValueError):
+        parse_limit("ten a minute")
+
+
+@pytest.mark.asyncio
+async def test_blocks_after_limit_and_notifies_once():
+    limiter = SlidingWindowLimiter([(3, 60), (5, 86400)], redis=None, notice_cooldown=60)
+
+    decisions = [await limiter.hit("919900000000") for _ in range(5)]
+
+    assert [d.allowed for d in decisions] == [True, True, True, False, False]
+    assert [d.notify for d in decisions] == [False, False, False, True, False]
+    assert 0 < decisions[3].retry_after <= 60
+
+
+@pytest.mark.asyncio
+async def test_limits_are_per_sender():
+    limiter = SlidingWindowLimiter([(1, 60)], redis=None)
+
+    assert (await limiter.hit("919900000000")).allowed
+    assert not (await limiter.hit("919900000000")).allowed
+    assert (await limiter.hit("918800000000")).allowed
+
+
+@pytest.mark.asyncio
+async def test_blocked_sender_served_from_local_cache():
+    class CountingRedis:
+        calls = 0
+
+        async def script_load(self, script):
+            return "sha"
+
+        async def evalsha(self, sha, keys, args):
+            self.calls += 1
+            return [0, 30000, 1]
+
+    redis = CountingRedis()
+    limiter = SlidingWindowLimiter([(1, 60)], redis=redis)
+
+    first = await limiter.hit("919900000000")
+    second = await limiter.hit("919900000000")
+
+    assert not first.allowed and first.notify
+    assert not second.allowed and not second.notify
+    assert redis.calls == 1
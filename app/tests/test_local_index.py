@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from app.rag.docstore import DocStoreWriter, load_docstore
+from app.rag.local_index import LocalIndex, LocalVectorStore, build_local_index
+from app.rag.snapshot import SnapshotWriter
+
+DIM = 32
+
+
+@pytest.fixture
+def index_dirs(tmp_path):
+    rng = np.random.default_rng(7)
+    vectors = rng.normal(size=(600, DIM)).astype(np.float32)
+    payloads = [{"text": f"chunk {i}", "stw_name": "Acute_Rhinosinusitis" if i % 3 == 0 else "AES",
+                 "source": "Vol1.pdf", "page_number": i // 10 + 1} for i in range(600)]
+    snapshot, docstore = SnapshotWriter(str(tmp_path / "snapshot"), "m", DIM), DocStoreWriter(str(tmp_path / "docstore"))
+    for start in range(0, 600, 200):
+        ids = list(range(start, start + 200))
+        snapshot.add(ids, payloads[start:start + 200], vectors[start:start + 200])
+        docstore.add(ids, payloads[start:start + 200])
+    snapshot.close()
+    docstore.close()
+    build_local_index(str(tmp_path / "snapshot"), str(tmp_path / "quantized"))
+    return tmp_path, vectors
+
+
+def test_codes_are_a_quarter_of_float32(index_dirs):
+    tmp_path, _ = index_dirs
+    index = LocalIndex(str(tmp_path / "quantized"), str(tmp_path / "snapshot"))
+    assert (tmp_path / "quantized" / "codes.u8").stat().st_size * 4 == index.memory_bytes()["float32"]
+
+
+def test_rescored_search_matches_exact_search(index_dirs):
+    tmp_path, vectors = index_dirs
+    index = LocalIndex(str(tmp_path / "quantized"), str(tmp_path / "snapshot"))
+    queries = vectors[:20] + np.random.default_rng(1).normal(scale=0.3, size=(20, DIM)).astype(np.float32)
+
+    exact = index.search_exact(queries, 10)
+    approx = index.search(queries, 10)
+    recall = np.mean([len({r for r, _ in a} & {r for r, _ in e}) / 10 for a, e in zip(approx, exact)])
+    assert recall >= 0.95
+    # Rescored scores are exact cosines
+    row, score = approx[0][0]
+    expected = vectors[row] @ queries[0] / np.linalg.norm(vectors[row]) / np.linalg.norm(queries[0])
+    assert score == pytest.approx(expected, abs=1e-5)
+
+
+def test_scoped_search_only_returns_that_stw(index_dirs):
+    tmp_path, vectors = index_dirs
+    index = LocalIndex(str(tmp_path / "quantized"), str(tmp_path / "snapshot"))
+    hits = index.search(vectors[1:2], 5, stw_scopes=[["Acute_Rhinosinusitis"]])[0]
+    assert hits and all(row % 3 == 0 for row, _ in hits)
+    assert index.search(vectors[1:2], 5, stw_scopes=[["Unknown_STW"]])[0] == []
+
+
+@pytest.mark.asyncio
+async def test_local_store_returns_docstore_payloads(index_dirs):
+    tmp_path, vectors = index_dirs
+    store = LocalVectorStore(LocalIndex(str(tmp_path / "quantized"), str(tmp_path / "snapshot")),
+                             load_docstore(str(tmp_path / "docstore")))
+    results = await store.search(vectors[42:43], top_k=3)
+    assert results[0]["id"] == 42 and results[0]["text"] == "chunk 42"
+    batched = await store.search_batch(vectors[[5, 7]], top_k=2, stw_scopes=[None, ["AES"]])
+    assert [r[0]["id"] for r in batched] == [5, 7]
+    # A scope with no convincing hit falls back to the whole corpus
+    fallback = await store.search_batch(vectors[[5]], top_k=2, stw_scopes=[["Unknown_STW"]])
+    assert fallback[0][0]["id"] == 5
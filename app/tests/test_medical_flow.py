@@ -18,7 +18,7 @@ async def test_clinical_logic_flow():
 
     with patch("app.whatsapp.webhook.send_whatsapp_message", new_caller=AsyncMock()) as mock_send, \
          patch("app.core.intent_classifier.detect_medical_intent", new_caller=AsyncMock()) as mock_intent, \
-         patch("app.rag.explainer.retrieve_relevant_chunks", new_caller=AsyncMock()) as mock_retriever, \
+         patch("app.rag.explainer.retrieve_for_intent", new_caller=AsyncMock()) as mock_retriever, \
          patch("app.rag.explainer.call_groq", new_caller=AsyncMock()) as mock_rag:
 
         # --- Phase 1: Case Detection ---
@@ -53,7 +53,7 @@ async def test_general_question_logic():
 
     with patch("app.whatsapp.webhook.send_whatsapp_message", new_caller=AsyncMock()) as mock_send, \
          patch("app.core.intent_classifier.detect_medical_intent", new_caller=AsyncMock()) as mock_intent, \
-         patch("app.rag.explainer.retrieve_relevant_chunks", new_caller=AsyncMock()) as mock_retriever, \
+         patch("app.rag.explainer.retrieve_for_intent", new_caller=AsyncMock()) as mock_retriever, \
          patch("app.rag.explainer.call_groq", new_caller=AsyncMock()) as mock_rag:
 
         mock_intent.return_value = {"type": "general"}
@@ -0,0 +1,35 @@
+import fitz
+import pytest
+from app.rag.loader import iter_pages, iter_pages_parallel, page_shards
+
+
+@pytest.fixture
+def sample_pdf(tmp_path):
+    path = tmp_path / "sample.pdf"
+    doc = fitz.open()
+    for i in range(1, 8):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Guideline Title {i}")
+        page.insert_text((72, 120), f"Body text of page {i}.")
+    doc.save(path)
+    doc.close()
+    return str(path)
+
+
+def test_page_shards_are_disjoint_and_complete():
+    shards = page_shards(70, 32)
+    assert shards == [(0, 32), (32, 64), (64, 70)]
+
+
+def test_iter_pages_is_lazy_and_numbered_from_one(sample_pdf):
+    pages = iter_pages(sample_pdf, start=2, stop=4)
+    first = next(pages)
+    assert first["page_number"] == 3
+    assert first["stw_title"] == "Guideline_Title_3"
+    assert [p["page_number"] for p in pages] == [4]
+
+
+def test_parallel_extraction_matches_serial_order(sample_pdf):
+    serial = list(iter_pages(sample_pdf))
+    parallel = list(iter_pages_parallel(sample_pdf, workers=2, shard_pages=2))
+    assert parallel == serial
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from app.rag import qdrant_pool
+
+
+class FakeClient:
+    def __init__(self):
+        self.batches = []
+        self.closed = False
+
+    async def query_batch_points(self, collection_name, requests):
+        self.batches.append(len(requests))
+        return [SimpleNamespace(points=[SimpleNamespace(id=i, score=1.0, payload={})]) for i in range(len(requests))]
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_search_batch_splits_into_bounded_round_trips(monkeypatch):
+    monkeypatch.setattr(qdrant_pool, "SEARCH_BATCH_MAX", 4)
+    client = FakeClient()
+    scopes = [["Acute_Rhinosinusitis"]] + [None] * 9
+    results = await qdrant_pool.search_batch(client, "kb", np.zeros((10, 4)), 5,
+                                             filters=[qdrant_pool.stw_filter(s) for s in scopes])
+    assert client.batches == [4, 4, 2]
+    assert len(results) == 10
+
+
+@pytest.mark.asyncio
+async def test_shared_client_is_reused_closed_and_reset(monkeypatch):
+    created = []
+    monkeypatch.setattr(qdrant_pool, "_async_client", None)
+    monkeypatch.setattr(qdrant_pool, "make_async_client", lambda: created.append(FakeClient()) or created[-1])
+
+    assert qdrant_pool.get_async_client() is qdrant_pool.get_async_client()
+    await qdrant_pool.close_async_client()
+    assert created[0].closed and len(created) == 1
+
+    qdrant_pool.get_async_client()
+    qdrant_pool.reset_after_fork()
+    assert qdrant_pool.get_async_client() is created[2]
+
+
+def test_client_options_keep_connections_alive():
+    options = qdrant_pool.client_options(prefer_grpc=True)
+    assert options["prefer_grpc"] is True
+    assert options["limits"].max_keepalive_connections > 0
+
+
+class ScopedFakeClient(FakeClient):
+    """Guideline-scoped queries only find weak matches; unscoped ones find strong ones."""
+    async def query_batch_points(self, collection_name, requests):
+        self.batches.append([r.filter is not None for r in requests])
+        return [SimpleNamespace(points=[SimpleNamespace(id=i, score=0.1 if r.filter else 0.9, payload={"text": "t"})])
+                for i, r in enumerate(requests)]
+
+
+@pytest.mark.asyncio
+async def test_weak_scoped_batch_results_fall_back_to_whole_corpus():
+    from app.rag.vector_store import VectorStore
+    client = ScopedFakeClient()
+    store = VectorStore("kb", client=client)
+    results = await store.search_batch(np.zeros((3, 4)), 5, stw_scopes=[None, ["Off_Target_STW"], None])
+
+    # One batch as requested, then the weak scoped query again without its filter
+    assert client.batches == [[False, True, False], [False]]
+    assert [r[0]["score"] for r in results] == [0.9, 0.9, 0.9]
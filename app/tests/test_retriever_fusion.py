@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from app.rag import retriever
+from app.rag.retriever import reciprocal_rank_fusion, retrieve_for_intent
+from app.rag.sections import ConditionLookup, build_lookup
+
+
+def chunk(cid, score=0.5):
+    return {"id": cid, "text": f"text {cid}", "score": score}
+
+
+def test_rrf_rewards_agreement_and_weights():
+    fused = reciprocal_rank_fusion(
+        [[chunk("a"), chunk("b")], [chunk("b", 0.9), chunk("c")], [chunk("c")]],
+        weights=[1.0, 1.0, 0.3], top_k=3
+    )
+    assert [c["id"] for c in fused] == ["b", "c", "a"]
+    assert fused[0]["score"] == 0.9
+
+
+class FakeStore:
+    def __init__(self):
+        self.calls = []
+
+    async def search_batch(self, vectors, top_k, stw_scopes=None):
+        self.calls.append((len(vectors), stw_scopes))
+        return [[chunk(f"q{i}-{j}") for j in range(2)] for i in range(len(vectors))]
+
+
+@pytest.mark.asyncio
+async def test_fan_out_is_one_embedding_and_one_batched_search(monkeypatch):
+    embedded = []
+    store = FakeStore()
+    monkeypatch.setattr(retriever, "embed_texts", lambda texts: embedded.append(texts) or np.zeros((len(texts), 4)))
+    monkeypatch.setattr(retriever, "_store", store)
+    monkeypatch.setattr(retriever, "_lookup", ConditionLookup(build_lookup([
+        {"stw_name": "Acute_Rhinosinusitis", "title": "Acute Rhinosinusitis"}
+    ])))
+
+    intent = {"ranked_conditions": [{"name": "Acute Rhinosinusitis", "probability": "High"},
+                                    {"name": "Allergic Rhinitis", "probability": "Low"}]}
+    results = await retrieve_for_intent("blocked nose 10 days", intent, top_k=4)
+
+    assert embedded == [["blocked nose 10 days", "Acute Rhinosinusitis", "Allergic Rhinitis"]]
+    assert store.calls == [(3, [None, ["Acute_Rhinosinusitis"], None])]
+    # Top ranks of the raw query and the High condition outrank the Low condition
+    assert {c["id"] for c in results[:2]} == {"q0-0", "q1-0"}
+    assert len(results) == 4
+
+
+class FakePages:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def get(self, source, page_number):
+        return self.pages.get((source, page_number))
+
+
+def test_children_expand_to_deduplicated_pages_in_rank_order():
+    pages = FakePages({("Vol1.pdf", 3): "Page three. Dose table row one. Dose table row two.",
+                       ("Vol1.pdf", 4): "Page four."})
+    children = [
+        {"id": 1, "source": "Vol1.pdf", "page_number": 3, "text": "Dose table row one.", "score": 0.9},
+        {"id": 2, "source": "Vol1.pdf", "page_number": 4, "text": "Page four.", "score": 0.8},
+        {"id": 3, "source": "Vol1.pdf", "page_number": 3, "text": "Dose table row two.", "score": 0.7},
+        {"id": 4, "source": "Vol2.pdf", "page_number": 9, "text": "Not in the page store.", "score": 0.6},
+    ]
+    parents = retriever.expand_to_parents(children, pages, max_parents=3)
+
+    assert [(p["page_number"], p["child_hits"]) for p in parents] == [(3, 2), (4, 1), (9, 1)]
+    assert parents[0]["text"] == "Page three. Dose table row one. Dose table row two."
+    assert parents[2]["text"] == "Not in the page store."
+    assert retriever.expand_to_parents(children, pages, max_parents=1)[0]["child_hits"] == 2
+
+
+def test_long_pages_are_cut_around_their_children():
+    page = "x " * 500 + "Amoxicillin 500 mg TDS for 7 days." + " y" * 500
+    parents = retriever.expand_to_parents(
+        [{"source": "Vol1.pdf", "page_number": 1, "text": "Amoxicillin 500 mg TDS for 7 days."}],
+        FakePages({("Vol1.pdf", 1): page}), max_chars=200
+    )
+    assert len(parents[0]["text"]) == 200 and "Amoxicillin 500 mg TDS for 7 days." in parents[0]["text"]
+
+
+def test_fork_keeps_mapped_stores_but_drops_own_clients(monkeypatch):
+    from types import SimpleNamespace
+    local = SimpleNamespace(index=object(), docstore=object())
+    monkeypatch.setattr(retriever, "_store", local)
+    retriever.reset_after_fork()
+    assert retriever._store is local
+
+    monkeypatch.setattr(retriever, "_store", SimpleNamespace(_client=object()))
+    retriever.reset_after_fork()
+    assert retriever._store is None
@@ -0,0 +1,89 @@
+import fitz
+import pytest
+from app.rag.loader import iter_pages, iter_pages_parallel
+from app.rag.sections import SectionMap, ConditionLookup, build_lookup, scope_from_intent
+
+
+def make_pdf(path, pages, toc=None):
+    doc = fitz.open()
+    for heading, body, *size in pages:
+        page = doc.new_page()
+        y = 72
+        if heading:
+            page.insert_text((72, y), heading, fontsize=size[0] if size else 20)
+            y += 40
+        for i in range(5):
+            page.insert_text((72, y + i * 14), f"{body} line {i}", fontsize=10)
+    if toc:
+        doc.set_toc(toc)
+    doc.save(path)
+    doc.close()
+    return str(path)
+
+
+def test_section_map_from_two_level_toc():
+    toc = [[1, "ENT", 1], [2, "Acute Rhinosinusitis", 2], [2, "Otitis Media", 4], [1, "Pediatrics", 6]]
+    sections = SectionMap.from_toc(toc)
+
+    assert sections.lookup(1) == {"stw": None, "chapter": "ENT"}
+    assert sections.lookup(3) == {"stw": "Acute Rhinosinusitis", "chapter": "ENT"}
+    assert sections.lookup(5) == {"stw": "Otitis Media", "chapter": "ENT"}
+    assert sections.lookup(7) == {"stw": None, "chapter": "Pediatrics"}
+
+
+def test_pages_get_outline_sections_not_running_headers(tmp_path):
+    pages = [(None, "ICMR Standard Treatment Workflows")] * 4
+    path = make_pdf(tmp_path / "Vol2.pdf", pages, toc=[[1, "ENT", 1], [2, "Acute Rhinosinusitis", 2]])
+    result = list(iter_pages(path))
+
+    assert result[0]["chapter"] == "ENT"
+    assert result[2]["stw_title"] == "Acute_Rhinosinusitis"
+    assert result[2]["volume"] == "Vol2"
+
+
+def test_heading_detection_without_outline(tmp_path):
+    pages = [("Acute Encephalitis Syndrome", "Fever"), (None, "Seizures"), ("Dengue Fever", "Fluids")]
+    path = make_pdf(tmp_path / "Vol3.pdf", pages)
+    result = list(iter_pages(path))
+
+    assert [p["stw_heading"] for p in result] == ["Acute Encephalitis Syndrome"] * 2 + ["Dengue Fever"]
+    # A shard starting mid-volume recovers the section in force
+    assert next(iter_pages(path, start=1))["stw_heading"] == "Acute Encephalitis Syndrome"
+
+
+def test_chapters_from_heading_sizes_match_between_serial_and_parallel(tmp_path):
+    pages = [("Ear Nose Throat", "Contents", 24), ("Acute Rhinosinusitis", "Nasal", 18), (None, "Steam"),
+             (None, "Saline"), ("Otitis Media", "Ear", 18), (None, "Drops"), ("Pediatrics", "Contents", 24),
+             ("Acute Encephalitis Syndrome", "Fever", 18), (None, "Seizures"), (None, "Referral")]
+    path = make_pdf(tmp_path / "Vol4.pdf", pages)
+    serial = list(iter_pages(path))
+    parallel = list(iter_pages_parallel(path, workers=2, shard_pages=3))
+
+    assert parallel == serial
+    assert [p["chapter"] for p in serial] == ["Ear Nose Throat"] * 6 + ["Pediatrics"] * 4
+    assert [p["stw_heading"] for p in serial] == [None, "Acute Rhinosinusitis", "Acute Rhinosinusitis",
+                                                  "Acute Rhinosinusitis", "Otitis Media", "Otitis Media", None,
+                                                  "Acute Encephalitis Syndrome", "Acute Encephalitis Syndrome",
+                                                  "Acute Encephalitis Syndrome"]
+
+
+@pytest.fixture
+def lookup():
+    return ConditionLookup(build_lookup([
+        {"stw_name": "Acute_Rhinosinusitis", "title": "Acute Rhinosinusitis", "chapter": "ENT", "volume": "Vol2"},
+        {"stw_name": "Acute_Encephalitis_Syndrome_AES", "title": "Acute Encephalitis Syndrome (AES)", "volume": "Vol3"},
+    ]))
+
+
+def test_condition_lookup_resolves_classifier_names(lookup):
+    assert lookup.resolve("Acute Rhinosinusitis") == "Acute_Rhinosinusitis"
+    assert lookup.resolve("ENT_Acute_Rhinosinusitis") == "Acute_Rhinosinusitis"
+    assert lookup.resolve("Encephalitis syndrome") == "Acute_Encephalitis_Syndrome_AES"
+    assert lookup.resolve("Common Cold") is None
+
+
+def test_scope_from_intent(lookup):
+    intent = {"ranked_conditions": [{"name": "Acute Rhinosinusitis", "probability": "High"},
+                                    {"name": "Allergic Rhinitis", "probability": "Medium"}]}
+    assert scope_from_intent(intent, lookup) == ["Acute_Rhinosinusitis"]
+    assert scope_from_intent(None, lookup) == []
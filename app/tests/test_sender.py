@@ -0,0 +1,67 @@
+import httpx
+import pytest
+from unittest.mock import patch
+from app.whatsapp import sender
+from app.core.exceptions import WhatsAppThrottledError
+
+
+def make_client(handler):
+    """Builds an AsyncClient whose requests are answered by `handler` instead of Meta."""
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler), headers=sender.HEADERS)
+
+
+@pytest.mark.asyncio
+async def test_send_parses_response():
+    def handler(request):
+        assert request.headers["Authorization"].startswith("Bearer ")
+        return httpx.Response(200, json={"messages": [{"id": "wamid.ok"}]})
+
+    with patch.object(sender, "_client", make_client(handler)):
+        result = await sender.send_whatsapp_message("919900000000", "hello")
+
+    assert result["messages"][0]["id"] == "wamid.ok"
+
+
+@pytest.mark.asyncio
+async def test_send_retries_transient_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) < 3:
+            return httpx.Response(503, json={"error": {"code": 2, "message": "Service unavailable"}})
+        return httpx.Response(200, json={"messages": [{"id": "wamid.retry"}]})
+
+    with patch.object(sender, "_client", make_client(handler)), \
+         patch.object(sender, "RETRY_BACKOFF_SECONDS", 0):
+        result = await sender.send_whatsapp_message("919900000000", "hello")
+
+    assert len(calls) == 3
+    assert result["messages"][0]["id"] == "wamid.retry"
+
+
+@pytest.mark.asyncio
+async def test_send_does_not_retry_client_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400, json={"error": {"code": 100, "message": "Invalid parameter"}})
+
+    with patch.object(sender, "_client", make_client(handler)):
+        result = await sender.send_whatsapp_message("919900000000", "hello")
+
+    assert len(calls) == 1
+    assert result is None
+
+
+@pytest.mark.asyncio
+async def test_pair_rate_error_is_handed_to_dispatcher():
+    def handler(request):
+        return httpx.Response(400, json={"error": {"code": 131056, "message": "Pair rate limit hit"}})
+
+    with patch.object(sender, "_client", make_client(handler)):
+        with pytest.raises(WhatsAppThrottledError) as exc_info:
+            await sender._post_message({"to": "919900000000"})
+
+    assert exc_info.value.code == 131056
@@ -0,0 +1,34 @@
+import os
+from unittest.mock import patch
+from app.core import serialization
+from app.core.serialization import dumps, loads, encode_state, decode_state
+
+STATE = {"step": "AWAITING_DEMOGRAPHICS", "demographic_idx": 2, "demographics": {"age": "6 years", "weight": "18 kg"}}
+
+
+def test_json_round_trip():
+    payload = {"text": "Ceftriaxone 100 mg/kg/day", "score": 0.82, "pages": [1, 2]}
+    assert loads(dumps(payload)) == payload
+    assert loads(dumps(payload).decode("utf-8")) == payload
+
+
+def test_state_round_trip_json():
+    with patch.dict(os.environ, {"STATE_SERIALIZER": "json"}):
+        encoded = encode_state(STATE)
+    assert not encoded.startswith(serialization.MSGPACK_STATE_PREFIX)
+    assert decode_state(encoded) == STATE
+
+
+def test_state_round_trip_msgpack():
+    with patch.dict(os.environ, {"STATE_SERIALIZER": "msgpack"}):
+        encoded = encode_state(STATE)
+    if serialization.MSGPACK_AVAILABLE:
+        assert encoded.startswith(serialization.MSGPACK_STATE_PREFIX)
+    assert decode_state(encoded) == STATE
+
+
+def test_decode_state_accepts_legacy_values():
+    # Entries written by the old json.dumps code, or already decoded by upstash_redis
+    assert decode_state('{"step": "READY"}') == {"step": "READY"}
+    assert decode_state({"step": "READY"}) == {"step": "READY"}
+    assert decode_state(None) is None
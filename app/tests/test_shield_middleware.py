@@ -0,0 +1,57 @@
+import hashlib
+import hmac
+import json
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from app.config import WHATSAPP_APP_SECRET
+from app.middleware.whatsapp_shield_middleware import WhatsAppShieldMiddleware
+
+app = FastAPI()
+app.add_middleware(WhatsAppShieldMiddleware)
+
+
+@app.post("/webhook-whatsapp")
+async def webhook(request: Request):
+    return {
+        "parsed": request.state.whatsapp_payload,
+        "body_replayed": await request.json() == request.state.whatsapp_payload
+    }
+
+
+client = TestClient(app)
+
+
+def signed_post(payload: dict, secret: str = WHATSAPP_APP_SECRET):
+    body = json.dumps(payload).encode("utf-8")
+    signature = "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return client.post("/webhook-whatsapp", content=body,
+                       headers={"Content-Type": "application/json", "X-Hub-Signature-256": signature})
+
+
+def make_payload(*senders):
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{"changes": [{"value": {
+            "messages": [{"from": s, "type": "text", "text": {"body": "hi"}} for s in senders]
+        }}]}]
+    }
+
+
+def test_rejects_invalid_signature():
+    response = signed_post(make_payload("919900000000"), secret="wrong-secret")
+    assert response.status_code == 401
+
+
+def test_parses_once_and_replays_body():
+    payload = make_payload("919900000000", "918800000000")
+    data = signed_post(payload).json()
+
+    assert data["parsed"] == payload
+    assert data["body_replayed"] is True
+
+
+def test_status_only_payload_is_acked_without_reaching_route():
+    response = signed_post({"entry": [{"changes": [{"value": {"statuses": [{"status": "read"}]}, "field": "messages"}]}]})
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "accepted", "statuses_only": True}
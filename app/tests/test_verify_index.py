@@ -0,0 +1,73 @@
+import pytest
+from types import SimpleNamespace
+from app.rag.verify_index import ManifestBuilder, load_manifest, verify_index
+
+
+class FakeAsyncQdrant:
+    """Serves scroll() pages from an in-memory point list, filtered by source."""
+    def __init__(self, points):
+        self.points = points
+        self.calls = 0
+
+    async def scroll(self, collection_name, scroll_filter, limit, offset, with_payload, with_vectors):
+        self.calls += 1
+        source = scroll_filter.must[0].match.value
+        matching = [p for p in self.points if p.payload["source"] == source]
+        start = offset or 0
+        page = matching[start:start + limit]
+        next_offset = start + limit if start + limit < len(matching) else None
+        return page, next_offset
+
+
+def _point(source, page, chunk_hash):
+    return SimpleNamespace(payload={"source": source, "page_number": page, "chunk_hash": chunk_hash})
+
+
+def _build(entries):
+    manifest = ManifestBuilder("kb", "model")
+    for source, page, chunk_hash in entries:
+        manifest.add(source, page, chunk_hash)
+    return manifest
+
+
+@pytest.mark.asyncio
+async def test_clean_index_paginates_past_one_page():
+    # 2,500 chunks: the old single limit=1000 scroll reported most of them missing
+    entries = [("Vol1.pdf", i // 10 + 1, f"h{i}") for i in range(2500)] + [("Vol2.pdf", 1, "x")]
+    client = FakeAsyncQdrant([_point(*e) for e in entries])
+
+    reports = await verify_index(client, _build(entries).manifest, page_size=1000)
+
+    assert reports["Vol1.pdf"]["ok"] and reports["Vol1.pdf"]["found"] == 2500
+    assert reports["Vol2.pdf"]["ok"]
+    assert client.calls == 4  # three pages for Vol1, one for Vol2
+
+
+@pytest.mark.asyncio
+async def test_reports_missing_extra_and_duplicate_chunks():
+    built = [("Vol1.pdf", 1, "a"), ("Vol1.pdf", 1, "b"), ("Vol1.pdf", 2, "c"), ("Vol1.pdf", 3, "d")]
+    stored = [("Vol1.pdf", 1, "a"), ("Vol1.pdf", 1, "a"), ("Vol1.pdf", 1, "b"),
+              ("Vol1.pdf", 3, "d"), ("Vol1.pdf", 7, "stray")]
+    client = FakeAsyncQdrant([_point(*e) for e in stored])
+
+    report = (await verify_index(client, _build(built).manifest))["Vol1.pdf"]
+
+    assert not report["ok"]
+    assert (report["missing"], report["extra"], report["duplicates"]) == (1, 1, 1)
+    assert report["pages_short"] == ["2"]
+    assert report["pages_with_extra"] == ["7"]
+
+
+@pytest.mark.asyncio
+async def test_points_without_hash_are_flagged():
+    client = FakeAsyncQdrant([SimpleNamespace(payload={"source": "Vol1.pdf", "page_number": 1})])
+    report = (await verify_index(client, _build([("Vol1.pdf", 1, "a")]).manifest))["Vol1.pdf"]
+    assert report["unhashed"] == 1 and report["missing"] == 1 and not report["ok"]
+
+
+def test_manifest_round_trip(tmp_path):
+    path = str(tmp_path / "index" / "manifest.json")
+    _build([("Vol1.pdf", 4, "a"), ("Vol1.pdf", 4, "a")]).save(path)
+    manifest = load_manifest(path)
+    assert manifest["volumes"]["Vol1.pdf"] == {"count": 2, "pages": {"4": 2}, "hashes": {"a": 2}}
+    assert load_manifest(str(tmp_path / "absent.json")) is None
@@ -0,0 +1,55 @@
+import asyncio
+import pytest
+from app.core.warmer import UpstreamWarmer
+
+
+@pytest.mark.asyncio
+async def test_warm_all_records_latency_and_isolates_failures():
+    calls = []
+
+    async def ok():
+        calls.append("ok")
+
+    async def broken():
+        raise ConnectionError("refused")
+
+    warmer = UpstreamWarmer({"ok": ok, "broken": broken}, hosts={"ok": "localhost"})
+    await warmer.warm_all()
+
+    stats = warmer.stats()["upstreams"]
+    assert calls == ["ok"]
+    assert stats["ok"]["warms"] == 1 and stats["ok"]["warm_ms"] is not None
+    assert stats["ok"]["dns_ms"] is not None
+    assert stats["broken"]["failures"] == 1
+    assert "refused" in stats["broken"]["last_error"]
+
+
+@pytest.mark.asyncio
+async def test_rewarms_only_while_idle():
+    warms = []
+
+    async def target():
+        warms.append(1)
+
+    warmer = UpstreamWarmer({"t": target}, interval=0.05)
+    await warmer.start()
+    await asyncio.sleep(0.01)
+    assert len(warms) == 1  # startup warm-up
+
+    # Continuous traffic: no extra warm-ups
+    for _ in range(6):
+        warmer.touch()
+        await asyncio.sleep(0.02)
+    busy = len(warms)
+
+    # Idle: warms again
+    await asyncio.sleep(0.15)
+    await warmer.stop()
+    assert busy <= 2
+    assert len(warms) > busy
+
+
+def test_local_vector_backend_skips_qdrant():
+    from app.core.warmer import _build_warmer
+    assert "qdrant" in _build_warmer("qdrant").targets
+    assert "qdrant" not in _build_warmer("local").targets
@@ -0,0 +1,269 @@
+import asyncio
+import itertools
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+from app.core.exceptions import WhatsAppThrottledError
+
+# Lower value = delivered first. Clinical replies always jump ahead of notices.
+PRIORITY_REPLY = 0
+PRIORITY_NOTICE = 10
+
+# How many queue-wait samples are kept for the latency percentiles in stats()
+LATENCY_SAMPLES = 1000
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens per second, holding at most `capacity` tokens.
+    Used for the per-number throughput limit and each recipient's pair-rate limit.
+    """
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> float:
+        """Takes a token if one is available. Returns 0, or the seconds to wait for the next token."""
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        """Waits until a token is available and takes it."""
+        while (wait := self.try_acquire()) > 0:
+            await asyncio.sleep(wait)
+
+    def is_full(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+
+@dataclass
+class OutboundMessage:
+    to: str
+    payload: dict
+    priority: int
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+    expires_at: Optional[float] = None
+    attempts: int = 0
+
+
+class OutboundDispatcher:
+    """
+    Schedules every outbound WhatsApp message:
+    1. Per-number token bucket keeps us under the Cloud API throughput limit.
+    2. Per-recipient FIFO + pair-rate bucket keeps messages to one doctor in order and spaced.
+    3. Throttle errors (429 / 131056-style) go back to the head of that recipient's queue with backoff.
+    4. Priorities let clinical replies overtake bursts of notices; stale notices are dropped.
+    """
+    def __init__(
+        self,
+        deliver: Callable[[dict], Awaitable[Optional[dict]]],
+        rate: float = 80,
+        burst: float = 80,
+        pair_rate: float = 1 / 6,
+        pair_burst: float = 10,
+        concurrency: int = 8,
+        max_retries: int = 5,
+        retry_base: float = 1.0,
+        retry_max: float = 60.0
+    ):
+        self._deliver = deliver
+        self._number_bucket = TokenBucket(rate, burst)
+        self._pair_rate = pair_rate
+        self._pair_burst = pair_burst
+        self._pair_buckets: dict[str, TokenBucket] = {}
+        self._concurrency = concurrency
+        self._max_retries = max_retries
+        self._retry_base = retry_base
+        self._retry_max = retry_max
+
+        self._pending: dict[str, deque] = {}
+        self._ready: asyncio.PriorityQueue | None = None
+        self._seq = itertools.count()
+        self._workers: list[asyncio.Task] = []
+        # Direct deliveries made outside the app lifespan; the loop only keeps weak references to tasks
+        self._direct_tasks: set[asyncio.Task] = set()
+
+        self.metrics = {
+            "enqueued": 0, "sent": 0, "failed": 0,
+            "retried": 0, "throttled": 0, "expired": 0
+        }
+        self._wait_samples = deque(maxlen=LATENCY_SAMPLES)
+
+    # --- Lifecycle ---
+    async def start(self):
+        """Starts the delivery workers. Called once on app startup."""
+        if self._workers:
+            return
+        self._ready = asyncio.PriorityQueue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self._concurrency)]
+
+    async def stop(self, drain_timeout: float = 5.0):
+        """Gives queued and direct messages a short window to go out, then cancels the rest."""
+        deadline = time.monotonic() + drain_timeout
+        while self._pending and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._direct_tasks:
+            _, unfinished = await asyncio.wait(set(self._direct_tasks), timeout=max(0.0, deadline - time.monotonic()))
+            for task in unfinished:
+                task.cancel()
+            await asyncio.gather(*unfinished, return_exceptions=True)
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for queue in self._pending.values():
+            for msg in queue:
+                if not msg.future.done():
+                    msg.future.set_result(None)
+        self._pending.clear()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    # --- Public API ---
+    def enqueue(self, to: str, payload: dict, priority: int = PRIORITY_REPLY, ttl: float = None) -> asyncio.Future:
+        """Queues a message without waiting for delivery. The returned future resolves to the Graph API response (or None)."""
+        loop = asyncio.get_running_loop()
+        msg = OutboundMessage(
+            to=to, payload=payload, priority=priority, future=loop.create_future(),
+            expires_at=time.monotonic() + ttl if ttl else None
+        )
+        self.metrics["enqueued"] += 1
+
+        if not self.running:
+            # Outside the app lifespan (scripts, simulations): deliver directly
+            task = asyncio.create_task(self._deliver_direct(msg))
+            self._direct_tasks.add(task)
+            task.add_done_callback(self._direct_tasks.discard)
+            return msg.future
+
+        queue = self._pending.get(to)
+        if queue is None:
+            self._pending[to] = deque([msg])
+            self._schedule(to)
+        else:
+            queue.append(msg)
+        return msg.future
+
+    async def send(self, to: str, payload: dict, priority: int = PRIORITY_REPLY, ttl: float = None):
+        """Queues a message and waits until it has been delivered (or given up on)."""
+        return await self.enqueue(to, payload, priority, ttl)
+
+    def stats(self) -> dict:
+        """Delivery counters, queue depth and queue-wait percentiles."""
+        samples = sorted(self._wait_samples)
+
+        def pct(p):
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 1) if samples else None
+
+        return {
+            **self.metrics,
+            "queued": sum(len(q) for q in self._pending.values()),
+            "recipients_pending": len(self._pending),
+            "queue_wait_ms": {"p50": pct(0.50), "p95": pct(0.95), "max": pct(1.0)}
+        }
+
+    # --- Internals ---
+    def _schedule(self, to: str, delay: float = 0.0):
+        """Makes a recipient eligible for its next message (after `delay` seconds)."""
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self._schedule, to)
+            return
+        queue = self._pending.get(to)
+        if queue and self._ready is not None:
+            self._ready.put_nowait((queue[0].priority, next(self._seq), to))
+
+    def _pair_bucket(self, to: str) -> TokenBucket:
+        bucket = self._pair_buckets.get(to)
+        if bucket is None:
+            bucket = self._pair_buckets[to] = TokenBucket(self._pair_rate, self._pair_burst)
+        return bucket
+
+    def _finish(self, to: str, result):
+        """Resolves the head message of a recipient and schedules the next one, if any."""
+        queue = self._pending[to]
+        msg = queue.popleft()
+        if not msg.future.done():
+            msg.future.set_result(result)
+        if queue:
+            self._schedule(to)
+        else:
+            del self._pending[to]
+            bucket = self._pair_buckets.get(to)
+            if bucket is not None and bucket.is_full():
+                del self._pair_buckets[to]
+
+    def _retry_delay(self, msg: OutboundMessage, exc: WhatsAppThrottledError) -> float:
+        if exc.retry_after:
+            return exc.retry_after
+        delay = min(self._retry_max, self._retry_base * (2 ** (msg.attempts - 1)))
+        return delay * random.uniform(0.8, 1.2)
+
+    async def _worker(self):
+        while True:
+            _, _, to = await self._ready.get()
+            queue = self._pending.get(to)
+            if not queue:
+                continue
+            msg = queue[0]
+
+            if msg.expires_at and time.monotonic() > msg.expires_at:
+                self.metrics["expired"] += 1
+                self._finish(to, None)
+                continue
+
+            wait = self._pair_bucket(to).try_acquire()
+            if wait > 0:
+                # Don't hold a worker while this recipient's pair-rate window refills
+                self._schedule(to, wait)
+                continue
+
+            await self._number_bucket.acquire()
+            if msg.attempts == 0:
+                self._wait_samples.append(time.monotonic() - msg.enqueued_at)
+            msg.attempts += 1
+
+            try:
+                result = await self._deliver(msg.payload)
+            except WhatsAppThrottledError as e:
+                self.metrics["throttled"] += 1
+                if msg.attempts > self._max_retries:
+                    print(f"❌ Giving up on message to {to} after {msg.attempts} throttled attempts.")
+                    self.metrics["failed"] += 1
+                    self._finish(to, None)
+                else:
+                    self.metrics["retried"] += 1
+                    self._schedule(to, self._retry_delay(msg, e))
+                continue
+            except Exception as e:
+                print(f"❌ Outbound delivery to {to} crashed: {e!r}")
+                result = None
+
+            self.metrics["sent" if result is not None else "failed"] += 1
+            self._finish(to, result)
+
+    async def _deliver_direct(self, msg: OutboundMessage):
+        result = None
+        try:
+            result = await self._deliver(msg.payload)
+        except Exception as e:
+            print(f"❌ Outbound delivery to {msg.to} failed: {e!r}")
+        finally:
+            # Also resolves the future when stop() cancels this delivery
+            if not msg.future.done():
+                msg.future.set_result(result)
+        self.metrics["sent" if result is not None else "failed"] += 1
@@ -0,0 +1,51 @@
+import asyncio
+from typing import Callable
+from app.core.limiter import admit_message
+
+
+def split_events(payload: dict) -> tuple[list[dict], int]:
+    """
+    Separates message events from status callbacks (sent/delivered/read receipts).
+    Returns (message events in delivery order, number of status events).
+    """
+    messages, statuses = [], 0
+    if not isinstance(payload, dict):
+        return messages, statuses
+    for entry in payload.get("entry", []):
+        for change in entry.get("changes", []):
+            value = change.get("value", {})
+            messages.extend(value.get("messages", []))
+            statuses += len(value.get("statuses", []))
+    return messages, statuses
+
+
+async def dispatch_inbound(payload: dict, schedule: Callable[[str, str], None]) -> dict:
+    """
+    Per-message admission for one webhook delivery:
+    1. Status events are counted and dropped (no limiter, no orchestrator).
+    2. Each text message is charged to its own sender's rate limit.
+    3. Admitted messages are handed to `schedule(sender_id, text)`.
+    Senders are admitted concurrently; one sender's messages keep their order.
+    """
+    messages, statuses = split_events(payload)
+    counts = {"accepted": 0, "throttled": 0, "ignored": 0, "statuses": statuses}
+
+    by_sender: dict[str, list[str]] = {}
+    for msg in messages:
+        sender_id = msg.get("from")
+        text = msg.get("text", {}).get("body")
+        if sender_id and text:
+            by_sender.setdefault(str(sender_id), []).append(text)
+        else:
+            counts["ignored"] += 1
+
+    async def admit_sender(sender_id: str, texts: list[str]):
+        for text in texts:
+            if await admit_message(sender_id):
+                schedule(sender_id, text)
+                counts["accepted"] += 1
+            else:
+                counts["throttled"] += 1
+
+    await asyncio.gather(*(admit_sender(s, texts) for s, texts in by_sender.items()))
+    return counts
@@ -1,17 +1,142 @@
+import asyncio
 import httpx
-from app.config import WHATSAPP_PHONE_NUMBER_ID, WHATSAPP_TOKEN
+from app.config import (
+    WHATSAPP_PHONE_NUMBER_ID, WHATSAPP_TOKEN,
+    WHATSAPP_HTTP_TIMEOUT, WHATSAPP_HTTP_CONNECT_TIMEOUT,
+    WHATSAPP_HTTP_MAX_CONNECTIONS, WHATSAPP_HTTP_KEEPALIVE,
+    WHATSAPP_SEND_RETRIES, WHATSAPP_MPS, WHATSAPP_PAIR_RATE, WHATSAPP_PAIR_BURST
+)
+from app.core.exceptions import WhatsAppThrottledError
+from app.whatsapp.dispatcher import OutboundDispatcher, PRIORITY_REPLY, PRIORITY_NOTICE
 
 BASE_URL = f"https://graph.facebook.com/v22.0/{WHATSAPP_PHONE_NUMBER_ID}/messages"
 HEADERS = {"Authorization": f"Bearer {WHATSAPP_TOKEN}", "Content-Type": "application/json"}
 
-async def send_whatsapp_message(to: str, text: str):
-    """Sends a standard text message."""
-    payload = {
+# Status codes worth an immediate retry: Meta-side outages
+TRANSIENT_STATUS_CODES = {500, 502, 503, 504}
+# Throughput / pair-rate / spam-rate errors: handed back to the dispatcher's retry queue
+THROTTLE_ERROR_CODES = {4, 80007, 130429, 131048, 131056}
+RETRY_BACKOFF_SECONDS = 0.5
+
+# Single app-lifetime client (opened/closed in the FastAPI lifespan)
+_client: httpx.AsyncClient | None = None
+
+
+def _build_client() -> httpx.AsyncClient:
+    """Creates the pooled HTTP/2 client used for every Graph API call."""
+    return httpx.AsyncClient(
+        http2=True,
+        headers=HEADERS,
+        timeout=httpx.Timeout(WHATSAPP_HTTP_TIMEOUT, connect=WHATSAPP_HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=WHATSAPP_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=WHATSAPP_HTTP_MAX_CONNECTIONS,
+            keepalive_expiry=WHATSAPP_HTTP_KEEPALIVE
+        )
+    )
+
+
+async def init_http_client():
+    """Opens the shared client. Called once on app startup."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+
+
+async def close_http_client():
+    """Closes the shared client and its pooled connections on shutdown."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def reset_after_fork():
+    """Drops any client inherited from the parent process; the worker's lifespan opens its own."""
+    global _client
+    _client = None
+
+
+def _backoff_delay(attempt: int, response: httpx.Response | None = None) -> float:
+    """Exponential backoff, honouring Meta's Retry-After header when present."""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return float(retry_after)
+    return RETRY_BACKOFF_SECONDS * (2 ** attempt)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Returns the shared client, creating it lazily for scripts/tests run outside the app lifespan."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def _post_message(payload: dict) -> dict | None:
+    """
+    Posts a message payload to the Graph API and returns the parsed response.
+    Transient failures (network errors, 5xx) are retried with exponential backoff;
+    throttling raises WhatsAppThrottledError so the dispatcher can re-queue the message.
+    """
+    to = payload.get("to")
+    for attempt in range(WHATSAPP_SEND_RETRIES + 1):
+        try:
+            response = await get_http_client().post(BASE_URL, json=payload)
+        except httpx.TransportError as e:
+            if attempt < WHATSAPP_SEND_RETRIES:
+                await asyncio.sleep(_backoff_delay(attempt))
+                continue
+            print(f"❌ WhatsApp send to {to} failed: {e!r}")
+            return None
+
+        try:
+            data = response.json()
+        except ValueError:
+            data = {}
+
+        if response.is_success:
+            return data
+
+        error = data.get("error", {}) if isinstance(data, dict) else {}
+        if response.status_code == 429 or error.get("code") in THROTTLE_ERROR_CODES:
+            retry_after = response.headers.get("Retry-After", "")
+            raise WhatsAppThrottledError(
+                error.get("code", response.status_code), error.get("message", ""),
+                float(retry_after) if retry_after.isdigit() else None
+            )
+
+        if response.status_code in TRANSIENT_STATUS_CODES and attempt < WHATSAPP_SEND_RETRIES:
+            await asyncio.sleep(_backoff_delay(attempt, response))
+            continue
+
+        print(f"❌ WhatsApp send to {to} failed [{response.status_code}]: "
+              f"{error.get('code')} {error.get('message', response.text[:200])}")
+        return None
+
+
+# All sends go through the dispatcher (started/stopped in the FastAPI lifespan)
+dispatcher = OutboundDispatcher(
+    deliver=_post_message,
+    rate=WHATSAPP_MPS, burst=WHATSAPP_MPS,
+    pair_rate=WHATSAPP_PAIR_RATE, pair_burst=WHATSAPP_PAIR_BURST
+)
+
+
+def _text_payload(to: str, text: str) -> dict:
+    return {
         "messaging_product": "whatsapp", "to": to, "type": "text",
         "text": {"body": text}
     }
-    async with httpx.AsyncClient() as client:
-        await client.post(BASE_URL, headers=HEADERS, json=payload)
+
+async def send_whatsapp_message(to: str, text: str, priority: int = PRIORITY_REPLY):
+    """Sends a standard text message and waits until it has been delivered."""
+    return await dispatcher.send(to, _text_payload(to, text), priority)
+
+def enqueue_whatsapp_message(to: str, text: str, priority: int = PRIORITY_NOTICE, ttl: float = 60):
+    """Queues a low-priority text message (e.g. notices) without waiting. Dropped if still queued after `ttl` seconds."""
+    return dispatcher.enqueue(to, _text_payload(to, text), priority, ttl)
 
 async def send_interactive_buttons(to: str, header: str, body: str, buttons: list):
     """Sends a message with up to 3 interactive quick-reply buttons."""
@@ -33,5 +158,4 @@ async def send_interactive_buttons(to: str, header: str, body: str, buttons: lis
             "action": {"buttons": button_objs}
         }
     }
-    async with httpx.AsyncClient() as client:
-        await client.post(BASE_URL, headers=HEADERS, json=payload)
\ No newline at end of file
+    return await dispatcher.send(to, payload)
@@ -3,10 +3,12 @@ from fastapi import APIRouter, Request, BackgroundTasks, Query, Response
 from app.state_store.store import get_state, set_state, clear_state
 from app.core.intent_classifier import detect_medical_intent
 from app.rag.explainer import explain_with_strict_rag, explain_with_hybrid_rag
-from app.core.limiter import limiter, LIMIT_STRATEGY
+from app.whatsapp.inbound import dispatch_inbound
 from app.whatsapp.sender import send_whatsapp_message
 from app.config import WHATSAPP_VERIFY_TOKEN
 from app.core.logger import log_clinical_session
+from app.core.telemetry import turn_trace
+from app.core.warmer import warmer
 
 router = APIRouter()
 
@@ -34,18 +36,19 @@ async def verify(hub_mode: str = Query(None, alias="hub.mode"),
     return Response(status_code=403)
 
 @router.post("/webhook-whatsapp")
-@limiter.limit(LIMIT_STRATEGY)
 async def receive(request: Request, background_tasks: BackgroundTasks):
-    payload = await request.json()
-    for entry in payload.get("entry", []):
-        for change in entry.get("changes", []):
-            value = change.get("value", {})
-            for msg in value.get("messages", []):
-                sender_id = msg.get("from")
-                text = msg.get("text", {}).get("body")
-                if sender_id and text:
-                    background_tasks.add_task(medical_orchestrator, sender_id, text)
-    return {"status": "accepted"}
+    # Live traffic keeps upstream connections warm; the warmer only steps in when idle
+    warmer.touch()
+    # Reuse the payload already parsed by WhatsAppShieldMiddleware
+    payload = getattr(request.state, "whatsapp_payload", None)
+    if payload is None:
+        payload = await request.json()
+
+    # Per-message admission: statuses dropped, limits charged to each message's own sender
+    counts = await dispatch_inbound(
+        payload, lambda sender_id, text: background_tasks.add_task(medical_orchestrator, sender_id, text)
+    )
+    return {"status": "accepted", **counts}
 
 
 async def medical_orchestrator(sender_id: str, text: str):
@@ -96,34 +99,42 @@ async def medical_orchestrator(sender_id: str, text: str):
                 return await send_whatsapp_message(sender_id, DEMOGRAPHIC_QUESTIONS[idx+1]["question"])
             else:
                 # --- PROCESS CASE ---
-                analysis = await detect_medical_intent(state["pending_query"])
-                answer = await explain_with_strict_rag(
-                    query=state["pending_query"], 
-                    expanded_search=analysis.get("expanded_query"), 
-                    demographics=state["demographics"],
-                    intent_data=analysis
-                )
-                
-                # Append the menu and loop back the state
-                final_response = answer + SELECTION_MENU
-                await send_whatsapp_message(sender_id, final_response)
-                log_clinical_session(sender_id, state["pending_query"], "case", state["demographics"], [], answer)
+                with turn_trace("case") as trace:
+                    with trace.stage("intent"):
+                        analysis = await detect_medical_intent(state["pending_query"])
+                    answer = await explain_with_strict_rag(
+                        query=state["pending_query"], 
+                        expanded_search=analysis.get("expanded_query"), 
+                        demographics=state["demographics"],
+                        intent_data=analysis
+                    )
+                    
+                    # Append the menu and loop back the state
+                    final_response = answer + SELECTION_MENU
+                    with trace.stage("send"):
+                        await send_whatsapp_message(sender_id, final_response)
+                log_clinical_session(sender_id, state["pending_query"], "case", state["demographics"],
+                                     trace.ref_ids(), answer, trace=trace.to_dict())
                 
                 set_state(sender_id, {"step": "SELECT_PATHWAY"})
                 return
 
         # 4. SEARCH PATHWAY
         if state.get("step") == "AWAITING_SEARCH_QUERY":
-            analysis = await detect_medical_intent(text)
-            answer = await explain_with_hybrid_rag(
-                query=text,
-                expanded_search=analysis.get("expanded_query")
-            )
-            
-            # Append the menu and loop back the state
-            final_response = answer + SELECTION_MENU
-            await send_whatsapp_message(sender_id, final_response)
-            log_clinical_session(sender_id, text, "search", {}, [], answer)
+            with turn_trace("search") as trace:
+                with trace.stage("intent"):
+                    analysis = await detect_medical_intent(text)
+                answer = await explain_with_hybrid_rag(
+                    query=text,
+                    expanded_search=analysis.get("expanded_query"),
+                    intent_data=analysis
+                )
+                
+                # Append the menu and loop back the state
+                final_response = answer + SELECTION_MENU
+                with trace.stage("send"):
+                    await send_whatsapp_message(sender_id, final_response)
+            log_clinical_session(sender_id, text, "search", {}, trace.ref_ids(), answer, trace=trace.to_dict())
             
             set_state(sender_id, {"step": "SELECT_PATHWAY"})
             return
@@ -0,0 +1,71 @@
+"""
+Gunicorn settings for preforked serving: the app (and the embedding model) is loaded once in
+the master and shared copy-on-write by every worker, so the instance can use all its vCPUs
+without multiplying RAM. See app/core/prefork.py.
+"""
+import math
+import os
+
+
+def available_cpus() -> int:
+    """
+    CPUs this container may actually use: the scheduler affinity, capped by the cgroup CPU quota.
+    os.cpu_count() reports the host's cores, which on Cloud Run can be many times the instance's vCPUs.
+    """
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    quota = None
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            limit, period = f.read().split()[:2]
+        if limit != "max":
+            quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1: a quota of -1 means unlimited
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f, open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as g:
+                limit, period = int(f.read()), int(g.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(cpus, 1)
+
+
+# Cloud Run provides $PORT
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+# One worker per usable vCPU (each carries its own torch runtime), unless WEB_CONCURRENCY says otherwise
+workers = int(os.getenv("WEB_CONCURRENCY", str(available_cpus())))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+# Load the app (model weights included) before forking; GUNICORN_PRELOAD=0 for per-worker loading
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") != "0"
+# With preload, also load the embedding model in the master so workers share it. Set
+# PRELOAD_MODEL=0 to favour cold-start acks instead (each worker then loads it in the background).
+PRELOAD_MODEL = os.getenv("PRELOAD_MODEL", "1") != "0"
+# Intra-op threads per worker for embedding; workers x threads should not exceed the vCPUs
+TORCH_THREADS_PER_WORKER = int(os.getenv("TORCH_THREADS_PER_WORKER", "1"))
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before the first fork
+    if preload_app and PRELOAD_MODEL:
+        from app.rag.embeddings import load_model
+        load_model()
+    if preload_app:
+        # Docstore, page store and local index are memory maps: mapped once here, shared by every worker
+        from app.rag.retriever import preload_stores
+        preload_stores()
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        from app.core.prefork import freeze_shared_heap
+        freeze_shared_heap()
+
+
+def post_fork(server, worker):
+    from app.core.prefork import after_fork
+    after_fork(TORCH_THREADS_PER_WORKER)